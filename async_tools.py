@@ -0,0 +1,411 @@
+"""
+Asyncio counterparts of the text_extraction tools.
+
+The tools are synchronous and CPU bound; called from a coroutine they block
+the event loop for as long as layout analysis takes, and opening an S3
+document blocks it for the download. AsyncTools runs every tool call in a
+bounded executor instead: layout work in a process pool (or a thread pool),
+downloads and file writes in a thread pool.
+
+Documents are passed as a local path, an s3:// URI or bytes. They are
+resolved to a local file once (S3 objects through the file cache, bytes
+through a temporary file), and each worker opens a document the first time
+it needs it and keeps the PdfSession for later calls.
+
+Identical requests for the same document that are in flight at the same
+time share one execution. Keyword scans are split into chunks of pages
+that are submitted a few at a time, so cancelling a scan stops it after
+the chunks already running instead of letting it go on in the background.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import types
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+import text_extraction as te
+from page_map import split_page_range
+from pdf_session import PdfSession
+from utils.file_cache import FileCache
+from utils.file_loader import is_s3_uri, open_file_from_path_or_s3
+from utils.mapped_file import open_mapped
+from utils.prefetch import PrefetchResult, prefetch
+
+# A local path, an s3:// URI, the document bytes or an open binary stream
+Document = Union[str, bytes, BinaryIO]
+
+# Identifies a resolved document: (path, modification time in ns, size).
+# It changes when a cache entry is replaced by a newer version.
+DocumentKey = Tuple[str, int, int]
+
+# Threads for downloads and writing temporary files
+DEFAULT_IO_WORKERS = 8
+
+# Pages per chunk of a keyword scan
+DEFAULT_SCAN_CHUNK_PAGES = 16
+
+# Chunks of one scan queued or running per CPU worker at any time
+SCAN_CHUNKS_PER_WORKER = 2
+
+# Documents each worker keeps open
+DEFAULT_MAX_SESSIONS = 8
+
+# Position of the document argument in each tool's signature
+_DOCUMENT_ARG = {
+    "get_total_page_count": 0,
+    "get_text_from_page": 0,
+    "extract_text_blocks_with_metadata": 0,
+    "extract_toc": 0,
+    "find_pages_with_keyword": 1,
+    "find_pages_with_terms": 1,
+    "find_headers_and_footers": 0,
+    "get_text_between_y_coordinates": 0,
+    "get_text_following_header": 0,
+    "extract_section_text": 0,
+    "detect_tables_on_page": 0,
+    "extract_text_in_bbox": 0,
+    "extract_text_in_bboxes": 0,
+}
+
+# Sessions opened by the current worker (process or thread)
+_worker_state = threading.local()
+
+
+########################################################################
+# Worker side
+########################################################################
+def _worker_session(key: DocumentKey, max_sessions: int) -> PdfSession:
+    """Returns this worker's session for a document, opening it on first use."""
+    sessions = getattr(_worker_state, "sessions", None)
+    if sessions is None:
+        sessions = _worker_state.sessions = OrderedDict()
+    session = sessions.get(key)
+    if session is not None:
+        sessions.move_to_end(key)
+        return session
+    session = PdfSession(open_mapped(key[0]))
+    sessions[key] = session
+    while len(sessions) > max_sessions:
+        _, oldest = sessions.popitem(last=False)
+        oldest.close()
+    return session
+
+
+def _run_tool(name: str, key: DocumentKey, max_sessions: int, args: Sequence, kwargs: Dict) -> Any:
+    args = list(args)
+    args.insert(_DOCUMENT_ARG[name], _worker_session(key, max_sessions))
+    result = getattr(te, name)(*args, **kwargs)
+    if isinstance(result, types.GeneratorType):
+        # extract_toc(lazy=True); generators cannot leave the worker
+        result = list(result)
+    return result
+
+
+def _file_key(path: str) -> DocumentKey:
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+def _freeze(value: Any) -> Hashable:
+    """Turns tool arguments into a hashable request key."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class _InFlight:
+    """A running request and the number of callers awaiting it."""
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+########################################################################
+# Async tool runner
+########################################################################
+class AsyncTools:
+    """
+    Runs the text_extraction tools without blocking the event loop.
+
+    Every tool is available as a coroutine method with the tool's own name
+    and arguments, except that the document is a path, S3 URI or bytes
+    rather than a stream or PdfSession, and that the `workers` argument is
+    not accepted (the runner's executor provides the parallelism):
+
+        async with AsyncTools(cpu_workers=4) as tools:
+            text = await tools.get_text_from_page("s3://bucket/doc.pdf", 5)
+            pages = await tools.find_pages_with_keyword("Transparency", "s3://bucket/doc.pdf")
+
+    Cancelling a call cancels its work once no other caller is waiting for
+    the same request; work that has not started yet is dropped.
+    """
+
+    def __init__(
+        self,
+        cpu_workers: Optional[int] = None,
+        io_workers: int = DEFAULT_IO_WORKERS,
+        use_processes: bool = True,
+        scan_chunk_pages: int = DEFAULT_SCAN_CHUNK_PAGES,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        cache: Optional[FileCache] = None
+    ):
+        """
+        Args:
+            cpu_workers (int): Size of the executor for layout work.
+                               Defaults to the number of CPUs.
+            io_workers (int): Number of threads for downloads and file I/O.
+            use_processes (bool): If True, layout work runs in a process
+                                  pool; otherwise in a thread pool, which
+                                  starts faster but shares one GIL.
+            scan_chunk_pages (int): Pages per chunk of a keyword scan.
+            max_sessions (int): Documents each worker keeps open.
+            cache (FileCache): Cache for S3 downloads. Defaults to the
+                               loader's cache.
+        """
+        self.cpu_workers = cpu_workers or os.cpu_count() or 1
+        self.scan_chunk_pages = max(scan_chunk_pages, 1)
+        self.max_sessions = max(max_sessions, 1)
+        self.cache = cache
+        if use_processes:
+            self._cpu_executor = ProcessPoolExecutor(max_workers=self.cpu_workers)
+        else:
+            self._cpu_executor = ThreadPoolExecutor(max_workers=self.cpu_workers, thread_name_prefix="pdf-cpu")
+        self._io_executor = ThreadPoolExecutor(max_workers=max(io_workers, 1), thread_name_prefix="pdf-io")
+        self._inflight: Dict[Hashable, _InFlight] = {}
+        self._s3_documents: Dict[str, DocumentKey] = {}
+        self._tmp_dir: Optional[str] = None
+        self._tmp_lock = threading.Lock()
+
+    async def __aenter__(self) -> "AsyncTools":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    def close(self) -> None:
+        """Shuts down the executors and removes temporary files."""
+        self._cpu_executor.shutdown(wait=True, cancel_futures=True)
+        self._io_executor.shutdown(wait=True, cancel_futures=True)
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+
+    async def aclose(self) -> None:
+        """Like close(), without blocking the event loop while workers finish."""
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    ####################################################################
+    # Request sharing
+    ####################################################################
+    async def _shared(self, request: Hashable, start: Callable[[], Awaitable]) -> Any:
+        """
+        Awaits the in-flight execution of `request`, starting it with
+        `start()` if there is none. The execution is cancelled when its
+        last waiter is cancelled.
+        """
+        entry = self._inflight.get(request)
+        if entry is None:
+            entry = _InFlight(asyncio.ensure_future(start()))
+            self._inflight[request] = entry
+            entry.task.add_done_callback(partial(self._forget, request, entry))
+        entry.waiters += 1
+        try:
+            return await asyncio.shield(entry.task)
+        finally:
+            entry.waiters -= 1
+            if entry.waiters == 0 and not entry.task.done():
+                entry.task.cancel()
+
+    def _forget(self, request: Hashable, entry: _InFlight, _task: asyncio.Future) -> None:
+        if self._inflight.get(request) is entry:
+            del self._inflight[request]
+
+    def _run_in_io(self, func: Callable, *args) -> asyncio.Future:
+        return asyncio.get_running_loop().run_in_executor(self._io_executor, func, *args)
+
+    def _submit(self, name: str, key: DocumentKey, args: Sequence, kwargs: Dict) -> asyncio.Future:
+        return asyncio.get_running_loop().run_in_executor(
+            self._cpu_executor, _run_tool, name, key, self.max_sessions, tuple(args), dict(kwargs)
+        )
+
+    ####################################################################
+    # Documents
+    ####################################################################
+    async def _resolve(self, document: Document) -> DocumentKey:
+        """Makes a document available as a local file that workers can open."""
+        if isinstance(document, str):
+            if is_s3_uri(document):
+                return await self._resolve_s3(document)
+            if not os.path.isfile(document):
+                raise FileNotFoundError(f"Local file not found: {document}")
+            return _file_key(os.path.abspath(document))
+        if isinstance(document, (bytes, bytearray, memoryview)):
+            return await self._run_in_io(self._store_bytes, bytes(document))
+        name = getattr(document, "name", None)
+        if isinstance(name, str) and os.path.isfile(name):
+            return _file_key(os.path.abspath(name))
+        return await self._run_in_io(self._store_stream, document)
+
+    async def _resolve_s3(self, uri: str) -> DocumentKey:
+        key = self._s3_documents.get(uri)
+        if key is not None and os.path.exists(key[0]):
+            return key
+        key = await self._shared(("open", uri), lambda: self._run_in_io(self._download, uri))
+        self._s3_documents[uri] = key
+        return key
+
+    def _download(self, uri: str) -> DocumentKey:
+        with open_file_from_path_or_s3(uri, use_mmap=True, cache=self.cache) as f:
+            name = getattr(f, "name", None)
+            if isinstance(name, str) and os.path.isfile(name):
+                return _file_key(name)
+            # Too large for the cache: keep a private copy
+            return self._store_bytes(f.read())
+
+    def _store_stream(self, stream: BinaryIO) -> DocumentKey:
+        position = stream.tell()
+        stream.seek(0)
+        data = stream.read()
+        stream.seek(position)
+        return self._store_bytes(data)
+
+    def _store_bytes(self, data: bytes) -> DocumentKey:
+        digest = hashlib.sha256(data).hexdigest()
+        # Held while writing, so concurrent calls with the same bytes get
+        # the same file (and the same DocumentKey)
+        with self._tmp_lock:
+            if self._tmp_dir is None:
+                self._tmp_dir = tempfile.mkdtemp(prefix="pdf-async-")
+            path = os.path.join(self._tmp_dir, digest + ".pdf")
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.write(data)
+            return _file_key(path)
+
+    ####################################################################
+    # Tools
+    ####################################################################
+    async def call(self, name: str, document: Document, *args, **kwargs) -> Any:
+        """
+        Runs the text_extraction tool `name` on a document.
+
+        Args:
+            name (str): The tool's name, e.g. "get_text_from_page".
+            document (Document): A local path, S3 URI or the PDF bytes.
+            *args: The tool's other positional arguments.
+            **kwargs: The tool's keyword arguments.
+        """
+        if name not in _DOCUMENT_ARG:
+            raise ValueError(f"Unknown tool: {name}")
+        if "workers" in kwargs:
+            raise ValueError("The workers argument is not supported; size the AsyncTools executor instead")
+        key = await self._resolve(document)
+        return await self._call_resolved(name, key, args, kwargs)
+
+    async def _call_resolved(self, name: str, key: DocumentKey, args: Sequence, kwargs: Dict) -> Any:
+        request = (name, key, _freeze(args), _freeze(kwargs))
+        return await self._shared(request, lambda: self._submit(name, key, args, kwargs))
+
+    async def find_pages_with_keyword(
+        self,
+        keyword: str,
+        document: Document,
+        start_page: int = 1,
+        end_page: int = None,
+        case_sensitive: bool = False,
+        text_mode: str = None
+    ) -> List[int]:
+        """
+        Async counterpart of text_extraction.find_pages_with_keyword. The
+        pages are scanned in chunks spread over the executor.
+        """
+        key = await self._resolve(document)
+        request = ("find_pages_with_keyword", key, keyword, start_page, end_page, case_sensitive, text_mode)
+        return await self._shared(
+            request, lambda: self._scan_keyword(key, keyword, start_page, end_page, case_sensitive, text_mode)
+        )
+
+    async def _scan_keyword(
+        self,
+        key: DocumentKey,
+        keyword: str,
+        start_page: int,
+        end_page: Optional[int],
+        case_sensitive: bool,
+        text_mode: Optional[str]
+    ) -> List[int]:
+        page_count = await self._call_resolved("get_total_page_count", key, (), {})
+        start_page = max(start_page, 1)
+        end_page = page_count if end_page is None else min(end_page, page_count)
+        if end_page < start_page:
+            return []
+        chunks = [
+            (keyword, chunk_start, chunk_end, case_sensitive)
+            for chunk_start, chunk_end in split_page_range(start_page, end_page, self.scan_chunk_pages)
+        ]
+        results = await self._map_chunks("find_pages_with_keyword", key, chunks, {"text_mode": text_mode})
+        return sorted(page for pages in results for page in pages)
+
+    async def _map_chunks(self, name: str, key: DocumentKey, chunk_args: List[Tuple], kwargs: Dict) -> List[Any]:
+        """
+        Runs a tool once per argument tuple, keeping only a few calls queued
+        or running at a time. If the caller is cancelled, the calls that have
+        not started are cancelled and no further ones are submitted.
+        """
+        window = self.cpu_workers * SCAN_CHUNKS_PER_WORKER
+        results: List[Any] = [None] * len(chunk_args)
+        pending: Dict[asyncio.Future, int] = {}
+
+        async def collect() -> None:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+
+        try:
+            for position, args in enumerate(chunk_args):
+                while len(pending) >= window:
+                    await collect()
+                pending[self._submit(name, key, args, kwargs)] = position
+            while pending:
+                await collect()
+        finally:
+            for future in pending:
+                future.cancel()
+        return results
+
+    async def prefetch(self, uris: Sequence[str], **kwargs) -> List[PrefetchResult]:
+        """
+        Warms the file cache with S3 documents (see utils.prefetch.prefetch)
+        without blocking the event loop.
+        """
+        kwargs.setdefault("cache", self.cache)
+        return await self._run_in_io(partial(prefetch, uris, **kwargs))
+
+
+def _tool_method(name: str) -> Callable:
+    position = _DOCUMENT_ARG[name]
+
+    async def method(self: AsyncTools, *args, **kwargs) -> Any:
+        args = list(args)
+        document = kwargs.pop("document") if "document" in kwargs else args.pop(position)
+        return await self.call(name, document, *args, **kwargs)
+
+    method.__name__ = method.__qualname__ = name
+    method.__doc__ = f"Async counterpart of text_extraction.{name}."
+    return method
+
+
+for _name in _DOCUMENT_ARG:
+    if not hasattr(AsyncTools, _name):
+        setattr(AsyncTools, _name, _tool_method(_name))
+del _name
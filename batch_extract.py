@@ -0,0 +1,411 @@
+"""
+Run extraction tools over many documents and stream the results.
+
+    python batch_extract.py docs/ --tools toc,page_count,tables -o results.jsonl
+    python batch_extract.py "reports/**/*.pdf" --workers 8 --timeout 300
+    python batch_extract.py s3://bucket/prefix/ -o results.jsonl --resume
+    python batch_extract.py manifest.txt --format parquet -o results.parquet
+
+The input is a directory (searched recursively for PDFs), a glob pattern, a
+manifest file with one path or s3:// URI per line, an s3://bucket/prefix,
+or a single PDF. Documents are processed on a process pool, each worker
+opening one document at a time, and one record per document is written as
+soon as it finishes:
+
+    {"uri": ..., "status": "ok" | "error" | "timeout", "pages": ...,
+     "seconds": ..., "results": {"toc": [...], ...}, "error": ...}
+
+Every finished document is appended to a checkpoint file, so a run that
+was interrupted can be continued with --resume without redoing them.
+Documents that take longer than --timeout seconds are abandoned with status
+"timeout". A throughput summary (documents and pages per second) is printed
+at the end.
+"""
+import argparse
+import glob
+import json
+import os
+import signal
+import sys
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, TextIO
+
+import text_extraction as te
+from pdf_session import PdfSession
+from profiling import DEFAULT_THRESHOLD, PROFILE_DIR_ENV, PROFILE_THRESHOLD_ENV, ProfileSettings, set_profiling
+from utils.file_loader import get_s3_client, is_s3_uri, open_file_from_path_or_s3, parse_s3_uri
+
+def _extract_toc(session: PdfSession) -> List[Dict]:
+    from pdfminer.pdfdocument import PDFNoOutlines
+    # Documents without an outline are common and not an error here
+    try:
+        return te.extract_toc(session)
+    except PDFNoOutlines:
+        return []
+
+
+# Tools that run once per document: name -> func(session)
+DOCUMENT_TOOLS: Dict[str, Callable[[PdfSession], object]] = {
+    "page_count": te.get_total_page_count,
+    "toc": _extract_toc,
+    "headers_footers": te.find_headers_and_footers,
+}
+
+# Tools that run on every page: name -> func(session, page_number). They
+# share one pass over the pages, so a page is laid out once for all of them.
+PAGE_TOOLS: Dict[str, Callable[[PdfSession, int], List]] = {
+    "blocks": te.extract_text_blocks_with_metadata,
+    "tables": te.detect_tables_on_page,
+}
+
+DEFAULT_TOOLS = ("page_count", "toc")
+
+# Documents queued per worker, so results stream out without queuing the
+# whole input at once
+PENDING_PER_WORKER = 2
+
+OUTPUT_FORMATS = ("jsonl", "parquet")
+
+# Parquet rows are written in groups of this many documents
+PARQUET_BATCH_ROWS = 256
+
+
+class DocumentTimeout(Exception):
+    """Raised inside a worker when a document exceeds its time limit."""
+
+
+########################################################################
+# Input discovery
+########################################################################
+def discover_documents(source: str) -> List[str]:
+    """
+    Expands an input argument into the list of documents to process.
+
+    Args:
+        source (str): A directory, glob pattern, manifest file,
+                      s3://bucket/prefix or a single PDF.
+
+    Returns:
+        List[str]: Local paths and S3 URIs, in a stable order.
+    """
+    if is_s3_uri(source):
+        return _list_s3_documents(source)
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "**", "*.pdf"), recursive=True))
+    if os.path.isfile(source):
+        if source.lower().endswith(".pdf"):
+            return [source]
+        return _read_manifest(source)
+    return sorted(glob.glob(source, recursive=True))
+
+
+def _read_manifest(path: str) -> List[str]:
+    """Reads one path or URI per line; blank lines and '#' comments are skipped."""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+def _list_s3_documents(uri: str) -> List[str]:
+    if uri.rstrip("/").count("/") == 2:
+        bucket, prefix = uri.rstrip("/")[len("s3://"):], ""
+    else:
+        bucket, prefix = parse_s3_uri(uri)
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    return [
+        f"s3://{bucket}/{item['Key']}"
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+        for item in page.get("Contents", [])
+        if item["Key"].lower().endswith(".pdf")
+    ]
+
+
+########################################################################
+# Worker side
+########################################################################
+def _raise_timeout(signum, frame):
+    raise DocumentTimeout()
+
+
+def process_document(uri: str, tools: Sequence[str], timeout: Optional[float] = None) -> Dict:
+    """
+    Runs the tools over one document and returns its output record. Errors
+    are reported in the record rather than raised.
+
+    Args:
+        uri (str): A local path or S3 URI.
+        tools (Sequence[str]): Names from DOCUMENT_TOOLS and PAGE_TOOLS.
+        timeout (float): Seconds after which the document is abandoned.
+                         Needs SIGALRM, so it only applies on Unix-like
+                         systems, in a process's main thread.
+    """
+    started = time.perf_counter()
+    record = {"uri": uri, "status": "ok", "pages": None, "seconds": None, "results": {}, "error": None}
+    use_alarm = bool(timeout) and hasattr(signal, "setitimer")
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with PdfSession(open_file_from_path_or_s3(uri, use_mmap=True)) as session:
+            record["pages"] = session.page_count
+            _run_tools(session, tools, record["results"])
+    except DocumentTimeout:
+        record.update(status="timeout", error=f"Exceeded {timeout} seconds")
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    record["seconds"] = round(time.perf_counter() - started, 4)
+    return record
+
+
+def _run_tools(session: PdfSession, tools: Sequence[str], results: Dict) -> None:
+    for name in tools:
+        if name in DOCUMENT_TOOLS:
+            results[name] = DOCUMENT_TOOLS[name](session)
+
+    page_tools = [name for name in tools if name in PAGE_TOOLS]
+    if not page_tools:
+        return
+    for name in page_tools:
+        results[name] = []
+    # The layout cache is bounded, so a long document does not pile up
+    # layouts; the tools after the first reuse the page's cached layout
+    for page_number, _ in session.iter_pages():
+        for name in page_tools:
+            for item in PAGE_TOOLS[name](session, page_number):
+                item.setdefault("page_number", page_number)
+                results[name].append(item)
+
+
+########################################################################
+# Output
+########################################################################
+class _JsonlWriter:
+    def __init__(self, path: Optional[str], append: bool):
+        self._file: TextIO = sys.stdout if path in (None, "-") else open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, record: Dict) -> None:
+        self._file.write(json.dumps(record, default=_json_default) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class _ParquetWriter:
+    """Writes records as rows of uri/status/pages/seconds/error plus the results as JSON."""
+
+    def __init__(self, path: str, append: bool):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+        if append and os.path.exists(path):
+            # Parquet files cannot be appended to; continue in a new part
+            stem, ext = os.path.splitext(path)
+            part = 1
+            while os.path.exists(f"{stem}-{part}{ext}"):
+                part += 1
+            path = f"{stem}-{part}{ext}"
+        self._pa = pa
+        self._schema = pa.schema([
+            ("uri", pa.string()), ("status", pa.string()), ("pages", pa.int64()),
+            ("seconds", pa.float64()), ("error", pa.string()), ("results", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._rows: List[Dict] = []
+
+    def write(self, record: Dict) -> None:
+        row = dict(record, results=json.dumps(record["results"], default=_json_default))
+        self._rows.append(row)
+        if len(self._rows) >= PARQUET_BATCH_ROWS:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+
+def _json_default(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return str(value)
+
+
+def _read_checkpoint(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+########################################################################
+# Batch driver
+########################################################################
+def run_batch(
+    documents: Sequence[str],
+    tools: Sequence[str] = DEFAULT_TOOLS,
+    output: Optional[str] = None,
+    output_format: str = "jsonl",
+    workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    checkpoint: Optional[str] = None,
+    resume: bool = False
+) -> Dict:
+    """
+    Processes documents on a process pool and writes one record per document.
+
+    Args:
+        documents (Sequence[str]): Local paths and S3 URIs.
+        tools (Sequence[str]): Names from DOCUMENT_TOOLS and PAGE_TOOLS.
+        output (str): Output file; JSONL goes to stdout if None or "-".
+        output_format (str): "jsonl" or "parquet".
+        workers (int): Worker processes. Defaults to the number of CPUs;
+                       0 processes the documents in this process.
+        timeout (float): Per-document time limit in seconds.
+        checkpoint (str): File listing finished documents. Defaults to
+                          "<output>.checkpoint" when writing to a file.
+        resume (bool): If True, documents in the checkpoint are skipped and
+                       the output is appended to.
+
+    Returns:
+        Dict: The throughput summary.
+    """
+    unknown = [name for name in tools if name not in DOCUMENT_TOOLS and name not in PAGE_TOOLS]
+    if unknown:
+        raise ValueError(f"Unknown tools: {', '.join(unknown)}")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    if output_format == "parquet" and output in (None, "-"):
+        raise ValueError("Parquet output needs an output file")
+    if checkpoint is None and output not in (None, "-"):
+        checkpoint = output + ".checkpoint"
+
+    done = _read_checkpoint(checkpoint) if (resume and checkpoint) else set()
+    pending_documents = [uri for uri in dict.fromkeys(documents) if uri not in done]
+    writer = _ParquetWriter(output, resume) if output_format == "parquet" else _JsonlWriter(output, resume)
+    checkpoint_file = open(checkpoint, "a" if resume else "w", encoding="utf-8") if checkpoint else None
+
+    summary = {"documents": 0, "ok": 0, "error": 0, "timeout": 0, "skipped": len(documents) - len(pending_documents), "pages": 0}
+    started = time.perf_counter()
+
+    def finish(record: Dict) -> None:
+        writer.write(record)
+        if checkpoint_file is not None:
+            checkpoint_file.write(record["uri"] + "\n")
+            checkpoint_file.flush()
+        summary["documents"] += 1
+        summary[record["status"]] += 1
+        summary["pages"] += record["pages"] or 0
+
+    try:
+        for record in _iter_records(pending_documents, list(tools), workers, timeout):
+            finish(record)
+    finally:
+        writer.close()
+        if checkpoint_file is not None:
+            checkpoint_file.close()
+
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 3)
+    summary["docs_per_second"] = round(summary["documents"] / elapsed, 3) if elapsed else 0.0
+    summary["pages_per_second"] = round(summary["pages"] / elapsed, 3) if elapsed else 0.0
+    return summary
+
+
+def _iter_records(documents: List[str], tools: List[str], workers: Optional[int], timeout: Optional[float]) -> Iterator[Dict]:
+    """Yields records in the order documents finish."""
+    if workers == 0:
+        for uri in documents:
+            yield process_document(uri, tools, timeout)
+        return
+
+    # Imported here so that --workers 0 runs never load multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    workers = workers or os.cpu_count() or 1
+    remaining = iter(documents)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        try:
+            while True:
+                for uri in remaining:
+                    pending.add(executor.submit(process_document, uri, tools, timeout))
+                    if len(pending) >= workers * PENDING_PER_WORKER:
+                        break
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _print_summary(summary: Dict) -> None:
+    print(
+        f"Processed {summary['documents']} documents ({summary['ok']} ok, {summary['error']} errors, "
+        f"{summary['timeout']} timeouts, {summary['skipped']} skipped from checkpoint) "
+        f"and {summary['pages']} pages in {summary['seconds']}s: "
+        f"{summary['docs_per_second']} docs/s, {summary['pages_per_second']} pages/s",
+        file=sys.stderr,
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run extraction tools over many PDF documents.")
+    parser.add_argument("input", help="Directory, glob pattern, manifest file, s3://bucket/prefix or PDF")
+    parser.add_argument(
+        "--tools", default=",".join(DEFAULT_TOOLS),
+        help=f"Comma-separated tools: {', '.join(list(DOCUMENT_TOOLS) + list(PAGE_TOOLS))}",
+    )
+    parser.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    parser.add_argument("--format", dest="output_format", choices=OUTPUT_FORMATS, default="jsonl")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count, 0: no pool)")
+    parser.add_argument("--timeout", type=float, default=None, help="Per-document time limit in seconds")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="Skip documents listed in the checkpoint")
+    parser.add_argument("--summary", default=None, help="Also write the summary as JSON to this file")
+    parser.add_argument("--profile-dir", default=None, help="Write cProfile profiles of slow tool calls here")
+    parser.add_argument("--profile-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Seconds a tool call must take for its profile to be kept")
+    args = parser.parse_args(argv)
+
+    documents = discover_documents(args.input)
+    if not documents:
+        print(f"No documents found for {args.input}", file=sys.stderr)
+        return 1
+    if args.profile_dir:
+        # Through the environment so that worker processes profile as well
+        os.environ[PROFILE_DIR_ENV] = args.profile_dir
+        os.environ[PROFILE_THRESHOLD_ENV] = str(args.profile_threshold)
+        set_profiling(ProfileSettings(args.profile_dir, args.profile_threshold))
+    summary = run_batch(
+        documents,
+        tools=[name.strip() for name in args.tools.split(",") if name.strip()],
+        output=args.output,
+        output_format=args.output_format,
+        workers=args.workers,
+        timeout=args.timeout,
+        checkpoint=args.checkpoint,
+        resume=args.resume,
+    )
+    _print_summary(summary)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return 0 if summary["error"] == 0 and summary["timeout"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Times table detection on rect-heavy pages.
+
+Generates spreadsheet-style pages with thousands of grid rectangles and
+lines plus many large candidate regions, and compares detect_tables_on_page
+(spatial index) against the previous implementation that checked every
+candidate against every text box and line. Layouts are analyzed once up
+front, so only the containment scoring is timed.
+
+    python benchmarks/bench_tables.py --pages 3 --grid 60
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import text_extraction as te
+from pdf_session import PdfSession
+from pdf_factory import build_pdf
+
+
+def make_document(pages: int, grid: int, regions: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    cell_w, cell_h = 520 / grid, 700 / grid
+    documents = []
+    for _ in range(pages):
+        rects = [
+            (40 + col * cell_w, 50 + row * cell_h, cell_w, cell_h)
+            for row in range(grid) for col in range(grid)
+        ]
+        # Large, overlapping candidate regions
+        for _ in range(regions):
+            x, y = rng.uniform(40, 300), rng.uniform(50, 400)
+            rects.append((x, y, rng.uniform(120, 260), rng.uniform(120, 340)))
+        # Grid lines drawn one cell edge at a time, as CAD exports tend to
+        lines = [
+            (40 + col * cell_w, 50 + row * cell_h, 40 + (col + 1) * cell_w, 50 + row * cell_h)
+            for row in range(grid + 1) for col in range(grid)
+        ]
+        lines += [
+            (40 + col * cell_w, 50 + row * cell_h, 40 + col * cell_w, 50 + (row + 1) * cell_h)
+            for row in range(grid) for col in range(grid + 1)
+        ]
+        texts = [
+            (42 + col * cell_w * 6, 52 + row * cell_h * 2, 5, f"{rng.randint(0, 999)}")
+            for row in range(grid // 2) for col in range(grid // 6)
+        ]
+        documents.append({"rects": rects, "lines": lines, "texts": texts})
+    return build_pdf(documents)
+
+
+def reference_detect_tables(layout, min_table_area: float, confidence_threshold: float):
+    """The previous O(R * (T + L)) scoring loop, kept for comparison."""
+    text_boxes = layout.horizontal_boxes()
+    potential_tables = []
+    for r in layout.rects:
+        area = (r[2] - r[0]) * (r[3] - r[1])
+        if area > min_table_area:
+            score = len([tb for tb in text_boxes if te._is_inside(tb.bbox, r)]) * 2
+            score += len([l for l in layout.lines if te._is_inside(l, r)])
+            confidence = 1 / (1 + math.exp(-0.1 * (score - 30)))
+            if confidence > confidence_threshold:
+                potential_tables.append({"bbox": list(r), "confidence": round(confidence, 3)})
+    return te._merge_overlapping_bboxes(potential_tables)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--grid", type=int, default=60)
+    parser.add_argument("--regions", type=int, default=300)
+    parser.add_argument("--min-area", type=float, default=10000.0)
+    args = parser.parse_args()
+
+    data = make_document(args.pages, args.grid, args.regions)
+    session = PdfSession(BytesIO(data))
+    layouts = [session.get_layout(n, te.LAParams()) for n in range(1, args.pages + 1)]
+    print(
+        f"Document: {args.pages} pages, {len(layouts[0].rects)} rects, "
+        f"{len(layouts[0].lines)} lines, {len(layouts[0].horizontal_boxes())} text boxes per page"
+    )
+
+    start = time.perf_counter()
+    expected = [reference_detect_tables(layout, args.min_area, 0.7) for layout in layouts]
+    reference = time.perf_counter() - start
+
+    for layout in layouts:
+        layout._indexes.clear()
+    start = time.perf_counter()
+    found = [te.detect_tables_on_page(session, n, args.min_area, 0.7) for n in range(1, args.pages + 1)]
+    indexed = time.perf_counter() - start
+
+    assert found == expected, "spatial index results differ from the reference"
+    print(f"reference scoring: {reference:7.3f}s")
+    print(f"  indexed scoring: {indexed:7.3f}s (index build included)")
+    print(f"speedup: {reference / indexed:.1f}x, {sum(len(t) for t in found)} tables found")
+
+
+if __name__ == "__main__":
+    main()
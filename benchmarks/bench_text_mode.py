@@ -0,0 +1,67 @@
+"""
+Compares whole-document scans in "layout" and "raw" text mode.
+
+Generates a multi-hundred-page PDF in memory and times
+find_pages_with_keyword and find_headers_and_footers in both modes, with
+layout caching disabled so every page is really analyzed.
+
+    python benchmarks/bench_text_mode.py --pages 300
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import text_extraction as te
+from pdf_session import PdfSession
+from pdf_factory import build_pdf
+
+WORDS = "risk management transparency governance model data system trust measure impact".split()
+
+
+def make_document(pages: int, lines_per_page: int = 45, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    return build_pdf([
+        {
+            "texts": [(72, 760, 9, "Framework Report")] + [
+                (72 + (i % 2) * 250, 740 - i * 15, 10, " ".join(rng.choice(WORDS) for _ in range(8)))
+                for i in range(lines_per_page)
+            ] + [(300, 30, 9, f"Page {n}")],
+        }
+        for n in range(1, pages + 1)
+    ])
+
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=300)
+    args = parser.parse_args()
+
+    data = make_document(args.pages)
+    print(f"Document: {args.pages} pages, {len(data) / 1024:.0f} KiB")
+    timings = {}
+    for mode in ("layout", "raw"):
+        session = PdfSession(BytesIO(data), layout_cache=None, text_mode=mode)
+        elapsed, pages = time_call(te.find_pages_with_keyword, "governance model", session)
+        timings[(mode, "find_pages_with_keyword")] = elapsed
+        print(f"{mode:>6} find_pages_with_keyword: {elapsed:7.2f}s ({len(pages)} pages matched)")
+        elapsed, found = time_call(te.find_headers_and_footers, session, scan_pages=args.pages)
+        timings[(mode, "find_headers_and_footers")] = elapsed
+        print(f"{mode:>6} find_headers_and_footers: {elapsed:7.2f}s (headers={found['headers']})")
+    for tool in ("find_pages_with_keyword", "find_headers_and_footers"):
+        print(f"speedup {tool}: {timings[('layout', tool)] / timings[('raw', tool)]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+A deterministic corpus of synthetic PDFs for benchmarking.
+
+Every document is generated offline from a fixed seed with
+benchmarks/pdf_factory, so the same corpus (byte for byte) is produced on every
+machine and run; `write_corpus` records each file's SHA-256 so results
+can be checked to come from the same inputs.
+
+    python benchmarks/corpus.py --out .cache/bench-corpus [--scale 0.1]
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pdf_factory import build_pdf
+
+WORDS = (
+    "risk management transparency governance model data system trust measure impact "
+    "framework policy evaluation context deployment monitoring accountability privacy"
+).split()
+
+HEADER = (72, 760, 9, "Synthetic Benchmark Report")
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _footer(page_number: int):
+    return (300, 30, 9, f"Page {page_number}")
+
+
+def text_heavy(pages: int, seed: int = 1) -> bytes:
+    """Dense single-column prose, 48 lines per page."""
+    rng = random.Random(seed)
+    return build_pdf([
+        {"texts": [HEADER] + [(72, 735 - i * 14, 10, _sentence(rng, 11)) for i in range(48)] + [_footer(n)]}
+        for n in range(1, pages + 1)
+    ])
+
+
+def multi_column(pages: int, seed: int = 2) -> bytes:
+    """Three narrow columns per page, as in journals and newsletters."""
+    rng = random.Random(seed)
+    return build_pdf([
+        {
+            "texts": [HEADER] + [
+                (50 + column * 180, 735 - i * 13, 9, _sentence(rng, 5))
+                for column in range(3) for i in range(50)
+            ] + [_footer(n)],
+        }
+        for n in range(1, pages + 1)
+    ])
+
+
+def tables(pages: int, seed: int = 3, rows: int = 30, columns: int = 8) -> bytes:
+    """Ruled grids with a value in every cell, plus a caption above each."""
+    rng = random.Random(seed)
+    cell_w, cell_h = 480 / columns, 600 / rows
+    documents = []
+    for n in range(1, pages + 1):
+        rects, lines, texts = [], [], [HEADER, (72, 720, 12, f"Table {n}", "bold"), _footer(n)]
+        for row in range(rows):
+            for column in range(columns):
+                x, y = 66 + column * cell_w, 100 + row * cell_h
+                rects.append((x, y, cell_w, cell_h))
+                texts.append((x + 3, y + 5, 8, f"{rng.randint(0, 99999)}"))
+        for row in range(rows + 1):
+            lines.append((66, 100 + row * cell_h, 546, 100 + row * cell_h))
+        rects.append((60, 94, 492, 612))
+        documents.append({"texts": texts, "rects": rects, "lines": lines})
+    return build_pdf(documents)
+
+
+def deep_outline(pages: int, seed: int = 4, depth: int = 6, fanout: int = 3) -> bytes:
+    """A short document whose outline nests `depth` levels deep."""
+    rng = random.Random(seed)
+
+    def level(prefix: str, remaining: int) -> List[Dict]:
+        entries = []
+        for i in range(1, fanout + 1):
+            title = f"{prefix}{i}"
+            entry = {"title": f"Section {title}", "page": rng.randint(1, pages)}
+            if remaining > 1:
+                entry["children"] = level(title + ".", remaining - 1)
+            entries.append(entry)
+        return entries
+
+    return build_pdf(
+        [{"texts": [HEADER, (72, 700, 18, f"Chapter {n}", "bold"), (72, 660, 11, _sentence(rng, 10)), _footer(n)]}
+         for n in range(1, pages + 1)],
+        outline=level("", depth),
+    )
+
+
+def long_document(pages: int, seed: int = 5) -> bytes:
+    """Many light pages, to exercise page-tree walking and whole-document scans."""
+    rng = random.Random(seed)
+    return build_pdf([
+        {"texts": [HEADER] + [(72, 700 - i * 16, 10, _sentence(rng, 9)) for i in range(12)] + [_footer(n)]}
+        for n in range(1, pages + 1)
+    ])
+
+
+def embedded_fonts(pages: int, seed: int = 6, font_bytes: int = 4 * 1024 * 1024) -> bytes:
+    """Text in a font with a large embedded font program."""
+    rng = random.Random(seed)
+    return build_pdf(
+        [
+            {"texts": [HEADER] + [(72, 735 - i * 14, 10, _sentence(rng, 10), "embedded") for i in range(40)] + [_footer(n)]}
+            for n in range(1, pages + 1)
+        ],
+        embedded_font_size=font_bytes,
+    )
+
+
+# name -> (generator, page count at scale 1.0)
+DOCUMENTS: Dict[str, tuple] = {
+    "text_heavy": (text_heavy, 200),
+    "multi_column": (multi_column, 100),
+    "tables": (tables, 40),
+    "deep_outline": (deep_outline, 120),
+    "long_document": (long_document, 1200),
+    "embedded_fonts": (embedded_fonts, 30),
+}
+
+
+def build_document(name: str, scale: float = 1.0) -> bytes:
+    """Generates one corpus document; page counts are scaled (at least 2 pages)."""
+    generator, pages = DOCUMENTS[name]
+    return generator(max(2, int(pages * scale)))
+
+
+def write_corpus(out_dir: str, scale: float = 1.0, names: List[str] = None) -> Dict[str, Dict]:
+    """
+    Writes the corpus to `out_dir` and returns a manifest of name ->
+    {"path", "pages", "bytes", "sha256"}. Files that already exist with the
+    expected contents are left alone.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+    for name in names or list(DOCUMENTS):
+        data = build_document(name, scale)
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.join(out_dir, f"{name}.pdf")
+        if not os.path.exists(path) or _file_sha256(path) != digest:
+            with open(path, "wb") as f:
+                f.write(data)
+        manifest[name] = {
+            "path": path,
+            "pages": max(2, int(DOCUMENTS[name][1] * scale)),
+            "bytes": len(data),
+            "sha256": digest,
+        }
+    return manifest
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate the synthetic benchmark corpus.")
+    parser.add_argument("--out", default=os.path.join(".cache", "bench-corpus"))
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for every document's page count")
+    args = parser.parse_args()
+    print(json.dumps(write_corpus(args.out, args.scale), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Small, dependency-free PDF writer that builds synthetic documents on the fly,
+for the tests and the benchmark corpus.
+
+Only the handful of features the tools care about are supported: text drawn
+with the standard Helvetica fonts (or one synthetic embedded font), stroked
+rectangles and lines, and an optional, possibly nested document outline.
+"""
+import random
+from typing import Dict, List, Optional, Tuple
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_content(page: Dict) -> bytes:
+    ops = []
+    for x, y, w, h in page.get("rects", []):
+        ops.append(f"{x} {y} {w} {h} re S")
+    for x0, y0, x1, y1 in page.get("lines", []):
+        ops.append(f"{x0} {y0} m {x1} {y1} l S")
+    for item in page.get("texts", []):
+        x, y, size, text = item[:4]
+        style = item[4] if len(item) > 4 else None
+        font = {"bold": "F2", "embedded": "F3"}.get(style, "F1")
+        ops.append(f"BT /{font} {size} Tf {x} {y} Td ({_escape(text)}) Tj ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def build_pdf(
+    pages: List[Dict],
+    outline: Optional[List[Dict]] = None,
+    page_size: tuple = (612, 792),
+    embedded_font_size: int = 0,
+) -> bytes:
+    """
+    Builds a PDF document and returns its bytes.
+
+    Args:
+        pages (List[Dict]): One dict per page with optional keys
+            'texts' (list of (x, y, size, text[, 'bold' | 'embedded'])), 'rects'
+            (list of (x, y, w, h)), 'lines' (list of (x0, y0, x1, y1)) and
+            'mediabox' (x0, y0, x1, y1).
+        outline (List[Dict]): Optional outline entries, each with 'title'
+            and 'page' (1-based) keys and optionally 'children', a list of
+            nested entries.
+        page_size (tuple): Default page width and height in points.
+        embedded_font_size (int): If set, adds a TrueType font whose
+            embedded font program is this many (seeded random) bytes, used
+            by texts with the 'embedded' style.
+
+    Returns:
+        bytes: The encoded PDF file.
+    """
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(b"")
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    bold_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold >>")
+    fonts = f"/F1 {font_id} 0 R /F2 {bold_id} 0 R"
+    if embedded_font_size:
+        program = random.Random(embedded_font_size).randbytes(embedded_font_size)
+        program_id = add(
+            b"<< /Length %d /Length1 %d >>\nstream\n" % (len(program), len(program)) + program + b"\nendstream"
+        )
+        descriptor_id = add(
+            (
+                "<< /Type /FontDescriptor /FontName /BenchSans /Flags 32 /FontBBox [0 -200 1000 900] "
+                "/ItalicAngle 0 /Ascent 900 /Descent -200 /CapHeight 700 /StemV 80 /MissingWidth 500 "
+                "/FontFile2 %d 0 R >>" % program_id
+            ).encode("latin-1")
+        )
+        embedded_id = add(
+            (
+                "<< /Type /Font /Subtype /TrueType /BaseFont /BenchSans /FirstChar 32 /LastChar 126 "
+                "/Widths [%s] /FontDescriptor %d 0 R /Encoding /WinAnsiEncoding >>"
+                % (" ".join(["500"] * 95), descriptor_id)
+            ).encode("latin-1")
+        )
+        fonts += f" /F3 {embedded_id} 0 R"
+
+    page_ids = []
+    for page in pages:
+        content = _page_content(page)
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        mediabox = page.get("mediabox", (0, 0) + tuple(page_size))
+        page_id = add(
+            (
+                "<< /Type /Page /Parent %d 0 R /MediaBox [%s] "
+                "/Resources << /Font << %s >> >> /Contents %d 0 R >>"
+                % (pages_id, " ".join(str(v) for v in mediabox), fonts, content_id)
+            ).encode("latin-1")
+        )
+        page_ids.append(page_id)
+
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects[pages_id - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode("latin-1")
+
+    catalog = f"<< /Type /Catalog /Pages {pages_id} 0 R"
+    if outline:
+        outlines_id = add(b"")
+        first_id, last_id, count = _add_outline_items(outline, outlines_id, page_ids, add, objects)
+        objects[outlines_id - 1] = (
+            f"<< /Type /Outlines /First {first_id} 0 R /Last {last_id} 0 R /Count {count} >>"
+        ).encode("latin-1")
+        catalog += f" /Outlines {outlines_id} 0 R"
+    objects[catalog_id - 1] = (catalog + " >>").encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset
+    )
+    return bytes(out)
+
+
+def _add_outline_items(entries: List[Dict], parent_id: int, page_ids: List[int], add, objects: List[bytes]) -> Tuple[int, int, int]:
+    """Adds one outline level (and its children); returns (first id, last id, item count)."""
+    item_ids = [add(b"") for _ in entries]
+    count = len(entries)
+    for i, (item_id, entry) in enumerate(zip(item_ids, entries)):
+        links = [f"/Parent {parent_id} 0 R"]
+        if i > 0:
+            links.append(f"/Prev {item_ids[i - 1]} 0 R")
+        if i < len(item_ids) - 1:
+            links.append(f"/Next {item_ids[i + 1]} 0 R")
+        if entry.get("children"):
+            first_id, last_id, child_count = _add_outline_items(entry["children"], item_id, page_ids, add, objects)
+            links.append(f"/First {first_id} 0 R /Last {last_id} 0 R /Count {child_count}")
+            count += child_count
+        target = page_ids[entry["page"] - 1]
+        objects[item_id - 1] = (
+            f"<< /Title ({_escape(entry['title'])}) {' '.join(links)} "
+            f"/Dest [{target} 0 R /Fit] >>"
+        ).encode("latin-1")
+    return item_ids[0], item_ids[-1], count
@@ -0,0 +1,286 @@
+"""
+Times the public tools on the synthetic benchmark corpus.
+
+Generates the corpus (see benchmarks/corpus.py) and times every public
+function of text_extraction, plus open_file_from_path_or_s3 on local files
+and on a stubbed S3 client, without any network access, and the cold
+import time of the tool modules. Each tool case runs on a fresh PdfSession
+without a layout cache, so every iteration measures cold layout analysis;
+opening and parsing the document is not timed.
+
+Results are written as JSON together with the corpus checksums and the
+environment, and can be compared with an earlier run:
+
+    python benchmarks/run_benchmarks.py --scale 0.25 -o bench.json
+    python benchmarks/run_benchmarks.py --scale 0.25 --compare bench.json --fail-on-regression
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pdfminer
+
+import corpus
+import text_extraction as te
+from pdf_session import PdfSession
+from s3_stub import StubS3Client
+from utils import file_loader
+from utils.file_cache import FileCache
+
+RESULTS_SCHEMA = 1
+
+# Public text_extraction functions that are placeholders without document access
+NOT_BENCHMARKED = {
+    "identify_toc_candidate_lines": "placeholder",
+    "parse_toc_line": "placeholder",
+    "get_indentation_level": "placeholder",
+    "find_potential_headers": "placeholder",
+    "extract_table_from_bbox_as_json": "placeholder",
+}
+
+
+@dataclass
+class Case:
+    """One timed call. `run` gets a fresh session (or the document path if `uses_path`)."""
+    name: str
+    function: str
+    document: Optional[str]
+    run: Callable[[Any], Any]
+    uses_path: bool = False
+
+
+def _middle(pages: int) -> int:
+    return max(1, pages // 2)
+
+
+def _first_block(session: PdfSession, page_number: int, prefix: str) -> List[float]:
+    block = next(b for b in te.extract_text_blocks_with_metadata(session, page_number) if b["text"].startswith(prefix))
+    return list(block["bbox"])
+
+
+def build_cases(manifest: Dict[str, Dict]) -> List[Case]:
+    pages = {name: entry["pages"] for name, entry in manifest.items()}
+    mid_text = _middle(pages["text_heavy"])
+    mid_table = _middle(pages["tables"])
+    table_region = (60, 94, 552, 706)
+    table_cells = [(66 + column * 60, 100, 126 + column * 60, 700) for column in range(8)]
+    chapter = _middle(pages["deep_outline"])
+    # Found once up front, so the section cases only time the section tools
+    with PdfSession(open(manifest["deep_outline"]["path"], "rb"), layout_cache=None) as session:
+        header_bbox = _first_block(session, chapter, "Chapter")
+
+    return [
+        Case("page_count", "get_total_page_count", "long_document", te.get_total_page_count),
+        Case("page_text", "get_text_from_page", "text_heavy", lambda s: te.get_text_from_page(s, mid_text)),
+        Case("page_text_embedded_font", "get_text_from_page", "embedded_fonts", lambda s: te.get_text_from_page(s, 1)),
+        Case("text_blocks_multi_column", "extract_text_blocks_with_metadata", "multi_column",
+             lambda s: te.extract_text_blocks_with_metadata(s, 1)),
+        Case("iter_text_blocks", "iter_text_blocks", "text_heavy", lambda s: sum(1 for _ in te.iter_text_blocks(s))),
+        Case("toc_deep_outline", "extract_toc", "deep_outline", te.extract_toc),
+        Case("keyword_scan", "find_pages_with_keyword", "long_document",
+             lambda s: te.find_pages_with_keyword("governance model", s)),
+        Case("terms_index", "find_pages_with_terms", "long_document",
+             lambda s: te.find_pages_with_terms(["governance", "privacy"], s)),
+        Case("headers_footers", "find_headers_and_footers", "text_heavy", te.find_headers_and_footers),
+        Case("headers_footers_sampled", "find_headers_and_footers", "long_document",
+             lambda s: te.find_headers_and_footers(s, sample=True)),
+        Case("text_between_y", "get_text_between_y_coordinates", "text_heavy",
+             lambda s: te.get_text_between_y_coordinates(s, mid_text, 600, 200)),
+        Case("text_following_header", "get_text_following_header", "deep_outline",
+             lambda s: te.get_text_following_header(s, chapter, header_bbox)),
+        Case("section_text", "extract_section_text", "deep_outline",
+             lambda s: te.extract_section_text(s, chapter, header_bbox, max_pages=5)),
+        Case("tables", "detect_tables_on_page", "tables", lambda s: te.detect_tables_on_page(s, mid_table)),
+        Case("text_in_bbox", "extract_text_in_bbox", "tables", lambda s: te.extract_text_in_bbox(s, mid_table, table_region)),
+        Case("text_in_bboxes", "extract_text_in_bboxes", "tables", lambda s: te.extract_text_in_bboxes(s, mid_table, table_cells)),
+        Case("parse_text_into_table", "parse_text_into_table", "tables",
+             lambda s: te.parse_text_into_table(te.extract_text_in_bbox(s, mid_table, table_region))),
+        Case("open_local", "open_file_from_path_or_s3", "embedded_fonts", _open_and_read(use_mmap=False), uses_path=True),
+        Case("open_local_mmap", "open_file_from_path_or_s3", "embedded_fonts", _open_and_read(use_mmap=True), uses_path=True),
+        Case("open_s3_download", "open_file_from_path_or_s3", "embedded_fonts", _open_from_stub_s3(cached=False), uses_path=True),
+        Case("open_s3_cached", "open_file_from_path_or_s3", "embedded_fonts", _open_from_stub_s3(cached=True), uses_path=True),
+        Case("import_text_extraction", "import", None, _cold_import("text_extraction"), uses_path=True),
+        Case("import_file_loader", "import", None, _cold_import("utils.file_loader"), uses_path=True),
+        Case("import_batch_extract", "import", None, _cold_import("batch_extract"), uses_path=True),
+    ]
+
+
+def _open_and_read(use_mmap: bool) -> Callable[[str], int]:
+    def run(path: str) -> int:
+        with file_loader.open_file_from_path_or_s3(path, use_mmap=use_mmap) as f:
+            return len(f.read())
+    return run
+
+
+def _open_from_stub_s3(cached: bool) -> Callable[[str], int]:
+    """Opens the document through an in-memory S3 stub, into a throwaway cache."""
+    def run(path: str) -> int:
+        with open(path, "rb") as f:
+            client = StubS3Client({("bench", "doc.pdf"): f.read()})
+        original = file_loader.get_s3_client
+        file_loader.get_s3_client = lambda: client
+        try:
+            with tempfile.TemporaryDirectory() as cache_dir:
+                cache = FileCache(cache_dir)
+                if cached:
+                    file_loader.open_file_from_path_or_s3("s3://bench/doc.pdf", cache=cache).close()
+                started = time.perf_counter()
+                with file_loader.open_file_from_path_or_s3("s3://bench/doc.pdf", cache=cache) as f:
+                    size = len(f.read())
+                # The stub setup is not part of the measurement
+                run.elapsed = time.perf_counter() - started
+                return size
+        finally:
+            file_loader.get_s3_client = original
+    return run
+
+
+def _cold_import(module: str) -> Callable[[Optional[str]], int]:
+    """Imports `module` in a fresh interpreter and times it with -X importtime."""
+    def run(path: Optional[str]) -> int:
+        stderr = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stderr
+        modules = [line.split("|") for line in stderr.splitlines() if line.startswith("import time:") and "cumulative" not in line]
+        # Interpreter startup is not part of the measurement
+        run.elapsed = next(int(cumulative) for _, cumulative, name in modules if name.strip() == module) / 1e6
+        return len(modules)
+    return run
+
+
+def time_case(case: Case, path: str, iterations: int) -> Dict:
+    timings = []
+    result = None
+    for _ in range(iterations):
+        if case.uses_path:
+            started = time.perf_counter()
+            result = case.run(path)
+            elapsed = time.perf_counter() - started
+            elapsed = getattr(case.run, "elapsed", elapsed)
+        else:
+            with PdfSession(open(path, "rb"), layout_cache=None) as session:
+                started = time.perf_counter()
+                result = case.run(session)
+                elapsed = time.perf_counter() - started
+        timings.append(elapsed)
+    return {
+        "name": case.name,
+        "function": case.function,
+        "document": case.document,
+        "iterations": iterations,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "max": max(timings),
+        "result_size": result if isinstance(result, int) else len(result) if hasattr(result, "__len__") else None,
+    }
+
+
+def _environment() -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pdfminer": getattr(pdfminer, "__version__", None),
+        "git_commit": commit,
+    }
+
+
+def run_benchmarks(scale: float, iterations: int, corpus_dir: str, only: Optional[List[str]] = None) -> Dict:
+    manifest = corpus.write_corpus(corpus_dir, scale)
+    cases = [case for case in build_cases(manifest) if not only or any(pattern in case.name for pattern in only)]
+    results = []
+    for case in cases:
+        result = time_case(case, manifest[case.document]["path"] if case.document else None, iterations)
+        print(f"{case.name:<28} {case.document or '-':<16} median {result['median'] * 1000:10.2f} ms", file=sys.stderr)
+        results.append(result)
+    return {
+        "schema": RESULTS_SCHEMA,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "scale": scale,
+        "iterations": iterations,
+        "environment": _environment(),
+        "corpus": {name: {k: v for k, v in entry.items() if k != "path"} for name, entry in manifest.items()},
+        "not_benchmarked": NOT_BENCHMARKED,
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Prints the ratio of each case's fastest iteration to the baseline's and
+    returns the names of the cases that regressed. The minimum is compared
+    rather than the median because it is the least affected by noise from
+    other processes.
+    """
+    if current["corpus"] != baseline.get("corpus"):
+        print("Warning: The corpus differs from the baseline's (other scale or generator); ratios may not be meaningful.",
+              file=sys.stderr)
+    previous = {result["name"]: result for result in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get(result["name"])
+        if old is None or not old["min"]:
+            continue
+        ratio = result["min"] / old["min"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(result["name"])
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{result['name']:<28} {old['min'] * 1000:10.2f} ms -> {result['min'] * 1000:10.2f} ms  x{ratio:5.2f}{flag}",
+              file=sys.stderr)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time the public tools on the synthetic corpus.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for every document's page count")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--corpus-dir", default=os.path.join(ROOT, ".cache", "bench-corpus"))
+    parser.add_argument("--only", action="append", help="Only run cases whose name contains this (repeatable)")
+    parser.add_argument("-o", "--output", default=None, help="Write the results as JSON to this file")
+    parser.add_argument("--compare", default=None, help="A previous results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.scale, args.iterations, os.path.join(args.corpus_dir, f"scale-{args.scale:g}"), args.only)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+An in-memory stand-in for the parts of the boto3 S3 client the loaders use,
+so the tests and benchmarks run without network access.
+"""
+import io
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+
+class StubS3Client:
+    """Serves get_object (with Range and IfMatch) and head_object from bytes, like S3 does."""
+
+    def __init__(self, objects: Dict[Tuple[str, str], bytes] = None):
+        self.objects: Dict[Tuple[str, str], bytes] = dict(objects or {})
+        self.versions: Dict[Tuple[str, str], int] = {k: 1 for k in self.objects}
+        self.calls = []
+        self.ranges = []
+
+    def put(self, bucket: str, key: str, data: bytes) -> None:
+        self.objects[(bucket, key)] = data
+        self.versions[(bucket, key)] = self.versions.get((bucket, key), 0) + 1
+
+    def _etag(self, bucket: str, key: str) -> str:
+        return f'"v{self.versions[(bucket, key)]}"'
+
+    def head_object(self, Bucket, Key):
+        self.calls.append(("head_object", Key))
+        return self._head(Bucket, Key)
+
+    def _head(self, Bucket, Key):
+        data = self.objects[(Bucket, Key)]
+        return {
+            "ETag": self._etag(Bucket, Key),
+            "ContentLength": len(data),
+            "LastModified": datetime(2024, 1, self.versions[(Bucket, Key)], tzinfo=timezone.utc),
+        }
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        self.calls.append(("get_object", Key))
+        data = self.objects[(Bucket, Key)]
+        etag = self._etag(Bucket, Key)
+        if IfMatch is not None and IfMatch != etag:
+            raise RuntimeError("PreconditionFailed")
+        response = self._head(Bucket, Key)
+        if Range is None:
+            response.update(Body=io.BytesIO(data))
+            return response
+        self.ranges.append(Range)
+        size = len(data)
+        if size == 0:
+            from botocore.exceptions import ClientError
+            raise ClientError({"Error": {"Code": "InvalidRange"}}, "GetObject")
+        first, last = Range[len("bytes="):].split("-")
+        if first == "":
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start, end = int(first), min(int(last), size - 1)
+        response.update(
+            Body=io.BytesIO(data[start:end + 1]),
+            ContentRange=f"bytes {start}-{end}/{size}",
+            ContentLength=end - start + 1,
+        )
+        return response
@@ -0,0 +1,335 @@
+"""
+Stage timings and counters for tool calls.
+
+Every public tool records how long its call took and how that time splits
+into stages, plus counters such as pages laid out and bytes fetched:
+
+    parse        xref table, trailer and catalog (PdfSession creation)
+    interpret    content-stream interpretation (PDFPageInterpreter.process_page)
+    layout       pdfminer's layout analysis (LAParams grouping)
+    convert      building compact PageLayouts from pdfminer's objects
+    store        reading and writing the on-disk layout store
+    s3_fetch     S3 requests and reading their bodies
+    postprocess  the tool's own work: font stats, sorting, table scoring, ...
+
+Stage times are exclusive: time spent in a nested stage is not counted
+again in the enclosing one, so the stages of a call add up to its total.
+Everything is labelled with the tool being called.
+
+Measurements go to a MetricsSink. The default NullSink drops them without
+taking any timings; install a PrometheusSink (or a CallbackSink feeding
+another system) to collect them:
+
+    sink = PrometheusSink()
+    set_metrics_sink(sink)
+    sink.serve(9464)             # scrape http://127.0.0.1:9464/metrics
+    ...
+    print(sink.render())          # or write_textfile() for a textfile collector
+
+Worker processes started by `workers=` have their own (default) sink.
+"""
+import functools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from profiling import get_profile_settings, profile_call
+
+Labels = Dict[str, str]
+
+# Prefix of every exported metric name
+METRIC_PREFIX = "pdfdocintel_"
+
+# Histogram bucket upper bounds for durations, in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+########################################################################
+# Sinks
+########################################################################
+class MetricsSink:
+    """
+    Receives durations and counter increments. Subclasses override
+    `observe` and `increment`; `enabled = False` tells the instrumented
+    code not to take measurements at all.
+    """
+    enabled = True
+
+    def observe(self, name: str, seconds: float, labels: Labels) -> None:
+        """Records a duration, e.g. name="stage_seconds"."""
+
+    def increment(self, name: str, value: float, labels: Labels) -> None:
+        """Adds to a counter, e.g. name="pages_laid_out"."""
+
+
+class NullSink(MetricsSink):
+    """Discards everything; the default."""
+    enabled = False
+
+
+class CallbackSink(MetricsSink):
+    """Forwards every measurement to callbacks, e.g. to bridge to OpenTelemetry."""
+
+    def __init__(
+        self,
+        on_observe: Optional[Callable[[str, float, Labels], None]] = None,
+        on_increment: Optional[Callable[[str, float, Labels], None]] = None
+    ):
+        self.on_observe = on_observe
+        self.on_increment = on_increment
+
+    def observe(self, name: str, seconds: float, labels: Labels) -> None:
+        if self.on_observe is not None:
+            self.on_observe(name, seconds, labels)
+
+    def increment(self, name: str, value: float, labels: Labels) -> None:
+        if self.on_increment is not None:
+            self.on_increment(name, value, labels)
+
+
+class PrometheusSink(MetricsSink):
+    """
+    Aggregates measurements in memory and renders them in the Prometheus
+    text exposition format: durations as histograms, counters as counters.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets (Sequence[float]): Histogram bucket upper bounds in seconds.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # (name, sorted labels) -> [bucket counts..., sum, count]
+        self._histograms: Dict[Tuple[str, Tuple], List[float]] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+
+    def observe(self, name: str, seconds: float, labels: Labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            values = self._histograms.get(key)
+            if values is None:
+                values = self._histograms[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    values[i] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    def increment(self, name: str, value: float, labels: Labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Returns {"durations": {(name, labels): (count, sum)}, "counters":
+        {(name, labels): value}}, with labels as sorted (key, value) tuples.
+        """
+        with self._lock:
+            return {
+                "durations": {key: (values[-1], values[-2]) for key, values in self._histograms.items()},
+                "counters": dict(self._counters),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        lines = []
+        typed = set()
+        for (name, labels), values in histograms:
+            metric = METRIC_PREFIX + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{metric}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {_format_value(count)}")
+            lines.append(f"{metric}_bucket{_format_labels(labels + (('le', '+Inf'),))} {_format_value(values[-1])}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {_format_value(values[-1])}")
+        for (name, labels), value in counters:
+            metric = METRIC_PREFIX + name + "_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """
+        Writes the metrics atomically to a file, for node_exporter's textfile
+        collector or any agent that tails a metrics file.
+        """
+        import tempfile
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def serve(self, port: int = 0, addr: str = "127.0.0.1") -> "ThreadingHTTPServer":
+        """
+        Serves the metrics at http://<addr>:<port>/metrics from a daemon
+        thread. Port 0 picks a free port (see `server.server_address`).
+        Call `shutdown()` on the returned server to stop it.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        sink = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((addr, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+########################################################################
+# Current sink
+########################################################################
+NULL_SINK = NullSink()
+
+_default_sink: MetricsSink = NULL_SINK
+_scoped_sink: ContextVar[Optional[MetricsSink]] = ContextVar("scoped_sink", default=None)
+_current_tool: ContextVar[Optional[str]] = ContextVar("current_tool", default=None)
+# Time spent in nested stages of the innermost running stage
+_stage_frame: ContextVar[Optional[List[float]]] = ContextVar("stage_frame", default=None)
+
+
+def set_metrics_sink(sink: Optional[MetricsSink]) -> None:
+    """Installs the process-wide sink; None restores the NullSink."""
+    global _default_sink
+    _default_sink = sink if sink is not None else NULL_SINK
+
+
+def get_metrics_sink() -> MetricsSink:
+    """Returns the sink of the current context, or the process-wide one."""
+    return _scoped_sink.get() or _default_sink
+
+
+@contextmanager
+def use_metrics_sink(sink: MetricsSink) -> Iterator[MetricsSink]:
+    """Sends measurements in this context (thread or task) to `sink`."""
+    token = _scoped_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _scoped_sink.reset(token)
+
+
+def _labels(**extra: str) -> Labels:
+    tool = _current_tool.get()
+    labels = {"tool": tool} if tool is not None else {}
+    labels.update(extra)
+    return labels
+
+
+########################################################################
+# Recording
+########################################################################
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Times the enclosed block as a stage, excluding nested stages."""
+    sink = get_metrics_sink()
+    if not sink.enabled:
+        yield
+        return
+    parent = _stage_frame.get()
+    frame = [0.0]
+    token = _stage_frame.set(frame)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _stage_frame.reset(token)
+        if parent is not None:
+            parent[0] += elapsed
+        sink.observe("stage_seconds", max(elapsed - frame[0], 0.0), _labels(stage=name))
+
+
+def count(name: str, value: float = 1) -> None:
+    """Adds `value` to a counter, labelled with the current tool."""
+    sink = get_metrics_sink()
+    if sink.enabled:
+        sink.increment(name, value, _labels())
+
+
+def instrumented(func: Callable) -> Callable:
+    """
+    Records a tool's calls, errors and total duration, and labels the
+    stages it runs with its name. Calls made from inside another tool are
+    counted as part of the outer call. Also profiles the call when
+    profiling is on (see profiling.py).
+    """
+    tool = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        call = func
+        settings = get_profile_settings()
+        if settings is not None:
+            call = functools.partial(profile_call, settings, func)
+        sink = get_metrics_sink()
+        if not sink.enabled or _current_tool.get() is not None:
+            return call(*args, **kwargs)
+        token = _current_tool.set(tool)
+        started = time.perf_counter()
+        try:
+            with stage("postprocess"):
+                return call(*args, **kwargs)
+        except Exception:
+            sink.increment("tool_errors", 1, {"tool": tool})
+            raise
+        finally:
+            sink.observe("tool_seconds", time.perf_counter() - started, {"tool": tool})
+            sink.increment("tool_calls", 1, {"tool": tool})
+            _current_tool.reset(token)
+
+    return wrapper
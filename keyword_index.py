@@ -0,0 +1,265 @@
+"""
+An inverted index over the text of a document's pages.
+
+Agents tend to search the same document for many different terms. Building
+a KeywordIndex lays out every page once; afterwards keyword, multi-term and
+phrase queries are answered from the index without any layout analysis.
+"""
+import re
+from collections import defaultdict
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from pdf_session import PdfSession, LayoutSettings, default_laparams, laparams_key
+from page_map import map_pages
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Name of the index entry in the session's LayoutStore
+INDEX_ENTRY_NAME = "keyword_index"
+
+# Bumped whenever the serialized form changes
+INDEX_VERSION = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into normalized (lower-cased) word tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _page_box_texts(session: PdfSession, page_number: int, laparams: LayoutSettings) -> List[str]:
+    layout = session.get_layout(page_number, laparams)
+    return [element.get_text() for element in layout.text_boxes]
+
+
+class KeywordIndex:
+    """
+    Maps each normalized token to the pages it occurs on, with the token's
+    positions in the page's token stream for phrase queries. The text of each
+    page's text boxes is kept too, so plain substring searches can be
+    verified exactly and keep `find_pages_with_keyword` semantics.
+    """
+
+    def __init__(self, page_texts: Dict[int, List[str]], settings_key: Optional[Tuple] = None):
+        """
+        Args:
+            page_texts (Dict[int, List[str]]): The text of every text box, per
+                                               1-based page number.
+            settings_key (Tuple): `laparams_key` of the layout settings the
+                                  text was extracted with.
+        """
+        self.page_texts = page_texts
+        self.settings_key = settings_key
+        self._lower_texts: Dict[int, List[str]] = {}
+        self.postings: Dict[str, Dict[int, List[int]]] = defaultdict(dict)
+        for page_number in sorted(page_texts):
+            position = 0
+            for text in page_texts[page_number]:
+                for token in tokenize(text):
+                    self.postings[token].setdefault(page_number, []).append(position)
+                    position += 1
+        self.postings = dict(self.postings)
+        # Candidate pages per query token, see `_pages_with_token_fragment`
+        self._fragment_pages: Dict[str, Set[int]] = {}
+
+    @classmethod
+    def build(
+        cls,
+        source,
+        start_page: int = 1,
+        end_page: int = None,
+        workers: int = None,
+        laparams: LayoutSettings = None
+    ) -> "KeywordIndex":
+        """
+        Builds an index in one pass over a page range.
+
+        Args:
+            source: A file path, PDF bytes, binary stream or PdfSession.
+            start_page (int): The 1-based first page to index.
+            end_page (int): The 1-based last page to index (inclusive).
+            workers (int): Number of worker processes used for layout.
+            laparams (LayoutSettings): Layout settings for the page text.
+                                       Defaults to LAParams().
+        """
+        if laparams is None:
+            laparams = default_laparams()
+        page_results = map_pages(
+            partial(_page_box_texts, laparams=laparams), source, start_page, end_page, workers=workers
+        )
+        return cls(dict(page_results), laparams_key(laparams))
+
+    @property
+    def pages(self) -> List[int]:
+        """The page numbers covered by the index."""
+        return sorted(self.page_texts)
+
+    def covers(self, start_page: int, end_page: Optional[int]) -> bool:
+        """Checks whether every existing page of the range is indexed."""
+        pages = self.page_texts
+        if not pages:
+            return False
+        last_page = max(pages)
+        end_page = last_page if end_page is None else min(end_page, last_page)
+        return all(page_number in pages for page_number in range(max(start_page, 1), end_page + 1))
+
+    ####################################################################
+    # Queries
+    ####################################################################
+    def pages_with_token(self, token: str) -> List[int]:
+        """Returns the sorted pages containing a whole, normalized token."""
+        return sorted(self.postings.get(token.lower(), ()))
+
+    def search(self, terms: Iterable[str], match_all: bool = True) -> List[int]:
+        """
+        Multi-term query over whole words.
+
+        Args:
+            terms (Iterable[str]): Words (or phrases) to look for.
+            match_all (bool): If True, pages must contain every term;
+                              otherwise any term is enough.
+
+        Returns:
+            List[int]: A sorted list of matching 1-based page numbers.
+        """
+        page_sets = [set(self.find_phrase(term)) for term in terms]
+        if not page_sets:
+            return []
+        pages = set.intersection(*page_sets) if match_all else set.union(*page_sets)
+        return sorted(pages)
+
+    def find_phrase(self, phrase: str) -> List[int]:
+        """
+        Returns the pages on which the phrase's words appear consecutively,
+        ignoring case and punctuation between words.
+        """
+        tokens = tokenize(phrase)
+        if not tokens:
+            return []
+        postings = [self.postings.get(token) for token in tokens]
+        if any(p is None for p in postings):
+            return []
+
+        # Only pages containing every token can match
+        candidates = set(postings[0])
+        for p in postings[1:]:
+            candidates &= set(p)
+
+        found = []
+        for page_number in sorted(candidates):
+            following = [set(p[page_number]) for p in postings[1:]]
+            for start in postings[0][page_number]:
+                if all(start + offset + 1 in positions for offset, positions in enumerate(following)):
+                    found.append(page_number)
+                    break
+        return found
+
+    def _pages_with_token_fragment(self, fragment: str) -> Set[int]:
+        """Pages with a token that contains `fragment` (memoized per fragment)."""
+        if fragment not in self._fragment_pages:
+            pages: Set[int] = set()
+            for token, token_pages in self.postings.items():
+                if fragment in token:
+                    pages.update(token_pages)
+            self._fragment_pages[fragment] = pages
+        return self._fragment_pages[fragment]
+
+    def find_substring(
+        self,
+        keyword: str,
+        case_sensitive: bool = False,
+        start_page: int = 1,
+        end_page: int = None
+    ) -> List[int]:
+        """
+        Finds pages where `keyword` occurs inside a single text box, with the
+        same semantics as `find_pages_with_keyword`.
+
+        Every word of the keyword must appear inside some token of a matching
+        page, so the postings narrow the candidates before the box texts are
+        checked exactly.
+        """
+        candidates = set(self.page_texts)
+        for fragment in tokenize(keyword):
+            candidates &= self._pages_with_token_fragment(fragment)
+            if not candidates:
+                return []
+
+        search_keyword = keyword if case_sensitive else keyword.lower()
+        found = []
+        for page_number in sorted(candidates):
+            if page_number < start_page or (end_page is not None and page_number > end_page):
+                continue
+            if case_sensitive:
+                texts = self.page_texts[page_number]
+            else:
+                texts = self._lower_texts.get(page_number)
+                if texts is None:
+                    texts = [text.lower() for text in self.page_texts[page_number]]
+                    self._lower_texts[page_number] = texts
+            if any(search_keyword in text for text in texts):
+                found.append(page_number)
+        return found
+
+    ####################################################################
+    # Persistence
+    ####################################################################
+    def to_dict(self) -> Dict:
+        return {
+            "v": INDEX_VERSION,
+            "pages": [[page_number, texts] for page_number, texts in sorted(self.page_texts.items())],
+            "postings": {
+                token: [[page_number, positions] for page_number, positions in pages.items()]
+                for token, pages in self.postings.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "KeywordIndex":
+        if data.get("v") != INDEX_VERSION:
+            raise ValueError(f"Unsupported keyword index version: {data.get('v')}")
+        index = cls.__new__(cls)
+        index.page_texts = {page_number: texts for page_number, texts in data["pages"]}
+        index.settings_key = None
+        index.postings = {
+            token: {page_number: positions for page_number, positions in pages}
+            for token, pages in data["postings"].items()
+        }
+        index._lower_texts = {}
+        index._fragment_pages = {}
+        return index
+
+
+def build_keyword_index(session: PdfSession, laparams: LayoutSettings = None, workers: int = None) -> KeywordIndex:
+    """
+    Builds the keyword index for a whole document, attaches it to the session
+    and saves it in the session's layout store, if it has one.
+    """
+    index = KeywordIndex.build(session, workers=workers, laparams=laparams)
+    session.keyword_index = index
+    if session.layout_store is not None:
+        session.layout_store.put_document_data(session.content_id, index.settings_key, INDEX_ENTRY_NAME, index.to_dict())
+    return index
+
+
+def get_keyword_index(session: PdfSession, laparams: LayoutSettings = None) -> Optional[KeywordIndex]:
+    """
+    Returns the session's keyword index for the given layout settings
+    (LAParams() by default), loading a previously saved one from the layout
+    store if needed. Never builds a new index.
+    """
+    settings_key = laparams_key(default_laparams() if laparams is None else laparams)
+    index = session.keyword_index
+    if index is not None and index.settings_key == settings_key:
+        return index
+    if session.layout_store is not None:
+        data = session.layout_store.get_document_data(session.content_id, settings_key, INDEX_ENTRY_NAME)
+        if data is not None:
+            try:
+                index = KeywordIndex.from_dict(data)
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Warning: Discarding stored keyword index: {e}")
+                return None
+            index.settings_key = settings_key
+            session.keyword_index = index
+            return index
+    return None
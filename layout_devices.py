@@ -0,0 +1,27 @@
+"""
+The pdfminer devices PdfSession interprets pages with.
+
+They subclass pdfminer's classes, so they live here instead of in
+pdf_session: importing pdf_session (and with it text_extraction) must not
+import pdfminer, which PdfSession only loads once a document is opened.
+"""
+from pdfminer.converter import PDFPageAggregator
+
+from instrumentation import stage
+from margin_bands import MarginBandAggregator
+
+
+class LayoutStageMixin:
+    """Reports the layout analysis pdfminer runs in end_page as the "layout" stage."""
+
+    def end_page(self, page) -> None:
+        with stage("layout"):
+            super().end_page(page)
+
+
+class TimedPageAggregator(LayoutStageMixin, PDFPageAggregator):
+    pass
+
+
+class TimedMarginBandAggregator(LayoutStageMixin, MarginBandAggregator):
+    pass
@@ -3,6 +3,7 @@ def main(file_path: str):
     import sys
     from utils import file_loader  # Ensure the module is imported for pytest to discover
     import text_extraction  as te # Ensure the module is imported for pytest to discover
+    from pdf_session import PdfSession
     
     # For visualization, we need additional libraries:
     # pip install PyMuPDF pillow
@@ -17,30 +18,27 @@ def main(file_path: str):
     #pytest.main(["-v", "tests/test_file_loader.py"])
     
     file_stream = file_loader.open_file_from_path_or_s3(file_path, use_cache=True)
-    toc_list = te.extract_toc(file_stream)
+    # Parse the document once; every tool below reuses the same session
+    session = PdfSession(file_stream)
+    toc_list = te.extract_toc(session)
     for toc in toc_list:
         print(toc)
     
     print("Calculating total page count...")
-    total_pages = te.get_total_page_count(file_stream)
+    total_pages = te.get_total_page_count(session)
     print(f"Total pages in document: {total_pages}")
     
-    file_stream.seek(0)  # Reset stream position after reading TOC
-    
-    keyword_page_list = te.find_pages_with_keyword("Transparency", file_stream)
+    keyword_page_list = te.find_pages_with_keyword("Transparency", session)
     print(f"Pages with 'Transparency': {keyword_page_list}")    
     
-    file_stream.seek(0)  # Reset stream position after reading keyword pages
-    
-    headers_footer_dict = te.find_headers_and_footers(file_stream)
+    headers_footer_dict = te.find_headers_and_footers(session)
     print("Extracted Headers and Footers:")
     print(headers_footer_dict['headers'])
     #for page_num, header_footer in headers_footer_dict.items():
     #    print(f"Page {page_num}: Header: {header_footer['header']}, Footer: {header_footer['footer']}")
     
-    file_stream.seek(0)
     target_page = 5  # Example page number to extract text from
-    page_text = te.get_text_from_page(file_stream, target_page)
+    page_text = te.get_text_from_page(session, target_page)
             
     if not page_text:
         print("No text found on this page.")
@@ -49,7 +47,6 @@ def main(file_path: str):
         print(page_text)
         print("----------------------")
     
-    file_stream.seek(0)
     # Let's imagine we know the main content of our page is between these y-coords.
     # On a standard 8.5x11 inch page (792 points high), this might be:
     # A 1-inch top margin (72 points) -> upper_y = 792 - 72 = 720
@@ -58,7 +55,7 @@ def main(file_path: str):
     lower_y_boundary = 72
     print(f"--- Extracting text from page {target_page} between Y={lower_y_boundary} and Y={upper_y_boundary} ---\n")
     main_content = te.get_text_between_y_coordinates(
-                file_stream,
+                session,
                 target_page,
                 start_y=upper_y_boundary,
                 end_y=lower_y_boundary
@@ -70,9 +67,8 @@ def main(file_path: str):
         print(main_content)
         print("-------------------------")
     
-    file_stream.seek(0) # Reset stream
     target_page = 6
-    all_page_blocks = te.extract_text_blocks_with_metadata(file_stream, target_page)
+    all_page_blocks = te.extract_text_blocks_with_metadata(session, target_page)
     
      # The text of the header we are looking for
     header_to_find = "Executive Summary" 
@@ -86,8 +82,7 @@ def main(file_path: str):
     
     if target_header_bbox:
         # Now, call the function we just built
-        file_stream.seek(0) # Reset stream again for the main function call
-        section_content = te.get_text_following_header(file_stream, target_page, target_header_bbox)
+        section_content = te.get_text_following_header(session, target_page, target_header_bbox)
         
         print("\n--- Extracted Section Content ---")
         print(section_content)
@@ -96,9 +91,8 @@ def main(file_path: str):
         print(f"Could not find the header '{header_to_find}' on page {target_page}.")
 
 
-    file_stream.seek(0) # Reset stream
     print(f"--- Extracting text blocks with metadata from page {target_page} of '{file_path}' ---\n")
-    blocks = te.extract_text_blocks_with_metadata(file_stream, target_page)
+    blocks = te.extract_text_blocks_with_metadata(session, target_page)
     
     if not blocks:
         print("No text blocks found on this page.")
@@ -115,10 +109,9 @@ def main(file_path: str):
     
     
         target_page = 27
-        file_stream.seek(0)  # Reset stream for table detection
         print(f"--- Detecting tables on page {target_page} of '{file_path}' ---\n")
             
-        tables = te.detect_tables_on_page(file_stream, target_page)
+        tables = te.detect_tables_on_page(session, target_page)
         
         if not tables:
             print("No tables detected on this page.")
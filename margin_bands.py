@@ -0,0 +1,44 @@
+"""
+Layout analysis restricted to the top and bottom margin bands of a page.
+
+Header and footer detection only looks at text near the top and bottom edges
+of a page, but pdfminer's layout analysis groups every character on the page
+into lines and boxes. MarginBandAggregator drops the objects that lie
+entirely outside the margin bands before the analysis runs, so only the
+bands are grouped. Pass MarginBandParams as the `laparams` of
+PdfSession.get_layout to use it; layouts are cached under their own key.
+"""
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LAParams
+
+
+class MarginBandParams(LAParams):
+    """LAParams that also describe the margin bands to keep."""
+
+    def __init__(self, top_margin: float = 0.90, bottom_margin: float = 0.10, **kwargs):
+        """
+        Args:
+            top_margin (float): Objects reaching above this fraction of the
+                                page height are in the header band.
+            bottom_margin (float): Objects reaching below this fraction of
+                                   the page height are in the footer band.
+            **kwargs: Passed on to LAParams.
+        """
+        super().__init__(**kwargs)
+        self.top_margin = top_margin
+        self.bottom_margin = bottom_margin
+
+
+class MarginBandAggregator(PDFPageAggregator):
+    """A PDFPageAggregator that only analyzes the page's margin bands."""
+
+    def end_page(self, page) -> None:
+        # Same thresholds as text_extraction._margin_candidates
+        page_height = page.mediabox[3]
+        header_y_threshold = page_height * self.laparams.top_margin
+        footer_y_threshold = page_height * self.laparams.bottom_margin
+        self.cur_item._objs = [
+            obj for obj in self.cur_item._objs
+            if obj.y1 > header_y_threshold or obj.y0 < footer_y_threshold
+        ]
+        super().end_page(page)
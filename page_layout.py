@@ -0,0 +1,343 @@
+"""
+A compact, pdfminer-independent snapshot of an analyzed page.
+
+pdfminer's LTPage trees keep every character as a full Python object with its
+matrix, graphic state and font. The tools only need the text, geometry and
+font name/size of text boxes, plus the geometry of rectangles and lines, so
+layouts are converted to a PageLayout once and every tool works on that.
+PageLayouts are small enough to cache in memory and can be serialized to a
+plain dict for the on-disk layout store.
+
+Per-character font information is kept in flat arrays: font names are
+interned once per document in a FontTable and each line stores only their
+IDs and the character sizes. Records use __slots__, and dictionaries are only
+built at the public boundary of the tools.
+"""
+import threading
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+from spatial_index import BBoxIndex
+
+# Only the conversion from pdfminer's layout tree needs pdfminer, so it is
+# imported there; cached and stored layouts are used without it
+if TYPE_CHECKING:
+    from pdfminer.layout import LTPage, LTTextContainer, LTTextLine
+
+# The pdfminer.layout module, set by _load_pdfminer_layout on the first
+# conversion and used by the per-box and per-line helpers below
+_lt = None
+
+BBox = Tuple[float, float, float, float]
+
+# Bumped whenever the serialized form changes, so stale stores are ignored
+SERIALIZATION_VERSION = 1
+
+
+class FontTable:
+    """
+    Interns font names to small integer IDs. A PdfSession keeps one table for
+    the whole document, so every page refers to the same IDs.
+    """
+    __slots__ = ("names", "_ids", "_lock")
+
+    def __init__(self, names: Optional[List[str]] = None):
+        self.names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        for name in names or ():
+            self.intern(name)
+
+    def intern(self, name: str) -> int:
+        """Returns the ID of a font name, adding it to the table if needed."""
+        font_id = self._ids.get(name)
+        if font_id is None:
+            with self._lock:
+                font_id = self._ids.get(name)
+                if font_id is None:
+                    font_id = len(self.names)
+                    self.names.append(name)
+                    self._ids[name] = font_id
+        return font_id
+
+    def __getitem__(self, font_id: int) -> str:
+        return self.names[font_id]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+@dataclass(slots=True)
+class FontStats:
+    # ID of the most common font in the box (first seen wins ties), or None
+    font_id: Optional[int]
+    # Mean size over all characters, 0.0 for boxes without characters
+    avg_size: float
+    char_count: int
+
+
+@dataclass(slots=True)
+class TextLine:
+    text: str
+    bbox: BBox
+    # FontTable ID and size of every LTChar on the line, in order
+    font_ids: array = field(default_factory=lambda: array("I"))
+    sizes: array = field(default_factory=lambda: array("d"))
+
+
+@dataclass(slots=True)
+class TextBox:
+    text: str
+    bbox: BBox
+    lines: List[TextLine] = field(default_factory=list)
+    # True for LTTextBoxHorizontal; False for vertical boxes and bare lines
+    horizontal: bool = True
+    # True if the box is a direct child of the page rather than of a figure
+    top_level: bool = True
+    _stats: Optional[FontStats] = field(default=None, repr=False, compare=False)
+
+    @property
+    def x0(self) -> float:
+        return self.bbox[0]
+
+    @property
+    def y0(self) -> float:
+        return self.bbox[1]
+
+    @property
+    def x1(self) -> float:
+        return self.bbox[2]
+
+    @property
+    def y1(self) -> float:
+        return self.bbox[3]
+
+    @property
+    def width(self) -> float:
+        return self.bbox[2] - self.bbox[0]
+
+    @property
+    def height(self) -> float:
+        return self.bbox[3] - self.bbox[1]
+
+    def get_text(self) -> str:
+        return self.text
+
+    def font_stats(self) -> FontStats:
+        """
+        Returns the most common font and the mean character size of the box,
+        computed once and shared by every tool.
+        """
+        if self._stats is None:
+            char_count = sum(len(line.sizes) for line in self.lines)
+            font_id = None
+            avg_size = 0.0
+            if char_count:
+                font_id = Counter(chain.from_iterable(line.font_ids for line in self.lines)).most_common(1)[0][0]
+                avg_size = sum(chain.from_iterable(line.sizes for line in self.lines)) / char_count
+            self._stats = FontStats(font_id, avg_size, char_count)
+        return self._stats
+
+
+@dataclass(slots=True)
+class PageLayout:
+    page_number: int
+    # Bounding box of the analyzed layout (origin at 0, 0)
+    bbox: BBox
+    # The page's /MediaBox as declared in the document
+    mediabox: BBox
+    # The table the font IDs of this page's lines refer to
+    fonts: FontTable = field(default_factory=FontTable, repr=False, compare=False)
+    # Every text container on the page, in the order pdfminer produced them
+    text_boxes: List[TextBox] = field(default_factory=list)
+    # Bounding boxes of the page's top-level rectangles and lines
+    rects: List[BBox] = field(default_factory=list)
+    lines: List[BBox] = field(default_factory=list)
+    # Spatial indexes built by `bbox_index`, not serialized
+    _indexes: Dict[str, BBoxIndex] = field(default_factory=dict, repr=False, compare=False)
+
+    @property
+    def height(self) -> float:
+        return self.bbox[3] - self.bbox[1]
+
+    def horizontal_boxes(self) -> List[TextBox]:
+        """The page's top-level horizontal text boxes (pdfminer's LTTextBoxHorizontal)."""
+        return [box for box in self.text_boxes if box.top_level and box.horizontal]
+
+    def bbox_index(self, kind: str) -> BBoxIndex:
+        """
+        Returns a spatial index over the page's "horizontal_boxes",
+        "text_boxes", "rects" or "lines", built on first use. Positions
+        returned by the index refer to the same sequence of elements.
+        """
+        index = self._indexes.get(kind)
+        if index is None:
+            if kind == "horizontal_boxes":
+                bboxes = [box.bbox for box in self.horizontal_boxes()]
+            elif kind == "text_boxes":
+                bboxes = [box.bbox for box in self.text_boxes]
+            elif kind in ("rects", "lines"):
+                bboxes = getattr(self, kind)
+            else:
+                raise ValueError(f"Unknown layout element kind: {kind}")
+            index = self._indexes[kind] = BBoxIndex(bboxes)
+        return index
+
+    def font_name(self, font_id: Optional[int]) -> Optional[str]:
+        """Returns the font name for an ID of this page's font table."""
+        return None if font_id is None else self.fonts[font_id]
+
+    def char_count(self) -> int:
+        """Returns the number of characters in the page's text lines."""
+        return sum(len(line.sizes) for box in self.text_boxes for line in box.lines)
+
+    def estimated_size(self) -> int:
+        """Returns a rough estimate of the memory held by this layout, in bytes."""
+        size = 200 + 64 * (len(self.rects) + len(self.lines))
+        for box in self.text_boxes:
+            size += 150 + len(box.text)
+            for line in box.lines:
+                size += 250 + len(line.text) + 12 * len(line.sizes)
+        return size
+
+    ####################################################################
+    # Conversion and serialization
+    ####################################################################
+    @classmethod
+    def from_ltpage(
+        cls,
+        page_number: int,
+        layout: "LTPage",
+        mediabox: Optional[BBox] = None,
+        fonts: Optional[FontTable] = None
+    ) -> "PageLayout":
+        """
+        Builds a PageLayout from a pdfminer layout tree, interning font names
+        into `fonts` (the document's table) or a new table.
+        """
+        lt = _load_pdfminer_layout()
+        page_layout = cls(
+            page_number=page_number,
+            bbox=tuple(layout.bbox),
+            mediabox=tuple(mediabox) if mediabox is not None else tuple(layout.bbox),
+            fonts=fonts if fonts is not None else FontTable(),
+        )
+        for element in layout:
+            if isinstance(element, lt.LTRect):
+                page_layout.rects.append(tuple(element.bbox))
+            elif isinstance(element, lt.LTLine):
+                page_layout.lines.append(tuple(element.bbox))
+        page_layout.text_boxes = [
+            _text_box_from_container(element, top_level, page_layout.fonts)
+            for element, top_level in _iter_text_containers(layout, True)
+        ]
+        return page_layout
+
+    def to_dict(self) -> Dict:
+        """
+        Returns a compact, JSON-serializable form of the layout. Font names
+        are stored once in a per-page table and referenced by index.
+        """
+        # Document-wide IDs are renumbered into a dense per-page table
+        fonts: Dict[int, int] = {}
+        boxes = []
+        for box in self.text_boxes:
+            lines = []
+            for line in box.lines:
+                font_ids = [fonts.setdefault(font_id, len(fonts)) for font_id in line.font_ids]
+                lines.append([line.text, list(line.bbox), font_ids, line.sizes.tolist()])
+            flags = (1 if box.horizontal else 0) | (2 if box.top_level else 0)
+            boxes.append([box.text, list(box.bbox), flags, lines])
+        return {
+            "v": SERIALIZATION_VERSION,
+            "page": self.page_number,
+            "bbox": list(self.bbox),
+            "mediabox": list(self.mediabox),
+            "fonts": [self.fonts[font_id] for font_id in fonts],
+            "boxes": boxes,
+            "rects": [list(r) for r in self.rects],
+            "lines": [list(l) for l in self.lines],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, fonts: Optional[FontTable] = None) -> "PageLayout":
+        """
+        Rebuilds a PageLayout from the output of `to_dict`, interning its
+        font names into `fonts` (the document's table) or a new table.
+        """
+        if data.get("v") != SERIALIZATION_VERSION:
+            raise ValueError(f"Unsupported page layout version: {data.get('v')}")
+        if fonts is None:
+            fonts = FontTable()
+        font_ids_by_index = [fonts.intern(name) for name in data["fonts"]]
+        text_boxes = []
+        for text, bbox, flags, lines in data["boxes"]:
+            text_boxes.append(TextBox(
+                text=text,
+                bbox=tuple(bbox),
+                lines=[
+                    TextLine(
+                        line_text, tuple(line_bbox),
+                        array("I", [font_ids_by_index[i] for i in font_ids]), array("d", sizes),
+                    )
+                    for line_text, line_bbox, font_ids, sizes in lines
+                ],
+                horizontal=bool(flags & 1),
+                top_level=bool(flags & 2),
+            ))
+        return cls(
+            page_number=data["page"],
+            bbox=tuple(data["bbox"]),
+            mediabox=tuple(data["mediabox"]),
+            fonts=fonts,
+            text_boxes=text_boxes,
+            rects=[tuple(r) for r in data["rects"]],
+            lines=[tuple(l) for l in data["lines"]],
+        )
+
+
+def _load_pdfminer_layout():
+    global _lt
+    if _lt is None:
+        import pdfminer.layout
+        _lt = pdfminer.layout
+    return _lt
+
+
+def _iter_text_containers(layout, top_level: bool) -> Iterator[Tuple["LTTextContainer", bool]]:
+    """
+    A recursive generator over all text-containing elements in a pdfminer
+    layout, paired with whether each one is a direct child of the page.
+    """
+    for element in layout:
+        if isinstance(element, _lt.LTTextContainer):
+            yield element, top_level
+        # If the element is a container, recurse into it
+        elif hasattr(element, '_objs'):
+            yield from _iter_text_containers(element, False)
+
+
+def _text_line_from_ltline(line: "LTTextLine", fonts: FontTable) -> TextLine:
+    chars = [char for char in line if isinstance(char, _lt.LTChar)]
+    return TextLine(
+        text=line.get_text(),
+        bbox=tuple(line.bbox),
+        font_ids=array("I", [fonts.intern(char.fontname) for char in chars]),
+        sizes=array("d", [char.size for char in chars]),
+    )
+
+
+def _text_box_from_container(element: "LTTextContainer", top_level: bool, fonts: FontTable) -> TextBox:
+    if isinstance(element, _lt.LTTextLine):
+        lines = [_text_line_from_ltline(element, fonts)]
+    else:
+        lines = [_text_line_from_ltline(line, fonts) for line in element if isinstance(line, _lt.LTTextLine)]
+    return TextBox(
+        text=element.get_text(),
+        bbox=tuple(element.bbox),
+        lines=lines,
+        horizontal=isinstance(element, _lt.LTTextBoxHorizontal),
+        top_level=top_level,
+    )
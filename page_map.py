@@ -0,0 +1,240 @@
+"""
+Map a per-page function over a range of pages, optionally in parallel.
+
+Layout analysis is pure-Python CPU work that holds the GIL, so whole-document
+scans only scale across processes. `map_pages` splits a page range into
+chunks, sends them to a ProcessPoolExecutor whose workers each open the
+document once from a path or bytes, and merges the results in page order.
+"""
+import math
+import os
+import random
+from io import BytesIO
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, List, Optional, Sequence, Tuple, Union
+from pdf_session import PdfSession, as_session
+from utils.layout_store import LayoutStore
+from utils.mapped_file import open_mapped
+
+# A per-page function: called as func(session, page_number). It must be a
+# module-level function (or a functools.partial of one) so it can be pickled.
+PageFunc = Callable[[PdfSession, int], Any]
+
+# How many chunks to create per worker, so faster workers can pick up more
+# work when pages take uneven amounts of time.
+CHUNKS_PER_WORKER = 4
+
+# The session each worker process opens once in its initializer
+_worker_session: Optional[PdfSession] = None
+
+
+def _init_worker(source: Union[str, bytes], doc_id: Optional[str], layout_store: Optional[LayoutStore]) -> None:
+    global _worker_session
+    if isinstance(source, bytes):
+        stream = BytesIO(source)
+    else:
+        # Mapped, so all workers share the file's pages in the OS page cache
+        stream = open_mapped(source)
+    _worker_session = PdfSession(stream, doc_id=doc_id, layout_store=layout_store)
+
+
+def _run_chunk(func: PageFunc, start_page: int, end_page: int) -> List[Tuple[int, Any]]:
+    return [(page_number, func(_worker_session, page_number)) for page_number, _ in _worker_session.iter_pages(start_page, end_page)]
+
+
+def _run_page_list(func: PageFunc, page_numbers: Sequence[int]) -> List[Tuple[int, Any]]:
+    return _apply_to_pages(func, _worker_session, page_numbers)
+
+
+def _apply_to_pages(func: PageFunc, session: PdfSession, page_numbers: Sequence[int]) -> List[Tuple[int, Any]]:
+    return [
+        (page_number, func(session, page_number))
+        for page_number in page_numbers
+        if session.get_page(page_number) is not None
+    ]
+
+
+def document_source(session: PdfSession) -> Union[str, bytes]:
+    """
+    Returns something a worker process can open the session's document from:
+    the file path for real files, otherwise the document bytes.
+    """
+    stream = session.file_stream
+    name = getattr(stream, "name", None)
+    if isinstance(name, (str, Path)) and os.path.isfile(name):
+        return str(name)
+    if hasattr(stream, "getvalue"):
+        return stream.getvalue()
+    position = stream.tell()
+    stream.seek(0)
+    data = stream.read()
+    stream.seek(position)
+    return data
+
+
+def sample_page_numbers(page_count: int, sample_size: int, seed: int = 0) -> List[int]:
+    """
+    Picks pages spread across the whole document: the page range is split
+    into `sample_size` equal strata and one page is drawn from each with a
+    seeded random generator, so the same document always gets the same
+    sample.
+
+    The pages are returned in a shuffled (but seeded) order rather than page
+    order, so that any prefix of the list is itself spread across the
+    document and a scan can stop early.
+
+    Returns:
+        List[int]: 1-based page numbers; every page if `sample_size` is at
+                   least `page_count`.
+    """
+    rng = random.Random(seed)
+    if sample_size >= page_count:
+        pages = list(range(1, page_count + 1))
+    else:
+        bounds = [round(i * page_count / sample_size) for i in range(sample_size + 1)]
+        pages = [rng.randint(bounds[i] + 1, bounds[i + 1]) for i in range(sample_size)]
+    rng.shuffle(pages)
+    return pages
+
+
+def split_page_range(start_page: int, end_page: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """Splits an inclusive page range into consecutive (start, end) chunks."""
+    return [
+        (chunk_start, min(chunk_start + chunk_size - 1, end_page))
+        for chunk_start in range(start_page, end_page + 1, chunk_size)
+    ]
+
+
+def _worker_doc_id(session: PdfSession) -> str:
+    # Workers key their own caches by this id, and the shared store needs
+    # the same content key the parent uses
+    return session.content_id if session.layout_store is not None else session.doc_id
+
+
+def _worker_pool(workers: int, initargs: Tuple):
+    # Imported here: it pulls in multiprocessing, which single-process
+    # callers never need
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs)
+
+
+def document_pool(session: PdfSession, workers: int):
+    """
+    Starts a process pool whose workers each open the session's document
+    once. Callers that map over several batches of pages pass it to
+    `map_page_numbers` as `executor`, so the document is not re-opened and
+    re-parsed for every batch. Use it as a context manager to shut it down.
+    """
+    return _worker_pool(workers, (document_source(session), _worker_doc_id(session), session.layout_store))
+
+
+def map_pages(
+    func: PageFunc,
+    source: Union[str, bytes, BinaryIO, PdfSession],
+    start_page: int = 1,
+    end_page: int = None,
+    workers: int = None,
+    chunk_size: int = None
+) -> List[Tuple[int, Any]]:
+    """
+    Applies `func(session, page_number)` to every page in a range.
+
+    Args:
+        func (PageFunc): A picklable per-page function.
+        source: A file path, the PDF bytes, a binary file stream or a PdfSession.
+        start_page (int): The 1-based first page. Defaults to 1.
+        end_page (int): The 1-based last page (inclusive). Defaults to the
+                        end of the document.
+        workers (int): Number of worker processes. None, 0 or 1 runs in the
+                       calling process.
+        chunk_size (int): Pages per task sent to a worker. Defaults to
+                          splitting the range into CHUNKS_PER_WORKER chunks
+                          per worker.
+
+    Returns:
+        List[Tuple[int, Any]]: (page_number, result) pairs in page order.
+    """
+    if isinstance(source, (str, Path)):
+        with PdfSession(open(source, "rb")) as session:
+            return map_pages(func, session, start_page, end_page, workers, chunk_size)
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    session = as_session(source)
+
+    start_page = max(start_page, 1)
+    last_page = session.page_count
+    end_page = last_page if end_page is None else min(end_page, last_page)
+    if end_page < start_page:
+        return []
+
+    # page_count may come from the document's /Count entry, so the page
+    # iterators below still stop at the last page that really exists.
+    if not workers or workers <= 1:
+        return [(page_number, func(session, page_number)) for page_number, _ in session.iter_pages(start_page, end_page)]
+
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil((end_page - start_page + 1) / (workers * CHUNKS_PER_WORKER)))
+
+    results: List[Tuple[int, Any]] = []
+    with document_pool(session, workers) as executor:
+        futures = [
+            executor.submit(_run_chunk, func, chunk_start, chunk_end)
+            for chunk_start, chunk_end in split_page_range(start_page, end_page, chunk_size)
+        ]
+        # Chunks are submitted in page order, so collecting them in
+        # submission order keeps the merged results in page order.
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+def map_page_numbers(
+    func: PageFunc,
+    source: Union[str, bytes, BinaryIO, PdfSession],
+    page_numbers: Sequence[int],
+    workers: int = None,
+    chunk_size: int = None,
+    executor=None
+) -> List[Tuple[int, Any]]:
+    """
+    Applies `func(session, page_number)` to a list of pages, such as a
+    sample from `sample_page_numbers`, like `map_pages` does for a range.
+
+    Args:
+        executor: A pool from `document_pool` for the same document to run
+                  on instead of starting a new one. `workers` then only
+                  sets the default chunk size.
+
+    Returns:
+        List[Tuple[int, Any]]: (page_number, result) pairs in the order of
+                               `page_numbers`. Pages that do not exist are
+                               skipped.
+    """
+    if isinstance(source, (str, Path)):
+        with PdfSession(open(source, "rb")) as session:
+            return map_page_numbers(func, session, page_numbers, workers, chunk_size, executor)
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    session = as_session(source)
+
+    page_numbers = list(page_numbers)
+    if executor is None and (not workers or workers <= 1):
+        return _apply_to_pages(func, session, page_numbers)
+
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(len(page_numbers) / (max(workers or 1, 1) * CHUNKS_PER_WORKER)))
+    if executor is not None:
+        return _run_page_lists(executor, func, page_numbers, chunk_size)
+    with document_pool(session, workers) as executor:
+        return _run_page_lists(executor, func, page_numbers, chunk_size)
+
+
+def _run_page_lists(executor, func: PageFunc, page_numbers: List[int], chunk_size: int) -> List[Tuple[int, Any]]:
+    futures = [
+        executor.submit(_run_page_list, func, page_numbers[i:i + chunk_size])
+        for i in range(0, len(page_numbers), chunk_size)
+    ]
+    results: List[Tuple[int, Any]] = []
+    for future in futures:
+        results.extend(future.result())
+    return results
@@ -0,0 +1,499 @@
+import hashlib
+import os
+import stat
+from typing import TYPE_CHECKING, Dict, BinaryIO, Iterator, List, Optional, Tuple, Union
+from page_layout import FontTable, PageLayout
+from utils.layout_cache import LayoutCache, DEFAULT_LAYOUT_CACHE
+from utils.layout_store import LayoutStore
+from instrumentation import count, get_metrics_sink, stage
+
+# pdfminer is imported where it is first needed, so that importing the tool
+# modules stays cheap for callers that never open a document
+if TYPE_CHECKING:
+    from pdfminer.layout import LAParams, LTPage
+    from pdfminer.pdfinterp import PDFPageInterpreter
+    from pdfminer.pdfpage import PDFPage
+
+
+# Text modes for whole-document scans. "layout" runs pdfminer's full layout
+# analysis; "raw" collects text runs with TextRunDevice and skips it.
+TEXT_MODE_LAYOUT = "layout"
+TEXT_MODE_RAW = "raw"
+TEXT_MODES = (TEXT_MODE_LAYOUT, TEXT_MODE_RAW)
+
+# Pass as `laparams` to PdfSession.get_layout for a text-only raw layout
+RAW_TEXT = "raw-text"
+
+LayoutSettings = Union["LAParams", str, None]
+
+
+def default_laparams() -> "LAParams":
+    """Returns pdfminer's default layout analysis settings."""
+    from pdfminer.layout import LAParams
+    return LAParams()
+
+
+def laparams_key(laparams: LayoutSettings) -> Optional[Tuple]:
+    """
+    Returns a hashable key describing the given layout settings.
+    Two LAParams objects with the same settings produce the same key.
+    """
+    if laparams is None or laparams == RAW_TEXT:
+        return laparams
+    return tuple(sorted(vars(laparams).items()))
+
+
+class PdfSession:
+    """
+    A PDF document that is parsed once and shared across tool calls.
+
+    Creating a session parses the xref table, trailer and catalog a single
+    time. Page objects are created lazily while walking the page tree and are
+    remembered, so asking for page 5 never re-walks pages 1-4. The fonts and
+    other resources loaded while interpreting pages are shared through a
+    single PDFResourceManager, and analyzed layouts are kept as compact
+    PageLayouts in a LayoutCache (and optionally a persistent LayoutStore)
+    so revisiting a page does not repeat layout analysis.
+
+    Every tool in `text_extraction` accepts a PdfSession wherever it accepts
+    a file stream:
+
+        with PdfSession(open("report.pdf", "rb")) as session:
+            toc = extract_toc(session)
+            text = get_text_from_page(session, 5)
+    """
+
+    def __init__(
+        self,
+        file_stream: BinaryIO,
+        password: str = "",
+        doc_id: Optional[str] = None,
+        layout_cache: Optional[LayoutCache] = DEFAULT_LAYOUT_CACHE,
+        layout_store: Optional[LayoutStore] = None,
+        text_mode: str = TEXT_MODE_LAYOUT
+    ):
+        """
+        Args:
+            file_stream (BinaryIO): The binary file stream of the PDF. It must
+                                    stay open for the lifetime of the session.
+            password (str): Password for encrypted documents.
+            doc_id (str): Identity of the document used for caching. Defaults
+                          to the stream's own `doc_id` if it has one (as
+                          S3RangeFile does), else to the identity of a
+                          regular file or the SHA-256 of any other stream's
+                          contents (see `doc_id`). Keys in a persistent
+                          layout store default to the content hash.
+            layout_cache (LayoutCache): Cache for analyzed page layouts, or
+                                        None to disable caching.
+            layout_store (LayoutStore): Optional on-disk store of page layouts
+                                        that survives process restarts.
+            text_mode (str): Default text mode for whole-document scans,
+                             "layout" or "raw".
+        """
+        if text_mode not in TEXT_MODES:
+            raise ValueError(f"Unknown text mode: {text_mode}")
+        self.text_mode = text_mode
+        self.file_stream = file_stream
+        self.layout_cache = layout_cache
+        self.layout_store = layout_store
+        if doc_id is None:
+            # Hashing a lazily read stream would download all of it
+            doc_id = getattr(file_stream, "doc_id", None)
+        self._doc_id = doc_id
+        self._content_id = doc_id
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfinterp import PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfparser import PDFParser
+        with stage("parse"):
+            self.parser = PDFParser(file_stream)
+            self.document = PDFDocument(self.parser, password=password)
+        self.resource_manager = PDFResourceManager(caching=True)
+
+        self._page_iter: Optional[Iterator["PDFPage"]] = PDFPage.create_pages(self.document)
+        self._pages: List["PDFPage"] = []
+        self._page_map: Dict[int, "PDFPage"] = {}
+        self._page_count: Optional[int] = None
+        self._page_numbers_by_objid: Optional[Dict[int, int]] = None
+        self._interpreters: Dict[Optional[Tuple], Tuple[object, "PDFPageInterpreter"]] = {}
+        # Font names of every analyzed page, interned once per document
+        self.font_table = FontTable()
+        # Set by keyword_index.build_keyword_index / get_keyword_index
+        self.keyword_index = None
+
+    @classmethod
+    def from_path_or_s3(cls, uri: str, use_cache: bool = True, lazy: bool = False) -> "PdfSession":
+        """
+        Opens a local path or S3 URI with `utils.file_loader` and parses it.
+        With `lazy`, S3 objects are read with range requests instead of
+        being downloaded in full.
+        """
+        from utils.file_loader import open_file_from_path_or_s3
+        stream = open_file_from_path_or_s3(uri, use_cache=use_cache, lazy=lazy)
+        # Range-read S3 objects are identified by their location and ETag
+        return cls(stream, doc_id=getattr(stream, "doc_id", None))
+
+    def __enter__(self) -> "PdfSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the underlying file stream."""
+        self._interpreters.clear()
+        self.file_stream.close()
+
+    def scan_laparams(self, text_mode: Optional[str] = None) -> LayoutSettings:
+        """
+        Returns the layout settings whole-document scans should use for the
+        given text mode, or for the session's default mode if None.
+        """
+        text_mode = text_mode or self.text_mode
+        if text_mode not in TEXT_MODES:
+            raise ValueError(f"Unknown text mode: {text_mode}")
+        return RAW_TEXT if text_mode == TEXT_MODE_RAW else default_laparams()
+
+    @property
+    def doc_id(self) -> str:
+        """
+        The document identity used in in-memory cache keys. Unless given
+        explicitly, a regular file is identified without reading it, by its
+        path, device, inode, size and modification time. Any other stream
+        is identified by its full content hash (see `content_id`), since
+        the layout cache is shared by every session in the process.
+        """
+        if self._doc_id is None:
+            self._doc_id = _file_identity(self.file_stream) or self.content_id
+        return self._doc_id
+
+    @property
+    def content_id(self) -> str:
+        """
+        The document identity used in persistent layout store keys, which
+        must not depend on where or when the file was opened. Unless given
+        explicitly, this is the hex SHA-256 of the file contents, computed
+        on first use.
+        """
+        if self._content_id is None:
+            digest = hashlib.sha256()
+            position = self.file_stream.tell()
+            self.file_stream.seek(0)
+            for chunk in iter(lambda: self.file_stream.read(1024 * 1024), b""):
+                digest.update(chunk)
+            self.file_stream.seek(position)
+            self._content_id = digest.hexdigest()
+        return self._content_id
+
+    ####################################################################
+    # Page tree access
+    ####################################################################
+    def _load_pages_until(self, count: Optional[int]) -> None:
+        """Walks the page tree until `count` pages are known (or to the end)."""
+        while self._page_iter is not None and (count is None or len(self._pages) < count):
+            try:
+                page = next(self._page_iter)
+            except StopIteration:
+                self._page_iter = None
+                break
+            except Exception:
+                # A malformed page tree ends the walk; keep what we found.
+                self._page_iter = None
+                raise
+            self._pages.append(page)
+            self._page_map[len(self._pages)] = page
+
+    def get_page(self, page_number: int) -> Optional["PDFPage"]:
+        """
+        Returns the PDFPage for a 1-based page number, or None if the
+        document has fewer pages.
+        """
+        if page_number < 1:
+            return None
+        self._load_pages_until(page_number)
+        return self._page_map.get(page_number)
+
+    def iter_pages(self, start_page: int = 1, end_page: int = None) -> Iterator[Tuple[int, "PDFPage"]]:
+        """
+        Yields (1-based page number, PDFPage) pairs for the inclusive range,
+        walking the page tree only as far as needed.
+        """
+        page_number = max(start_page, 1)
+        while end_page is None or page_number <= end_page:
+            page = self.get_page(page_number)
+            if page is None:
+                return
+            yield page_number, page
+            page_number += 1
+
+    @property
+    def pages(self) -> List["PDFPage"]:
+        """All pages of the document, in order."""
+        self._load_pages_until(None)
+        return self._pages
+
+    @property
+    def page_map(self) -> Dict[int, "PDFPage"]:
+        """A map from 1-based page number to PDFPage for the whole document."""
+        self._load_pages_until(None)
+        return self._page_map
+
+    @property
+    def page_count(self) -> int:
+        """
+        The number of pages in the document.
+
+        Read from the /Count entry of the root /Pages node when it agrees
+        with the root's kids (see `_count_from_kids`); otherwise the page
+        tree's leaves are counted without creating PDFPage objects. Once the page tree has been fully walked, the number
+        of pages actually found is returned.
+        """
+        if self._page_iter is None:
+            return len(self._pages)
+        if self._page_count is None:
+            self._page_count = self._read_page_count()
+        return self._page_count
+
+    def _read_page_count(self) -> int:
+        from pdfminer.pdftypes import resolve1
+        pages_ref = self.document.catalog.get("Pages")
+        root = resolve1(pages_ref)
+        if not isinstance(root, dict):
+            # No page tree; pdfminer falls back to scanning the xref
+            return len(self.pages)
+
+        count = resolve1(root.get("Count"))
+        kids = resolve1(root.get("Kids"))
+        if _is_count(count) and isinstance(kids, list) and count == _count_from_kids(kids):
+            return count
+
+        leaves = self._count_page_leaves(pages_ref)
+        return leaves if leaves else len(self.pages)
+
+    def _count_page_leaves(self, root_ref) -> int:
+        """Counts /Page leaves in the page tree without creating PDFPage objects."""
+        return sum(1 for _ in self._iter_page_leaf_refs(root_ref))
+
+    def _iter_page_leaf_refs(self, root_ref) -> Iterator:
+        """
+        Yields the references of the page tree's /Page leaves in document
+        order, with an iterative walk that only resolves node dictionaries,
+        following the same rules as PDFPage.create_pages.
+        """
+        from pdfminer.pdfpage import LITERAL_PAGE, LITERAL_PAGES
+        from pdfminer.pdftypes import resolve1
+        visited = set()
+        stack = [root_ref]
+        while stack:
+            ref = stack.pop()
+            objid = getattr(ref, "objid", None)
+            if objid is not None:
+                if objid in visited:
+                    continue
+                visited.add(objid)
+            node = resolve1(ref)
+            if not isinstance(node, dict):
+                continue
+            node_type = node.get("Type", node.get("type"))
+            if node_type is LITERAL_PAGES and "Kids" in node:
+                kids = resolve1(node["Kids"])
+                if isinstance(kids, list):
+                    # Reversed, so the first kid is visited first
+                    stack.extend(reversed(kids))
+            elif node_type is LITERAL_PAGE:
+                yield ref
+
+    @property
+    def page_numbers_by_objid(self) -> Dict[int, int]:
+        """
+        A map from page object ID to 1-based page number, built once per
+        session from the page tree's node dictionaries alone, so resolving
+        outline destinations or links does not create every PDFPage.
+        """
+        if self._page_numbers_by_objid is None:
+            self._page_numbers_by_objid = self._build_page_index()
+        return self._page_numbers_by_objid
+
+    def page_number_of(self, objid: int) -> Optional[int]:
+        """Returns the 1-based page number of a page object ID, or None."""
+        return self.page_numbers_by_objid.get(objid)
+
+    def _build_page_index(self) -> Dict[int, int]:
+        if self._page_iter is None:
+            return {page.pageid: number for number, page in self._page_map.items()}
+        from pdfminer.pdftypes import resolve1
+        pages_ref = self.document.catalog.get("Pages")
+        index: Dict[int, int] = {}
+        if isinstance(resolve1(pages_ref), dict):
+            for number, ref in enumerate(self._iter_page_leaf_refs(pages_ref), start=1):
+                objid = getattr(ref, "objid", None)
+                if objid is not None:
+                    index.setdefault(objid, number)
+        if not index:
+            # No usable page tree; pdfminer falls back to scanning the xref
+            index = {page.pageid: number for number, page in self.page_map.items()}
+        return index
+
+    ####################################################################
+    # Layout analysis
+    ####################################################################
+    def _get_interpreter(self, laparams: LayoutSettings) -> Tuple[object, "PDFPageInterpreter"]:
+        key = laparams_key(laparams)
+        if key not in self._interpreters:
+            from pdfminer.pdfinterp import PDFPageInterpreter
+            from layout_devices import TimedMarginBandAggregator, TimedPageAggregator
+            from margin_bands import MarginBandParams
+            from raw_text import TextRunDevice
+            if laparams == RAW_TEXT:
+                device = TextRunDevice(self.resource_manager)
+            elif isinstance(laparams, MarginBandParams):
+                device = TimedMarginBandAggregator(self.resource_manager, laparams=laparams)
+            else:
+                device = TimedPageAggregator(self.resource_manager, laparams=laparams)
+            interpreter = PDFPageInterpreter(self.resource_manager, device)
+            self._interpreters[key] = (device, interpreter)
+        return self._interpreters[key]
+
+    def analyze_page(self, page_number: int, laparams: Optional["LAParams"]) -> Optional["LTPage"]:
+        """
+        Interprets a page with pdfminer and returns the raw layout tree,
+        bypassing all caches. Returns None if the page does not exist.
+        """
+        page = self.get_page(page_number)
+        if page is None:
+            return None
+        device, interpreter = self._get_interpreter(laparams)
+        with stage("interpret"):
+            interpreter.process_page(page)
+        return device.get_result()
+
+    def _analyze_raw_page(self, page_number: int) -> Optional[PageLayout]:
+        from raw_text import build_raw_layout
+        page = self.get_page(page_number)
+        if page is None:
+            return None
+        device, interpreter = self._get_interpreter(RAW_TEXT)
+        with stage("interpret"):
+            interpreter.process_page(page)
+        with stage("convert"):
+            return build_raw_layout(page_number, device.runs, device.page_bbox, page.mediabox, self.font_table)
+
+    def get_layout(self, page_number: int, laparams: LayoutSettings, cache: bool = True) -> Optional[PageLayout]:
+        """
+        Returns the analyzed layout of a page.
+
+        Layouts are looked up in the in-memory cache, then in the on-disk
+        store, and only interpreted with pdfminer on a miss in both.
+
+        Args:
+            page_number (int): The 1-based page number.
+            laparams (LAParams): Layout analysis settings, None to skip
+                                 layout analysis, or RAW_TEXT for a text-only
+                                 layout built without per-glyph objects.
+            cache (bool): If False, a layout not already in memory is not
+                          added to the in-memory cache, for single-pass
+                          scans that would only evict more useful entries.
+
+        Returns:
+            The PageLayout for the page, or None if the page does not exist.
+        """
+        settings_key = laparams_key(laparams)
+        cache_key = None
+        if self.layout_cache is not None:
+            cache_key = (self.doc_id, page_number, settings_key)
+            layout = self.layout_cache.get(cache_key)
+            if layout is not None:
+                count("layout_cache_hits")
+                return layout
+            count("layout_cache_misses")
+
+        layout = None
+        if self.layout_store is not None:
+            with stage("store"):
+                data = self.layout_store.get(self.content_id, settings_key, page_number)
+                if data is not None:
+                    try:
+                        layout = PageLayout.from_dict(data, self.font_table)
+                        count("layout_store_hits")
+                    except (ValueError, KeyError, TypeError) as e:
+                        print(f"Warning: Discarding stored layout for page {page_number}: {e}")
+
+        if layout is None:
+            if laparams == RAW_TEXT:
+                layout = self._analyze_raw_page(page_number)
+            else:
+                lt_page = self.analyze_page(page_number, laparams)
+                if lt_page is not None:
+                    with stage("convert"):
+                        layout = PageLayout.from_ltpage(
+                            page_number, lt_page, self.get_page(page_number).mediabox, self.font_table
+                        )
+            if layout is None:
+                return None
+            count("pages_laid_out")
+            if get_metrics_sink().enabled:
+                count("chars_seen", layout.char_count())
+            if self.layout_store is not None:
+                with stage("store"):
+                    self.layout_store.put(self.content_id, settings_key, page_number, layout.to_dict())
+
+        if cache_key is not None and cache:
+            self.layout_cache.put(cache_key, layout, layout.estimated_size())
+        return layout
+
+
+def _is_count(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _count_from_kids(kids: List) -> Optional[int]:
+    """
+    Returns the page count the root's kids claim: one per /Page kid plus
+    the /Count of each /Pages kid. None if a kid cannot be read, so an
+    inflated or inconsistent root /Count is not trusted.
+    """
+    from pdfminer.pdfpage import LITERAL_PAGE, LITERAL_PAGES
+    from pdfminer.pdftypes import resolve1
+    total = 0
+    for kid in kids:
+        node = resolve1(kid)
+        if not isinstance(node, dict):
+            return None
+        node_type = node.get("Type", node.get("type"))
+        if node_type is LITERAL_PAGE:
+            total += 1
+        elif node_type is LITERAL_PAGES:
+            count = resolve1(node.get("Count"))
+            if not _is_count(count):
+                return None
+            total += count
+        else:
+            return None
+    return total
+
+
+def _file_identity(stream: BinaryIO) -> Optional[str]:
+    """
+    Returns a hex digest identifying a regular file by its metadata, or None
+    if the stream is not backed by one.
+    """
+    try:
+        st = os.fstat(stream.fileno())
+    except (AttributeError, OSError, ValueError):
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    name = getattr(stream, "name", None)
+    return hashlib.sha256(repr((
+        "file", name if isinstance(name, str) else None, st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+    )).encode()).hexdigest()
+
+
+def as_session(source: Union[BinaryIO, PdfSession]) -> PdfSession:
+    """
+    Returns `source` if it is already a PdfSession, otherwise parses the
+    given file stream into a new one.
+    """
+    if isinstance(source, PdfSession):
+        return source
+    return PdfSession(source)
@@ -0,0 +1,180 @@
+"""
+Opt-in cProfile capture of slow tool calls.
+
+When profiling is on, every outermost tool call runs under cProfile, and
+calls that take at least `threshold` seconds have their profile written
+to a directory; faster calls are discarded. This makes it possible to see
+why one document or page is pathological without profiling everything.
+
+Turn it on for a block of code:
+
+    with profile_calls("profiles", threshold=5.0):
+        detect_tables_on_page(session, 12)
+
+or for a whole process (and the worker processes it starts) through the
+environment:
+
+    PDFDOCINTEL_PROFILE_DIR=profiles PDFDOCINTEL_PROFILE_THRESHOLD=5 python ...
+
+Each profile is a `.pstats` file named after the tool, document hash and
+page, e.g. `detect_tables_on_page-3f2a9c01d4e5-p12-1718000000123-4242.pstats`,
+next to a `.json` file with the full document hash, page, duration and
+time. Read them with `python -m pstats <file>` or snakeviz.
+
+cProfile makes the profiled calls several times slower (about 3x for
+layout analysis), and the threshold applies to the profiled duration.
+"""
+import hashlib
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional
+
+# Environment variables read when this module is first imported
+PROFILE_DIR_ENV = "PDFDOCINTEL_PROFILE_DIR"
+PROFILE_THRESHOLD_ENV = "PDFDOCINTEL_PROFILE_THRESHOLD"
+
+# Calls faster than this (in seconds) are not written out by default
+DEFAULT_THRESHOLD = 1.0
+
+# Arguments that identify the document and page of a tool call
+_DOCUMENT_ARGS = ("file_stream", "path")
+_PAGE_ARG = "page_number"
+
+
+@dataclass(frozen=True)
+class ProfileSettings:
+    """Where profiles are written and which calls are slow enough to keep."""
+    directory: str
+    threshold: float = DEFAULT_THRESHOLD
+
+
+def _settings_from_env() -> Optional[ProfileSettings]:
+    directory = os.environ.get(PROFILE_DIR_ENV)
+    if not directory:
+        return None
+    threshold = os.environ.get(PROFILE_THRESHOLD_ENV)
+    try:
+        return ProfileSettings(directory, float(threshold) if threshold else DEFAULT_THRESHOLD)
+    except ValueError:
+        print(f"Warning: Ignoring invalid {PROFILE_THRESHOLD_ENV}={threshold!r}; using {DEFAULT_THRESHOLD}s.")
+        return ProfileSettings(directory, DEFAULT_THRESHOLD)
+
+
+_default_settings: Optional[ProfileSettings] = _settings_from_env()
+_scoped_settings: ContextVar[Optional[ProfileSettings]] = ContextVar("scoped_profile_settings", default=None)
+_profiling: ContextVar[bool] = ContextVar("profiling", default=False)
+
+
+def set_profiling(settings: Optional[ProfileSettings]) -> None:
+    """Turns profiling on for the whole process; None turns it off."""
+    global _default_settings
+    _default_settings = settings
+
+
+def get_profile_settings() -> Optional[ProfileSettings]:
+    """Returns the settings of the current context, or the process-wide ones."""
+    return _scoped_settings.get() or _default_settings
+
+
+@contextmanager
+def profile_calls(directory: str, threshold: float = DEFAULT_THRESHOLD) -> Iterator[ProfileSettings]:
+    """
+    Profiles the tool calls made in this context (thread or task).
+
+    Args:
+        directory (str): Where to write the profiles; created if missing.
+        threshold (float): Minimum call duration in seconds for a profile to be kept.
+    """
+    settings = ProfileSettings(directory, threshold)
+    token = _scoped_settings.set(settings)
+    try:
+        yield settings
+    finally:
+        _scoped_settings.reset(token)
+
+
+def profile_call(settings: ProfileSettings, func: Callable, *args, **kwargs):
+    """
+    Runs `func` under cProfile and writes the profile if the call took at
+    least `settings.threshold` seconds. Calls nested in a profiled call
+    are part of its profile and are not profiled separately.
+    """
+    if _profiling.get():
+        return func(*args, **kwargs)
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler (e.g. a debugger's) is already active in this thread
+        return func(*args, **kwargs)
+    token = _profiling.set(True)
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - started
+        _profiling.reset(token)
+        if elapsed >= settings.threshold:
+            try:
+                _write_profile(settings.directory, profiler, func, args, kwargs, elapsed)
+            except OSError as e:
+                print(f"Warning: Could not write profile of {func.__name__}: {e}")
+
+
+def _write_profile(directory: str, profiler: "cProfile.Profile", func: Callable, args, kwargs, elapsed: float) -> str:
+    import json
+    tags = _call_tags(func, args, kwargs)
+    now = time.time()
+    page = f"-p{tags['page']}" if tags["page"] is not None else ""
+    doc = f"-{tags['document'][:12]}" if tags["document"] else ""
+    stem = os.path.join(directory, f"{func.__name__}{doc}{page}-{int(now * 1000)}-{os.getpid()}")
+    os.makedirs(directory, exist_ok=True)
+    profiler.dump_stats(stem + ".pstats")
+    with open(stem + ".json", "w", encoding="utf-8") as f:
+        json.dump({"tool": func.__name__, "seconds": elapsed, "time": now, **tags}, f)
+    return stem + ".pstats"
+
+
+def _call_tags(func: Callable, args, kwargs) -> Dict:
+    """Returns the document hash and page number of a tool call, where it has them."""
+    try:
+        arguments = inspect.signature(func).bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        arguments = {}
+    document = next((arguments[name] for name in _DOCUMENT_ARGS if name in arguments), None)
+    page = arguments.get(_PAGE_ARG)
+    return {
+        "document": _document_hash(document),
+        "page": page if isinstance(page, int) else None,
+    }
+
+
+def _document_hash(document) -> Optional[str]:
+    """The session's doc_id, the SHA-256 of a path or URI, or of a stream's contents."""
+    try:
+        doc_id = getattr(document, "doc_id", None)
+    except (OSError, ValueError):
+        # A session whose file has been closed
+        return None
+    if isinstance(doc_id, str):
+        return doc_id
+    if isinstance(document, (str, os.PathLike)):
+        return hashlib.sha256(os.fspath(document).encode()).hexdigest()
+    if hasattr(document, "read") and hasattr(document, "seek"):
+        try:
+            position = document.tell()
+            document.seek(0)
+            digest = hashlib.sha256()
+            for chunk in iter(lambda: document.read(1024 * 1024), b""):
+                digest.update(chunk)
+            document.seek(position)
+            return digest.hexdigest()
+        except (OSError, ValueError):
+            return None
+    return None
@@ -0,0 +1,154 @@
+"""
+A lightweight text-only device for scans that do not need layout analysis.
+
+PDFPageAggregator builds an LTChar object (bounding box, matrix, graphic
+state) for every glyph and then clusters characters into lines and lines into
+boxes. Keyword search, page counting and header/footer voting only need the
+text and roughly where it sits, so TextRunDevice records one run per
+text-showing operator instead, and `build_raw_layout` joins runs on the same
+baseline into lines. Rectangles, lines and images are ignored.
+"""
+from array import array
+from typing import List, Optional
+from pdfminer.pdfdevice import PDFTextDevice
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.utils import apply_matrix_pt, mult_matrix
+from page_layout import BBox, FontTable, PageLayout, TextBox, TextLine
+
+# Gaps wider than this fraction of the font size are treated as word breaks,
+# matching pdfminer's default LAParams.word_margin
+WORD_MARGIN = 0.1
+
+
+class TextRun:
+    __slots__ = ("text", "x0", "y0", "x1", "y1", "size", "fontname")
+
+    def __init__(self, text: str, x0: float, y0: float, x1: float, y1: float, size: float, fontname: str):
+        self.text = text
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        self.size = size
+        self.fontname = fontname
+
+
+class TextRunDevice(PDFTextDevice):
+    """Collects the text runs of a page without creating per-glyph objects."""
+
+    def __init__(self, rsrcmgr):
+        super().__init__(rsrcmgr)
+        self.runs: List[TextRun] = []
+        self.page_bbox: Optional[BBox] = None
+
+    def begin_page(self, page, ctm) -> None:
+        self.runs = []
+        (x0, y0, x1, y1) = page.mediabox
+        (x0, y0) = apply_matrix_pt(ctm, (x0, y0))
+        (x1, y1) = apply_matrix_pt(ctm, (x1, y1))
+        self.page_bbox = (0, 0, abs(x0 - x1), abs(y0 - y1))
+
+    def render_string(self, textstate, seq, ncs, graphicstate) -> None:
+        font = textstate.font
+        if font is None or self.ctm is None:
+            return
+        matrix = mult_matrix(textstate.matrix, self.ctm)
+        fontsize = textstate.fontsize
+        scaling = textstate.scaling * 0.01
+        charspace = textstate.charspace * scaling
+        wordspace = 0 if font.is_multibyte() else textstate.wordspace * scaling
+        dxscale = 0.001 * fontsize * scaling
+        vertical = font.is_vertical()
+
+        (x, y) = textstate.linematrix
+        start = (x, y)
+        pieces = []
+        for obj in seq:
+            if isinstance(obj, (int, float)):
+                # A large negative adjustment in a TJ array is a word gap
+                if -obj * dxscale > WORD_MARGIN * fontsize and pieces and not pieces[-1].isspace():
+                    pieces.append(" ")
+                if vertical:
+                    y -= obj * dxscale
+                else:
+                    x -= obj * dxscale
+            elif isinstance(obj, bytes):
+                for cid in font.decode(obj):
+                    try:
+                        pieces.append(font.to_unichr(cid))
+                    except PDFUnicodeNotDefined:
+                        pieces.append(f"(cid:{cid})")
+                    advance = font.char_width(cid) * fontsize * scaling + charspace
+                    if cid == 32:
+                        advance += wordspace
+                    if vertical:
+                        y += advance
+                    else:
+                        x += advance
+        textstate.linematrix = (x, y)
+        if not pieces:
+            return
+
+        descent = font.get_descent() * fontsize + textstate.rise
+        (ax, ay) = apply_matrix_pt(matrix, (start[0], start[1] + descent))
+        (bx, by) = apply_matrix_pt(matrix, (x, y + descent + fontsize))
+        self.runs.append(TextRun(
+            "".join(pieces),
+            min(ax, bx), min(ay, by), max(ax, bx), max(ay, by),
+            fontsize * (matrix[2] ** 2 + matrix[3] ** 2) ** 0.5,
+            font.fontname,
+        ))
+
+
+def build_raw_layout(
+    page_number: int,
+    runs: List[TextRun],
+    bbox: BBox,
+    mediabox: BBox,
+    fonts: Optional[FontTable] = None
+) -> PageLayout:
+    """
+    Joins consecutive runs that share a baseline into lines and returns them
+    as a PageLayout with one single-line text box per line. Font names are
+    interned into `fonts` (the document's table) or a new table.
+    """
+    layout = PageLayout(
+        page_number=page_number,
+        bbox=tuple(bbox),
+        mediabox=tuple(mediabox),
+        fonts=fonts if fonts is not None else FontTable(),
+    )
+    line_runs: List[TextRun] = []
+
+    def flush() -> None:
+        if not line_runs:
+            return
+        parts = [line_runs[0].text]
+        for previous, run in zip(line_runs, line_runs[1:]):
+            gap = run.x0 - previous.x1
+            if gap > WORD_MARGIN * run.size and not parts[-1].endswith(" ") and not run.text.startswith(" "):
+                parts.append(" ")
+            parts.append(run.text)
+        text = "".join(parts) + "\n"
+        line_bbox = (
+            min(r.x0 for r in line_runs), min(r.y0 for r in line_runs),
+            max(r.x1 for r in line_runs), max(r.y1 for r in line_runs),
+        )
+        font_ids, sizes = array("I"), array("d")
+        for run in line_runs:
+            count = len(run.text)
+            font_ids.extend([layout.fonts.intern(run.fontname)] * count)
+            sizes.extend([run.size] * count)
+        line = TextLine(text, line_bbox, font_ids, sizes)
+        layout.text_boxes.append(TextBox(text, line_bbox, [line]))
+        line_runs.clear()
+
+    for run in runs:
+        if line_runs:
+            previous = line_runs[-1]
+            same_line = abs(run.y0 - previous.y0) < 0.5 * max(run.size, previous.size)
+            if not same_line or run.x0 < previous.x0:
+                flush()
+        line_runs.append(run)
+    flush()
+    return layout
@@ -0,0 +1,209 @@
+"""
+Spatial lookups over the bounding boxes of a page.
+
+Tools such as table detection ask, for every candidate region, which of the
+page's text boxes and lines lie inside it. Scanning every box for every
+region is O(R * N), which is slow on drawings and spreadsheet-style pages
+with thousands of rectangles and lines. A BBoxIndex keeps the boxes sorted by
+their bottom edge, so a query only looks at the boxes whose vertical extent
+can satisfy it, found with a binary search.
+
+`merge_overlapping` clusters boxes that overlap each other significantly
+(duplicate detections of the same table, for example) on top of the index.
+"""
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Sequence, Tuple
+
+BBox = Tuple[float, float, float, float]
+
+# Widens the lower bound of the y0 search. `lower - max_height` can round
+# to just above the y0 of the tallest box, which would drop a box whose top
+# edge touches the query; the exact y1 test still decides membership.
+_Y_SEARCH_SLACK = 1e-6
+
+
+class BBoxIndex:
+    """
+    An immutable index over a sequence of (x0, y0, x1, y1) boxes. Queries
+    return positions in the original sequence, in their original order.
+    """
+    __slots__ = ("size", "_ids", "_x0", "_y0", "_x1", "_y1", "_max_height", "_irregular")
+
+    def __init__(self, bboxes: Sequence[BBox]):
+        """
+        Args:
+            bboxes (Sequence[BBox]): The boxes to index.
+        """
+        self.size = len(bboxes)
+        ids = [i for i, b in enumerate(bboxes) if b[1] <= b[3]]
+        ids.sort(key=lambda i: bboxes[i][1])
+        self._ids = ids
+        self._x0 = [bboxes[i][0] for i in ids]
+        self._y0 = [bboxes[i][1] for i in ids]
+        self._x1 = [bboxes[i][2] for i in ids]
+        self._y1 = [bboxes[i][3] for i in ids]
+        # Bounds how far below a query a box can start and still reach it
+        self._max_height = max((y1 - y0 for y0, y1 in zip(self._y0, self._y1)), default=0)
+        # Boxes with y0 > y1 cannot be found by the y0 search; they are rare
+        # enough to be checked one by one
+        self._irregular = [(i, tuple(b)) for i, b in enumerate(bboxes) if not b[1] <= b[3]]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _inside_positions(self, outer: BBox) -> List[int]:
+        ox0, oy0, ox1, oy1 = outer
+        # A contained box has oy0 <= y0 <= y1 <= oy1
+        lo = bisect_left(self._y0, oy0)
+        hi = bisect_right(self._y0, oy1)
+        x0, x1, y1 = self._x0, self._x1, self._y1
+        return [k for k in range(lo, hi) if ox0 <= x0[k] and ox1 >= x1[k] and oy1 >= y1[k]]
+
+    def inside(self, outer: BBox) -> List[int]:
+        """
+        Returns the positions of the boxes that lie entirely inside `outer`
+        (edges may touch), in ascending order.
+        """
+        ids = self._ids
+        found = [ids[k] for k in self._inside_positions(outer)]
+        ox0, oy0, ox1, oy1 = outer
+        found.extend(
+            i for i, (x0, y0, x1, y1) in self._irregular
+            if ox0 <= x0 and oy0 <= y0 and ox1 >= x1 and oy1 >= y1
+        )
+        found.sort()
+        return found
+
+    def count_inside(self, outer: BBox) -> int:
+        """Returns the number of boxes that lie entirely inside `outer`."""
+        count = len(self._inside_positions(outer))
+        if self._irregular:
+            ox0, oy0, ox1, oy1 = outer
+            count += sum(
+                1 for _, (x0, y0, x1, y1) in self._irregular
+                if ox0 <= x0 and oy0 <= y0 and ox1 >= x1 and oy1 >= y1
+            )
+        return count
+
+    def _lowest_reaching(self, y: float) -> int:
+        """Returns the first position whose box could reach up to `y`."""
+        return bisect_left(self._y0, y - self._max_height - _Y_SEARCH_SLACK)
+
+    def overlapping(self, bbox: BBox, strict: bool = False) -> List[int]:
+        """
+        Returns the positions of the boxes that overlap `bbox`, in ascending
+        order.
+
+        Args:
+            bbox (BBox): The query box.
+            strict (bool): If True, boxes must share a non-zero area with the
+                           query; otherwise touching edges count as overlap.
+        """
+        bx0, by0, bx1, by1 = bbox
+        lo = self._lowest_reaching(by0)
+        hi = bisect_right(self._y0, by1)
+        ids, x0, y0, x1, y1 = self._ids, self._x0, self._y0, self._x1, self._y1
+        if strict:
+            found = [
+                ids[k] for k in range(lo, hi)
+                if min(bx1, x1[k]) > max(bx0, x0[k]) and min(by1, y1[k]) > max(by0, y0[k])
+            ]
+            found.extend(
+                i for i, (ax0, ay0, ax1, ay1) in self._irregular
+                if min(bx1, ax1) > max(bx0, ax0) and min(by1, ay1) > max(by0, ay0)
+            )
+        else:
+            found = [
+                ids[k] for k in range(lo, hi)
+                if not (x1[k] < bx0 or x0[k] > bx1 or y1[k] < by0 or y0[k] > by1)
+            ]
+            found.extend(
+                i for i, (ax0, ay0, ax1, ay1) in self._irregular
+                if not (ax1 < bx0 or ax0 > bx1 or ay1 < by0 or ay0 > by1)
+            )
+        found.sort()
+        return found
+
+    def in_y_band(self, lower: float, upper: float) -> List[int]:
+        """
+        Returns the positions of the boxes that reach into the horizontal
+        band between `lower` and `upper` (edges may touch), in ascending
+        order.
+        """
+        lo = self._lowest_reaching(lower)
+        hi = bisect_right(self._y0, upper)
+        ids, y1 = self._ids, self._y1
+        found = [ids[k] for k in range(lo, hi) if not y1[k] < lower]
+        found.extend(i for i, (_, y0, _, top) in self._irregular if not (y0 > upper or top < lower))
+        found.sort()
+        return found
+
+
+def merge_overlapping(
+    bboxes: Sequence[BBox],
+    scores: Optional[Sequence[float]] = None,
+    min_overlap: float = 0.5,
+    transitive: bool = False
+) -> List[Tuple[int, BBox, List[int]]]:
+    """
+    Clusters boxes that overlap significantly.
+
+    Boxes are visited from the highest score to the lowest (ties keep their
+    input order). Each box not yet merged becomes the base of a cluster and
+    absorbs every remaining box whose intersection with the base covers
+    more than `min_overlap` of that box's own area. Candidates are found
+    through a BBoxIndex instead of comparing every pair.
+
+    Args:
+        bboxes (Sequence[BBox]): The boxes to cluster.
+        scores (Sequence[float]): Optional score per box, higher first.
+                                  Defaults to the input order.
+        min_overlap (float): Fraction of a box's area that must lie inside
+                             the base for it to be merged.
+        transitive (bool): If False, each box is only compared with its
+                           base's original bounds, in a single pass. If
+                           True, a base keeps absorbing boxes that overlap
+                           its grown bounds until none are left, so chains
+                           of overlapping boxes end up in one cluster.
+
+    Returns:
+        List[Tuple[int, BBox, List[int]]]: One (base position, merged bounds,
+        positions of all members including the base) tuple per cluster, in
+        visiting order.
+    """
+    order = list(range(len(bboxes)))
+    if scores is not None:
+        order.sort(key=lambda i: -scores[i])
+    index = BBoxIndex(bboxes)
+    merged = [False] * len(bboxes)
+
+    clusters = []
+    for base in order:
+        if merged[base]:
+            continue
+        merged[base] = True
+        members = [base]
+        bounds = tuple(bboxes[base])
+        query = bounds
+        while True:
+            bx0, by0, bx1, by1 = query
+            absorbed = []
+            for other in index.overlapping(query, strict=True):
+                if merged[other]:
+                    continue
+                ox0, oy0, ox1, oy1 = bboxes[other]
+                intersection_area = (min(bx1, ox1) - max(bx0, ox0)) * (min(by1, oy1) - max(by0, oy0))
+                other_area = (ox1 - ox0) * (oy1 - oy0)
+                if intersection_area / other_area > min_overlap:
+                    absorbed.append(other)
+            for other in absorbed:
+                merged[other] = True
+                ox0, oy0, ox1, oy1 = bboxes[other]
+                bounds = (min(bounds[0], ox0), min(bounds[1], oy0), max(bounds[2], ox1), max(bounds[3], oy1))
+            members.extend(absorbed)
+            if not (transitive and absorbed):
+                break
+            query = bounds
+        members.sort()
+        clusters.append((base, bounds, members))
+    return clusters
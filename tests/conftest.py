@@ -0,0 +1,47 @@
+from io import BytesIO
+
+import pytest
+
+# The synthetic PDF writer and the fake S3 client are shared with the
+# benchmarks; tests get them through the fixtures below
+from benchmarks import pdf_factory, s3_stub
+
+
+def _report_page(page_number: int) -> dict:
+    return {
+        "texts": [
+            (72, 740, 10, "Quarterly Report"),
+            (72, 700, 18, f"Section {page_number}", "bold"),
+            (72, 660, 11, f"Body text for page {page_number} about Transparency."),
+            (72, 640, 11, "A second paragraph with more details."),
+            (72, 40, 9, "Confidential"),
+        ],
+        "rects": [(50, 100, 400, 300)],
+        "lines": [(60, 150, 300, 150)],
+    }
+
+
+@pytest.fixture
+def build_pdf():
+    """`pdf_factory.build_pdf`, which writes a synthetic PDF from page specs."""
+    return pdf_factory.build_pdf
+
+
+@pytest.fixture
+def stub_s3_client():
+    """The in-memory S3 client class, built from {(bucket, key): bytes}."""
+    return s3_stub.StubS3Client
+
+
+@pytest.fixture
+def report_pdf_bytes(build_pdf) -> bytes:
+    """A small five page report with a running header and footer."""
+    return build_pdf(
+        [_report_page(n) for n in range(1, 6)],
+        outline=[{"title": "Section 1", "page": 1}, {"title": "Section 3", "page": 3}],
+    )
+
+
+@pytest.fixture
+def report_pdf(report_pdf_bytes) -> BytesIO:
+    return BytesIO(report_pdf_bytes)
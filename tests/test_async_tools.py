@@ -0,0 +1,84 @@
+import asyncio
+import time
+from io import BytesIO
+
+import async_tools
+import text_extraction as te
+from async_tools import AsyncTools
+
+
+def test_async_tools_match_sync_tools(report_pdf_bytes, tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(report_pdf_bytes)
+
+    async def run():
+        async with AsyncTools(cpu_workers=2, scan_chunk_pages=2) as tools:
+            return await asyncio.gather(
+                tools.get_text_from_page(str(path), 3),
+                tools.find_pages_with_keyword("page 4", report_pdf_bytes),
+                tools.find_pages_with_keyword("transparency", str(path), start_page=2, end_page=4),
+                tools.extract_toc(BytesIO(report_pdf_bytes), lazy=True),
+                tools.extract_text_in_bboxes(str(path), 1, bboxes=[(0, 690, 600, 720)]),
+            )
+
+    text, keyword_pages, range_pages, toc, regions = asyncio.run(run())
+    assert text == te.get_text_from_page(BytesIO(report_pdf_bytes), 3)
+    assert keyword_pages == [4]
+    assert range_pages == [2, 3, 4]
+    assert toc == te.extract_toc(BytesIO(report_pdf_bytes))
+    assert regions == te.extract_text_in_bboxes(BytesIO(report_pdf_bytes), 1, [(0, 690, 600, 720)])
+
+
+def test_identical_requests_in_flight_share_one_execution(report_pdf_bytes, monkeypatch):
+    calls = []
+
+    def counting_run_tool(name, *args):
+        calls.append(name)
+        time.sleep(0.05)
+        return name
+
+    monkeypatch.setattr(async_tools, "_run_tool", counting_run_tool)
+
+    async def run():
+        async with AsyncTools(cpu_workers=2, use_processes=False) as tools:
+            first = asyncio.ensure_future(tools.get_text_from_page(report_pdf_bytes, 2))
+            results = await asyncio.gather(*(tools.get_text_from_page(report_pdf_bytes, 2) for _ in range(3)))
+            # Cancelling one of several waiters leaves the shared call running
+            waiter = asyncio.ensure_future(tools.get_text_from_page(report_pdf_bytes, 5))
+            other = asyncio.ensure_future(tools.get_text_from_page(report_pdf_bytes, 5))
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            return results + [await first, await other]
+
+    assert asyncio.run(run()) == ["get_text_from_page"] * 5
+    assert calls == ["get_text_from_page"] * 2
+
+
+def test_cancelling_a_scan_stops_page_iteration(monkeypatch, build_pdf):
+    data = build_pdf([{"texts": [(72, 700, 11, f"Page {n}")]} for n in range(1, 41)])
+    chunks = []
+    original = async_tools._run_tool
+
+    def slow_run_tool(name, key, max_sessions, args, kwargs):
+        if name == "find_pages_with_keyword":
+            chunks.append(args[1])
+            time.sleep(0.02)
+        return original(name, key, max_sessions, args, kwargs)
+
+    monkeypatch.setattr(async_tools, "_run_tool", slow_run_tool)
+
+    async def run():
+        async with AsyncTools(cpu_workers=1, use_processes=False, scan_chunk_pages=1) as tools:
+            scan = asyncio.ensure_future(tools.find_pages_with_keyword("page", data))
+            while len(chunks) < 3:
+                await asyncio.sleep(0.01)
+            scan.cancel()
+            try:
+                await scan
+            except asyncio.CancelledError:
+                pass
+            await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    # Only the chunks already queued when the scan was cancelled have run
+    assert 3 <= len(chunks) <= 3 + async_tools.SCAN_CHUNKS_PER_WORKER
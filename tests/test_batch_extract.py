@@ -0,0 +1,66 @@
+import json
+import time
+
+import batch_extract
+from batch_extract import discover_documents, main, run_batch
+
+
+def _write_corpus(directory, report_pdf_bytes):
+    (directory / "nested").mkdir(parents=True)
+    (directory / "a.pdf").write_bytes(report_pdf_bytes)
+    (directory / "nested" / "b.pdf").write_bytes(report_pdf_bytes)
+    (directory / "broken.pdf").write_bytes(b"not a pdf")
+    (directory / "notes.txt").write_text("ignored")
+
+
+def test_discover_documents_from_directory_glob_and_manifest(tmp_path, report_pdf_bytes):
+    docs = tmp_path / "docs"
+    _write_corpus(docs, report_pdf_bytes)
+    expected = [str(docs / "a.pdf"), str(docs / "broken.pdf"), str(docs / "nested" / "b.pdf")]
+    assert discover_documents(str(docs)) == expected
+    assert discover_documents(str(docs / "*.pdf")) == expected[:2]
+
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(f"# reports\n{docs / 'a.pdf'}\n\ns3://bucket/c.pdf\n")
+    assert discover_documents(str(manifest)) == [str(docs / "a.pdf"), "s3://bucket/c.pdf"]
+
+
+def test_batch_writes_jsonl_and_resumes_from_checkpoint(tmp_path, report_pdf_bytes, capsys):
+    docs = tmp_path / "docs"
+    _write_corpus(docs, report_pdf_bytes)
+    output = tmp_path / "out.jsonl"
+
+    code = main([str(docs), "--tools", "page_count,toc,tables", "-o", str(output), "--workers", "2"])
+    records = {r["uri"]: r for r in map(json.loads, output.read_text().splitlines())}
+    assert code == 2  # broken.pdf failed
+    assert records[str(docs / "a.pdf")]["status"] == "ok"
+    assert records[str(docs / "a.pdf")]["pages"] == 5
+    assert records[str(docs / "a.pdf")]["results"]["page_count"] == 5
+    assert [entry["title"] for entry in records[str(docs / "a.pdf")]["results"]["toc"]] == ["Section 1", "Section 3"]
+    assert records[str(docs / "broken.pdf")]["status"] == "error"
+    assert "docs/s" in capsys.readouterr().err
+
+    # A resumed run skips everything already in the checkpoint
+    (docs / "c.pdf").write_bytes(report_pdf_bytes)
+    summary = run_batch(discover_documents(str(docs)), output=str(output), workers=0, resume=True)
+    assert (summary["documents"], summary["skipped"], summary["pages"]) == (1, 3, 5)
+    assert len(output.read_text().splitlines()) == 4
+
+
+def test_documents_without_outline_have_empty_toc(tmp_path, build_pdf):
+    path = tmp_path / "plain.pdf"
+    path.write_bytes(build_pdf([{"texts": [(72, 700, 11, "No outline here")]}]))
+    summary = run_batch([str(path)], output=str(tmp_path / "out.jsonl"), workers=0)
+    [record] = map(json.loads, (tmp_path / "out.jsonl").read_text().splitlines())
+    assert summary["ok"] == 1 and record["results"]["toc"] == []
+
+
+def test_slow_documents_time_out(tmp_path, report_pdf_bytes, monkeypatch):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(report_pdf_bytes)
+    monkeypatch.setitem(batch_extract.DOCUMENT_TOOLS, "slow", lambda session: time.sleep(5))
+
+    started = time.perf_counter()
+    summary = run_batch([str(path)], tools=["slow"], output=str(tmp_path / "out.jsonl"), workers=0, timeout=0.2)
+    assert summary["timeout"] == 1
+    assert time.perf_counter() - started < 2
@@ -0,0 +1,104 @@
+import io
+import time
+
+import pytest
+
+from instrumentation import PrometheusSink, use_metrics_sink
+from utils import file_loader
+from utils.file_cache import FileCache
+
+
+def test_put_and_get_count_hits_and_misses(tmp_path):
+    cache = FileCache(tmp_path, max_bytes=1000)
+    assert cache.get("a") is None
+    path = cache.put("a", b"hello", uri="s3://b/a", etag='"1"')
+    assert cache.get("a") == path
+    assert path.read_bytes() == b"hello"
+    assert cache.get_meta("a")["etag"] == '"1"'
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "stale": 0, "entries": 1, "bytes": 5}
+
+
+@pytest.mark.parametrize("policy, survivor", [("lru", "b"), ("lfu", "a")])
+def test_eviction_keeps_cache_under_cap(tmp_path, policy, survivor):
+    cache = FileCache(tmp_path, max_bytes=250, policy=policy)
+    cache.put("a", b"x" * 100)
+    for _ in range(3):
+        cache.get("a")
+    time.sleep(0.01)
+    cache.put("b", b"y" * 100)
+    time.sleep(0.01)
+    cache.get("b")
+    sink = PrometheusSink()
+    with use_metrics_sink(sink):
+        cache.put("c", b"z" * 100)
+    assert cache.total_bytes() <= 250
+    assert cache.evictions == 1
+    assert sink.snapshot()["counters"] == {("file_cache_evictions", ()): 1}
+    assert cache.get(survivor) is not None and cache.get("c") is not None
+    # Larger than the whole cache: not kept
+    assert cache.put("huge", b"h" * 300) is None
+
+
+def test_failed_write_leaves_no_entry(tmp_path):
+    class Broken(io.RawIOBase):
+        def readable(self):
+            return True
+
+        def readinto(self, buffer):
+            raise IOError("connection reset")
+
+    cache = FileCache(tmp_path)
+    with pytest.raises(IOError):
+        cache.put("a", Broken())
+    assert cache.get("a") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_loader_revalidates_with_head(tmp_path, monkeypatch, stub_s3_client):
+    client = stub_s3_client({("bucket", "doc.pdf"): b"version one"})
+    monkeypatch.setattr(file_loader, "get_s3_client", lambda: client)
+    cache = FileCache(tmp_path)
+
+    assert file_loader.open_file_from_path_or_s3("s3://bucket/doc.pdf", cache=cache).read() == b"version one"
+    with file_loader.open_file_from_path_or_s3("s3://bucket/doc.pdf", cache=cache, revalidate=True) as f:
+        assert f.read() == b"version one"
+    assert client.calls == [("get_object", "doc.pdf"), ("head_object", "doc.pdf")]
+
+    client.put("bucket", "doc.pdf", b"version two")
+    assert file_loader.open_file_from_path_or_s3("s3://bucket/doc.pdf", cache=cache, revalidate=True).read() == b"version two"
+    assert (cache.hits, cache.stale) == (1, 1)
+
+
+def test_loader_revalidates_only_after_ttl(tmp_path, monkeypatch, stub_s3_client):
+    client = stub_s3_client({("bucket", "doc.pdf"): b"version one"})
+    monkeypatch.setattr(file_loader, "get_s3_client", lambda: client)
+    cache = FileCache(tmp_path)
+    uri = "s3://bucket/doc.pdf"
+
+    file_loader.open_file_from_path_or_s3(uri, cache=cache).close()
+    # Fresh copies are used without a HEAD request
+    for _ in range(3):
+        file_loader.open_file_from_path_or_s3(uri, cache=cache).close()
+    assert client.calls == [("get_object", "doc.pdf")]
+
+    # Once the TTL has passed, one HEAD request renews it
+    later = time.time() + file_loader.DEFAULT_REVALIDATE_SECONDS + 1
+    monkeypatch.setattr(time, "time", lambda: later)
+    for _ in range(2):
+        file_loader.open_file_from_path_or_s3(uri, cache=cache).close()
+    file_loader.open_file_from_path_or_s3(uri, cache=cache, revalidate=False).close()
+    assert client.calls == [("get_object", "doc.pdf"), ("head_object", "doc.pdf")]
+    assert cache.hits == 6
+
+
+def test_put_keeps_a_running_total_instead_of_rescanning(tmp_path, monkeypatch):
+    cache = FileCache(tmp_path, max_bytes=1000)
+    cache.put("a", b"x" * 100)
+    monkeypatch.setattr(cache, "_entries", lambda: pytest.fail("under the cap, put should not scan"))
+    cache.put("b", b"y" * 200)
+    cache.put("a", b"z" * 50)
+    cache.remove("b")
+    assert cache.total_bytes() == 50
+    monkeypatch.undo()
+    cache.put("c", b"w" * 990)
+    assert cache.total_bytes() == 990 and cache.evictions == 1
@@ -0,0 +1,51 @@
+from io import BytesIO
+
+import pytest
+
+import text_extraction as te
+from page_map import sample_page_numbers
+from pdf_session import PdfSession
+from utils.layout_cache import LayoutCache
+
+
+@pytest.fixture
+def long_document(build_pdf) -> bytes:
+    pages = 60
+    # Front matter without running text, then letter and taller pages
+    front = [{"texts": [(200, 400, 24, "Title Page")]} for _ in range(12)]
+    body = []
+    for n in range(13, pages + 1):
+        height = 792 if n % 2 else 1008
+        body.append({
+            "mediabox": (0, 0, 612, height),
+            "texts": [
+                (72, height - 40, 9, "Annual Filing"),
+                (72, height / 2, 11, f"Body of page {n}."),
+                (72, 30, 9, "Prepared for the board"),
+            ],
+        })
+    return build_pdf(front + body)
+
+
+def test_sample_is_spread_and_reproducible():
+    pages = sample_page_numbers(1000, 20, seed=5)
+    assert pages == sample_page_numbers(1000, 20, seed=5)
+    assert len(set(pages)) == 20
+    assert sorted((p - 1) // 50 for p in pages) == list(range(20))
+    assert sorted(sample_page_numbers(4, 10)) == [1, 2, 3, 4]
+
+
+def test_sampled_detection_reaches_past_front_matter(long_document):
+    session = PdfSession(BytesIO(long_document))
+    assert te.find_headers_and_footers(session) == {"headers": [], "footers": []}
+    result = te.find_headers_and_footers(session, scan_pages=30, sample=True)
+    assert result == {"headers": ["Annual Filing"], "footers": ["Prepared for the board"]}
+    raw = te.find_headers_and_footers(session, scan_pages=30, sample=True, text_mode="raw")
+    assert raw == result
+
+
+def test_sampled_detection_stops_once_stable(long_document):
+    cache = LayoutCache()
+    session = PdfSession(BytesIO(long_document), layout_cache=cache)
+    te.find_headers_and_footers(session, scan_pages=60, sample=True)
+    assert cache.stats()["pages"] < 60
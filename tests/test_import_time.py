@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules only needed by S3 access, the metrics endpoint, profiling or worker pools
+DEFERRED = ("boto3", "botocore", "s3transfer", "http.server", "cProfile", "multiprocessing")
+
+# Only needed once a document is opened
+PARSER = "pdfminer"
+
+
+def import_times(code: str) -> Dict[str, int]:
+    """
+    Runs `code` in a fresh interpreter under `-X importtime` and returns the
+    cumulative import time in microseconds of every module it imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def _deferred_imports(times: Dict[str, int], deferred=DEFERRED):
+    return sorted(name for name in times if name.split(".")[0] in deferred or name in deferred)
+
+
+@pytest.mark.parametrize("module", ["text_extraction", "utils.file_loader", "instrumentation", "batch_extract"])
+def test_tool_modules_defer_heavy_imports(module):
+    times = import_times(f"import {module}")
+    assert module in times
+    assert _deferred_imports(times, DEFERRED + (PARSER,)) == []
+
+
+def test_importing_text_extraction_does_not_import_pdfminer():
+    subprocess.run(
+        [sys.executable, "-c", "import sys, text_extraction; assert 'pdfminer' not in sys.modules"],
+        cwd=ROOT, check=True,
+    )
+
+
+def test_pdfminer_names_are_still_importable_from_text_extraction():
+    from pdfminer.layout import LAParams
+    import text_extraction as te
+    assert te.LAParams is LAParams
+    with pytest.raises(AttributeError):
+        te.no_such_name
+
+
+def test_opening_a_local_file_does_not_import_boto3(tmp_path, report_pdf_bytes):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(report_pdf_bytes)
+    times = import_times(
+        "from utils.file_loader import open_file_from_path_or_s3\n"
+        "import text_extraction as te\n"
+        f"assert te.get_total_page_count(open_file_from_path_or_s3({str(path)!r})) == 5\n"
+    )
+    assert _deferred_imports(times) == []
+
+
+def test_s3_client_imports_boto3_on_first_use():
+    times = import_times(
+        "import os\n"
+        "os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')\n"
+        "from utils import file_loader\n"
+        "file_loader.get_s3_client()\n"
+        "assert file_loader.boto3.__name__ == 'boto3'\n"
+    )
+    assert "boto3" in times
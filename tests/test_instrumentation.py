@@ -0,0 +1,91 @@
+import time
+import urllib.request
+
+import pytest
+
+from instrumentation import CallbackSink, PrometheusSink, count, get_metrics_sink, stage, use_metrics_sink
+from pdf_session import PdfSession
+from text_extraction import get_text_from_page
+from utils import file_loader
+from utils.file_cache import FileCache
+
+
+def _stage_counts(sink, tool):
+    return {
+        dict(labels)["stage"]: calls
+        for (name, labels), (calls, _) in sink.snapshot()["durations"].items()
+        if name == "stage_seconds" and dict(labels).get("tool") == tool
+    }
+
+
+def test_tool_calls_record_stages_and_counters(report_pdf):
+    sink = PrometheusSink()
+    with use_metrics_sink(sink), PdfSession(report_pdf) as session:
+        get_text_from_page(session, 2)
+        get_text_from_page(session, 2)
+
+    stages = _stage_counts(sink, "get_text_from_page")
+    assert stages["postprocess"] == 2
+    assert {"interpret", "layout", "convert"} <= set(stages)
+    counters = sink.snapshot()["counters"]
+    assert counters[("pages_laid_out", (("tool", "get_text_from_page"),))] == 1
+    assert counters[("layout_cache_hits", (("tool", "get_text_from_page"),))] == 1
+
+    text = sink.render()
+    assert '# TYPE pdfdocintel_tool_seconds histogram' in text
+    assert 'pdfdocintel_tool_seconds_count{tool="get_text_from_page"} 2' in text
+    assert 'pdfdocintel_tool_calls_total{tool="get_text_from_page"} 2' in text
+    assert 'pdfdocintel_stage_seconds_bucket{stage="layout",tool="get_text_from_page",le="+Inf"}' in text
+
+
+def test_stage_times_are_exclusive():
+    observed = []
+    sink = CallbackSink(on_observe=lambda name, seconds, labels: observed.append((labels["stage"], seconds)))
+    with use_metrics_sink(sink):
+        with stage("outer"):
+            with stage("inner"):
+                time.sleep(0.05)
+    times = dict(observed)
+    assert times["inner"] >= 0.05 and times["outer"] < 0.05
+
+
+def test_default_sink_records_nothing(report_pdf):
+    assert not get_metrics_sink().enabled
+    with PdfSession(report_pdf) as session:
+        assert "Section 1" in get_text_from_page(session, 1)
+    count("pages_laid_out")
+
+
+def test_s3_fetches_and_cache_hits_are_counted(tmp_path, monkeypatch, report_pdf_bytes, stub_s3_client):
+    client = stub_s3_client({("bucket", "a.pdf"): report_pdf_bytes})
+    monkeypatch.setattr(file_loader, "get_s3_client", lambda: client)
+    cache = FileCache(tmp_path)
+    sink = PrometheusSink()
+    with use_metrics_sink(sink):
+        for _ in range(2):
+            file_loader.open_file_from_path_or_s3("s3://bucket/a.pdf", cache=cache).close()
+
+    counters = {name: value for (name, _), value in sink.snapshot()["counters"].items()}
+    assert counters["s3_bytes_fetched"] == len(report_pdf_bytes)
+    assert counters["file_cache_misses"] == 1 and counters["file_cache_hits"] == 1
+    assert "s3_fetch" in _stage_counts(sink, "open_file_from_path_or_s3")
+
+
+def test_serve_and_write_textfile(tmp_path, report_pdf):
+    sink = PrometheusSink()
+    with use_metrics_sink(sink):
+        get_text_from_page(report_pdf, 1)
+
+    server = sink.serve()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.read().decode() == sink.render()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url.replace("/metrics", "/other"))
+    finally:
+        server.shutdown()
+
+    path = tmp_path / "pdfdocintel.prom"
+    sink.write_textfile(str(path))
+    assert path.read_text() == sink.render()
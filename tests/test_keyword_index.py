@@ -0,0 +1,60 @@
+from io import BytesIO
+
+import pytest
+
+import text_extraction as te
+from keyword_index import KeywordIndex, build_keyword_index, get_keyword_index
+from pdf_session import PdfSession
+from utils.layout_cache import LayoutCache
+from utils.layout_store import LayoutStore
+
+
+@pytest.fixture
+def index():
+    return KeywordIndex({
+        1: ["Executive Summary\n", "Risk management and transparency.\n"],
+        2: ["Management of risk\n"],
+        3: ["TRANSPARENCY reports\n"],
+    })
+
+
+def test_phrase_and_multi_term_queries(index):
+    assert index.pages_with_token("Risk") == [1, 2]
+    assert index.find_phrase("risk management") == [1]
+    assert index.find_phrase("management of risk") == [2]
+    assert index.search(["risk", "transparency"]) == [1]
+    assert index.search(["summary", "reports"], match_all=False) == [1, 3]
+
+
+def test_substring_search_keeps_case_semantics(index):
+    assert index.find_substring("transparen") == [1, 3]
+    assert index.find_substring("TRANSPAREN", case_sensitive=True) == [3]
+    assert index.find_substring("ment and trans") == [1]
+    assert index.find_substring("Summary Risk") == []  # spans two text boxes
+    assert index.find_substring("transparency", start_page=2) == [3]
+
+
+def test_keyword_search_is_answered_from_persisted_index(report_pdf_bytes, tmp_path, monkeypatch):
+    store = LayoutStore(tmp_path)
+    session = PdfSession(BytesIO(report_pdf_bytes), layout_cache=LayoutCache(), layout_store=store)
+    expected = te.find_pages_with_keyword("page 3 about", session)
+    assert te.find_pages_with_terms(["quarterly report", "section 2"], session) == [2]
+    assert te.find_pages_with_keyword("page 3 about", session) == expected == [3]
+
+    monkeypatch.setattr(PdfSession, "get_layout", lambda *args: pytest.fail("index should answer"))
+    fresh = PdfSession(BytesIO(report_pdf_bytes), layout_cache=LayoutCache(), layout_store=store)
+    assert get_keyword_index(fresh) is not None
+    assert te.find_pages_with_keyword("PAGE 3 ABOUT", fresh) == [3]
+    assert te.find_pages_with_keyword("PAGE 3 ABOUT", fresh, case_sensitive=True) == []
+
+
+def test_build_keyword_index_attaches_and_saves_the_index(report_pdf_bytes, tmp_path):
+    store = LayoutStore(tmp_path)
+    session = PdfSession(BytesIO(report_pdf_bytes), layout_cache=LayoutCache(), layout_store=store)
+    index = build_keyword_index(session)
+    assert session.keyword_index is index
+    assert index.pages == [1, 2, 3, 4, 5]
+    assert index.find_phrase("body text for page 4") == [4]
+
+    fresh = PdfSession(BytesIO(report_pdf_bytes), layout_cache=LayoutCache(), layout_store=store)
+    assert get_keyword_index(fresh).to_dict() == index.to_dict()
@@ -0,0 +1,41 @@
+from io import BytesIO
+
+import text_extraction as te
+from pdf_session import PdfSession
+from utils.layout_cache import LayoutCache
+
+
+def test_lru_eviction_respects_page_budget():
+    cache = LayoutCache(max_pages=2, max_bytes=1000)
+    cache.put("a", "A", 10)
+    cache.put("b", "B", 10)
+    assert cache.get("a") == "A"  # "b" is now least recently used
+    cache.put("c", "C", 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.evictions == 1
+
+
+def test_lru_eviction_respects_byte_budget():
+    cache = LayoutCache(max_pages=10, max_bytes=100)
+    cache.put("a", "A", 60)
+    cache.put("b", "B", 60)
+    assert cache.get("a") is None
+    assert cache.total_bytes == 60
+    cache.put("huge", "H", 101)
+    assert cache.get("huge") is None
+
+
+def test_session_reuses_cached_layouts(report_pdf_bytes):
+    cache = LayoutCache()
+    session = PdfSession(BytesIO(report_pdf_bytes), layout_cache=cache)
+    blocks = te.extract_text_blocks_with_metadata(session, 2)
+    header = next(b for b in blocks if b["text"] == "Section 2")
+    section = te.get_text_following_header(session, 2, header["bbox"])
+    assert section.startswith("Body text for page 2")
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
+
+    # A second session over the same bytes shares the entries
+    other = PdfSession(BytesIO(report_pdf_bytes), layout_cache=cache)
+    assert te.get_text_from_page(other, 2) == te.get_text_from_page(session, 2)
+    assert cache.stats()["misses"] == 1
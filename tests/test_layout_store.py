@@ -0,0 +1,37 @@
+from io import BytesIO
+
+import pytest
+
+import text_extraction as te
+from page_layout import PageLayout
+from pdf_session import PdfSession
+from utils.layout_cache import LayoutCache
+from utils.layout_store import LayoutStore
+
+
+def test_page_layout_round_trips_through_dict(report_pdf):
+    layout = PdfSession(report_pdf, layout_cache=None).get_layout(1, te.LAParams())
+    assert PageLayout.from_dict(layout.to_dict()) == layout
+
+
+def test_warm_start_skips_interpreter(report_pdf_bytes, tmp_path, monkeypatch):
+    store = LayoutStore(tmp_path / "layouts")
+    cold = PdfSession(BytesIO(report_pdf_bytes), layout_cache=LayoutCache(), layout_store=store)
+    expected_text = te.get_text_from_page(cold, 3)
+    expected_tables = te.detect_tables_on_page(cold, 3, min_table_area=100, confidence_threshold=0.0)
+
+    def fail(*args, **kwargs):
+        pytest.fail("pdfminer interpreter should not run on a warm start")
+
+    monkeypatch.setattr(PdfSession, "analyze_page", fail)
+    warm = PdfSession(BytesIO(report_pdf_bytes), layout_cache=LayoutCache(), layout_store=store)
+    assert te.get_text_from_page(warm, 3) == expected_text
+    assert te.detect_tables_on_page(warm, 3, min_table_area=100, confidence_threshold=0.0) == expected_tables
+
+
+def test_corrupt_entries_are_ignored(report_pdf_bytes, tmp_path):
+    store = LayoutStore(tmp_path)
+    store.put("doc", None, 1, {"v": 1})
+    entry = next(tmp_path.rglob("1.json.z"))
+    entry.write_bytes(b"not zlib")
+    assert store.get("doc", None, 1) is None
@@ -0,0 +1,59 @@
+import io
+
+import text_extraction as te
+from page_map import document_source
+from pdf_session import PdfSession
+from utils import file_loader
+from utils.file_cache import FileCache
+from utils.mapped_file import MappedFile, open_mapped
+
+
+def test_mapped_file_reads_seeks_and_exposes_buffer(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"0123456789")
+    with open_mapped(path) as f:
+        assert isinstance(f, MappedFile) and f.name == str(path)
+        assert f.read(3) == b"012"
+        assert f.seek(-2, io.SEEK_END) == 8
+        buffer = bytearray(5)
+        assert f.readinto(buffer) == 2 and buffer[:2] == b"89"
+        assert f.read() == b""
+        view = f.getbuffer()
+        assert view[4:6] == b"45"
+        view.release()
+
+    empty = tmp_path / "empty.bin"
+    empty.write_bytes(b"")
+    with open_mapped(empty) as f:
+        assert f.read() == b""
+
+
+def test_mapped_local_file_gives_same_results(report_pdf_bytes, tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(report_pdf_bytes)
+    with file_loader.open_file_from_path_or_s3(str(path), use_mmap=True) as f:
+        assert isinstance(f, MappedFile)
+        assert te.find_pages_with_keyword("page 4", f) == [4]
+        with PdfSession(f) as session:
+            # Workers reopen (and map) the file by path instead of receiving bytes
+            assert document_source(session) == str(path)
+
+
+def test_fresh_download_is_streamed_into_cache_and_mapped(tmp_path, monkeypatch, stub_s3_client):
+    client = stub_s3_client({("bucket", "doc.pdf"): b"%PDF body"})
+    monkeypatch.setattr(file_loader, "get_s3_client", lambda: client)
+    cache = FileCache(tmp_path)
+
+    with file_loader.open_file_from_path_or_s3("s3://bucket/doc.pdf", cache=cache, use_mmap=True) as f:
+        assert isinstance(f, MappedFile)
+        assert f.name == str(cache.path_for(file_loader.hash_uri("s3://bucket/doc.pdf")))
+        assert f.read() == b"%PDF body"
+    with file_loader.open_file_from_path_or_s3("s3://bucket/doc.pdf", cache=cache, use_mmap=True) as f:
+        assert isinstance(f, MappedFile) and f.read() == b"%PDF body"
+    assert cache.hits == 1
+
+    # Objects larger than the whole cache are spooled to an unnamed file
+    small = FileCache(tmp_path / "small", max_bytes=4)
+    with file_loader.open_file_from_path_or_s3("s3://bucket/doc.pdf", cache=small, use_mmap=True) as f:
+        assert isinstance(f, MappedFile) and f.read() == b"%PDF body"
+    assert small.total_bytes() == 0
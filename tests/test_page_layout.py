@@ -0,0 +1,26 @@
+from page_layout import FontTable, PageLayout
+from pdf_session import PdfSession
+from pdfminer.layout import LAParams
+
+
+def _font_names(layout):
+    return [[layout.fonts[i] for i in line.font_ids] for box in layout.text_boxes for line in box.lines]
+
+
+def test_pages_share_the_session_font_table(report_pdf):
+    session = PdfSession(report_pdf, layout_cache=None)
+    first = session.get_layout(1, LAParams())
+    second = session.get_layout(2, LAParams())
+    assert first.fonts is second.fonts is session.font_table
+    assert len(session.font_table) == 2
+
+
+def test_from_dict_interns_into_existing_table(report_pdf):
+    layout = PdfSession(report_pdf, layout_cache=None).get_layout(1, LAParams())
+    fonts = FontTable(["Unrelated", "Other"])
+    restored = PageLayout.from_dict(layout.to_dict(), fonts)
+    assert restored.fonts is fonts
+    assert _font_names(restored) == _font_names(layout)
+    for box, restored_box in zip(layout.text_boxes, restored.text_boxes):
+        assert restored.font_name(restored_box.font_stats().font_id) == layout.font_name(box.font_stats().font_id)
+        assert restored_box.font_stats().avg_size == box.font_stats().avg_size
@@ -0,0 +1,45 @@
+from io import BytesIO
+
+import text_extraction as te
+from page_map import map_pages, split_page_range
+
+
+def _page_height(session, page_number):
+    return session.get_layout(page_number, None).mediabox[3]
+
+
+def test_split_page_range_covers_range_in_order():
+    assert split_page_range(3, 10, 3) == [(3, 5), (6, 8), (9, 10)]
+
+
+def test_map_pages_merges_in_page_order(report_pdf_bytes, tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(report_pdf_bytes)
+    expected = [(n, 792) for n in range(2, 6)]
+    assert map_pages(_page_height, str(path), start_page=2) == expected
+    assert map_pages(_page_height, report_pdf_bytes, start_page=2, workers=2, chunk_size=1) == expected
+
+
+def test_tools_give_same_results_with_workers(report_pdf_bytes):
+    sequential = te.find_pages_with_keyword("page 4", BytesIO(report_pdf_bytes))
+    parallel = te.find_pages_with_keyword("page 4", BytesIO(report_pdf_bytes), workers=2)
+    assert sequential == parallel == [4]
+    assert te.find_headers_and_footers(BytesIO(report_pdf_bytes), workers=2) == \
+        te.find_headers_and_footers(BytesIO(report_pdf_bytes))
+
+
+def test_sampled_scan_starts_one_pool_for_all_batches(monkeypatch, build_pdf):
+    import page_map
+
+    pools = []
+    real_pool = page_map._worker_pool
+
+    def counting_pool(workers, initargs):
+        pools.append(workers)
+        return real_pool(workers, initargs)
+
+    monkeypatch.setattr(page_map, "_worker_pool", counting_pool)
+    data = build_pdf([{"texts": [(72, 750, 9, "Running head"), (72, 700, 11, f"Body {n}.")]} for n in range(48)])
+    parallel = te.find_headers_and_footers(BytesIO(data), scan_pages=48, workers=2, sample=True)
+    assert pools == [2]
+    assert parallel == te.find_headers_and_footers(BytesIO(data), scan_pages=48, sample=True)
@@ -0,0 +1,118 @@
+from io import BytesIO, FileIO
+
+import pytest
+
+import text_extraction as te
+from pdf_session import PdfSession
+from utils.layout_cache import LayoutCache
+
+
+def test_session_matches_stream_results(report_pdf_bytes):
+    session = PdfSession(BytesIO(report_pdf_bytes))
+    for page_number in (1, 3, 5):
+        expected = te.extract_text_blocks_with_metadata(BytesIO(report_pdf_bytes), page_number)
+        assert te.extract_text_blocks_with_metadata(session, page_number) == expected
+    assert te.get_text_from_page(session, 2) == te.get_text_from_page(BytesIO(report_pdf_bytes), 2)
+
+
+def test_session_walks_page_tree_lazily(report_pdf):
+    session = PdfSession(report_pdf)
+    assert session.get_page(2) is not None
+    assert len(session._pages) == 2
+    assert session.get_page(99) is None
+    assert session.page_count == 5
+    assert sorted(session.page_map) == [1, 2, 3, 4, 5]
+
+
+def test_tools_share_session_without_seeking(report_pdf):
+    session = PdfSession(report_pdf)
+    assert te.get_total_page_count(session) == 5
+    assert te.find_pages_with_keyword("transparency", session, start_page=2, end_page=3) == [2, 3]
+    result = te.find_headers_and_footers(session)
+    assert "Quarterly Report" in result["headers"]
+    assert "Confidential" in result["footers"]
+    assert te.get_text_from_page(session, 99) == ""
+
+
+def test_page_count_reads_count_without_creating_pages(report_pdf):
+    session = PdfSession(report_pdf)
+    assert session.page_count == 5
+    assert session._pages == []
+
+
+def test_page_count_walks_tree_when_count_is_missing(report_pdf_bytes):
+    broken = report_pdf_bytes.replace(b"/Count 5", b"/Xount 5")
+    session = PdfSession(BytesIO(broken))
+    assert te.get_total_page_count(session) == 5
+    assert session._pages == []
+
+    too_small = report_pdf_bytes.replace(b"/Count 5", b"/Count 1")
+    assert PdfSession(BytesIO(too_small)).page_count == 5
+
+    inflated = PdfSession(BytesIO(report_pdf_bytes.replace(b"/Count 5", b"/Count 9")))
+    assert inflated.page_count == 5
+    assert te.get_text_from_page(inflated, 9) == ""
+
+
+def test_iter_text_blocks_streams_without_caching(report_pdf_bytes):
+    session = PdfSession(BytesIO(report_pdf_bytes), layout_cache=LayoutCache())
+    blocks = te.iter_text_blocks(session, start_page=2, end_page=4)
+    first = next(blocks)
+    assert first["page_number"] == 2
+    assert len(session._pages) == 2
+
+    expected = [
+        block for page_number in (2, 3, 4)
+        for block in te.extract_text_blocks_with_metadata(BytesIO(report_pdf_bytes), page_number)
+    ]
+    assert [first] + list(blocks) == expected
+    assert session.layout_cache.stats()["pages"] == 0
+
+
+class _CountingFile(FileIO):
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+@pytest.fixture
+def long_pdf(build_pdf):
+    """Builds a 300-page document with `marker` on page 151."""
+    def build(marker: str) -> bytes:
+        pages = [{"texts": [(72, 700 - i * 12, 10, f"Line {i} of page {n}") for i in range(40)]} for n in range(300)]
+        pages[150]["texts"].append((72, 100, 10, marker))
+        return build_pdf(pages)
+    return build
+
+
+def test_doc_id_does_not_read_the_whole_file(report_pdf_bytes, tmp_path, long_pdf):
+    data = long_pdf("ALFA")
+    long_path = tmp_path / "long.pdf"
+    long_path.write_bytes(data)
+    with _CountingFile(long_path, "rb") as stream:
+        session = PdfSession(stream, layout_cache=LayoutCache())
+        stream.bytes_read = 0
+        assert "Line 3 of page 1" in te.get_text_from_page(session, 2)
+        assert stream.bytes_read < len(data) / 3
+
+    # Files are identified by path, size and modification time
+    path = tmp_path / "report.pdf"
+    path.write_bytes(report_pdf_bytes)
+    with open(path, "rb") as a, open(path, "rb") as b:
+        assert PdfSession(a).doc_id == PdfSession(b).doc_id
+        first = PdfSession(a).doc_id
+    path.write_bytes(report_pdf_bytes + b"\n")
+    with open(path, "rb") as f:
+        assert PdfSession(f).doc_id != first
+        # The persistent store key is the content hash, wherever the file is
+        assert PdfSession(f).content_id == PdfSession(BytesIO(report_pdf_bytes + b"\n")).content_id
+
+
+def test_streams_differing_mid_file_do_not_share_cached_layouts(long_pdf):
+    alfa, beta = long_pdf("ALFA"), long_pdf("BETA")
+    assert len(alfa) == len(beta) and alfa[:200000] == beta[:200000] and alfa[-200000:] == beta[-200000:]
+    assert "ALFA" in te.get_text_from_page(BytesIO(alfa), 151)
+    assert "BETA" in te.get_text_from_page(BytesIO(beta), 151)
@@ -0,0 +1,55 @@
+import pytest
+
+from utils import file_loader
+from utils.file_cache import FileCache
+from utils.prefetch import prefetch
+
+
+@pytest.fixture
+def stub_s3(monkeypatch, stub_s3_client):
+    """Serves {key: bytes} from "bucket" through file_loader's S3 client."""
+    def stub(objects):
+        client = stub_s3_client({("bucket", key): data for key, data in objects.items()})
+        monkeypatch.setattr(file_loader, "get_s3_client", lambda: client)
+        return client
+    return stub
+
+
+def test_prefetch_downloads_in_parts_and_reports_status(tmp_path, stub_s3):
+    big = bytes(range(256)) * 40
+    client = stub_s3({"big.pdf": big, "small.pdf": b"small"})
+    cache = FileCache(tmp_path)
+    seen = []
+
+    uris = ["s3://bucket/big.pdf", "s3://bucket/small.pdf", "s3://bucket/missing.pdf", "local.pdf", "s3://bucket/small.pdf"]
+    results = prefetch(uris, max_concurrency=3, cache=cache, part_size=1000, on_result=seen.append)
+
+    assert [r.uri for r in results] == uris
+    assert [r.status for r in results] == ["downloaded", "downloaded", "failed", "skipped", "downloaded"]
+    assert results[2].error.startswith("KeyError") and not results[2].ok
+    assert sorted(r.uri for r in seen) == sorted(set(uris))
+    assert results[0].size == len(big) and results[0].path.read_bytes() == big
+    # One request for the first part reveals the size; the other 10 parts follow
+    assert sorted(client.ranges).count("bytes=0-999") == 2
+    assert len([r for r in client.ranges if not r.startswith("bytes=0-")]) == 10
+
+    # Already current copies are not downloaded again
+    again = prefetch(uris[:2], cache=cache, part_size=1000)
+    assert [r.status for r in again] == ["cached", "cached"]
+    with file_loader.open_file_from_path_or_s3("s3://bucket/big.pdf", cache=cache) as f:
+        assert f.read() == big
+
+
+def test_prefetch_skips_objects_larger_than_cache(tmp_path, stub_s3):
+    stub_s3({"doc.pdf": b"x" * 100})
+    cache = FileCache(tmp_path, max_bytes=10)
+    [result] = prefetch(["s3://bucket/doc.pdf"], cache=cache, part_size=16)
+    assert (result.status, result.size) == ("skipped", 100)
+    assert cache.total_bytes() == 0 and list(tmp_path.glob("*.tmp")) == []
+
+
+def test_prefetch_downloads_empty_objects(tmp_path, stub_s3):
+    stub_s3({"empty.pdf": b""})
+    [result] = prefetch(["s3://bucket/empty.pdf"], cache=FileCache(tmp_path))
+    assert (result.status, result.size) == ("downloaded", 0)
+    assert result.path.read_bytes() == b""
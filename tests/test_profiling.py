@@ -0,0 +1,56 @@
+import json
+import os
+import pstats
+
+import profiling
+from batch_extract import main
+from pdf_session import PdfSession
+from profiling import ProfileSettings, profile_calls
+from text_extraction import detect_tables_on_page, get_total_page_count
+
+
+def test_slow_calls_are_profiled_and_tagged(tmp_path, report_pdf):
+    with PdfSession(report_pdf, layout_cache=None) as session, profile_calls(str(tmp_path), threshold=0):
+        detect_tables_on_page(session, 3)
+        doc_id = session.doc_id
+
+    [profile] = list(tmp_path.glob("*.pstats"))
+    assert profile.name.startswith(f"detect_tables_on_page-{doc_id[:12]}-p3-")
+    stats = pstats.Stats(str(profile))
+    # Nested tool calls and layout analysis are part of the one profile
+    assert any(function == "process_page" for _, _, function in stats.stats)
+    tags = json.loads(profile.with_suffix(".json").read_text())
+    assert (tags["tool"], tags["document"], tags["page"]) == ("detect_tables_on_page", doc_id, 3)
+    assert tags["seconds"] > 0
+
+
+def test_fast_calls_are_not_written(tmp_path, report_pdf):
+    with profile_calls(str(tmp_path / "profiles"), threshold=60):
+        assert get_total_page_count(report_pdf) == 5
+    assert not (tmp_path / "profiles").exists()
+    assert profiling.get_profile_settings() is None
+
+
+def test_settings_from_environment(monkeypatch, capsys):
+    monkeypatch.setenv(profiling.PROFILE_DIR_ENV, "profiles")
+    monkeypatch.setenv(profiling.PROFILE_THRESHOLD_ENV, "2.5")
+    assert profiling._settings_from_env() == ProfileSettings("profiles", 2.5)
+    monkeypatch.setenv(profiling.PROFILE_THRESHOLD_ENV, "slow")
+    assert profiling._settings_from_env() == ProfileSettings("profiles", profiling.DEFAULT_THRESHOLD)
+    assert "Warning" in capsys.readouterr().out
+    monkeypatch.delenv(profiling.PROFILE_DIR_ENV)
+    assert profiling._settings_from_env() is None
+
+
+def test_batch_cli_profiles_worker_calls(tmp_path, report_pdf_bytes, monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_DIR_ENV, raising=False)
+    monkeypatch.delenv(profiling.PROFILE_THRESHOLD_ENV, raising=False)
+    monkeypatch.setattr(profiling, "_default_settings", None)
+    (tmp_path / "a.pdf").write_bytes(report_pdf_bytes)
+    profiles = tmp_path / "profiles"
+
+    code = main([str(tmp_path / "a.pdf"), "--tools", "page_count", "-o", str(tmp_path / "out.jsonl"),
+                 "--workers", "1", "--profile-dir", str(profiles), "--profile-threshold", "0"])
+    assert code == 0
+    assert os.environ[profiling.PROFILE_DIR_ENV] == str(profiles)
+    assert sorted(p.name.split("-")[0] for p in profiles.glob("*.pstats")) == ["get_total_page_count", "open_file_from_path_or_s3"]
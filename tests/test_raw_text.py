@@ -0,0 +1,28 @@
+from io import BytesIO
+
+import pytest
+
+import text_extraction as te
+from pdf_session import RAW_TEXT, PdfSession
+
+
+def test_raw_layout_joins_runs_into_lines(build_pdf):
+    data = build_pdf([{"texts": [(72, 700, 12, "Hello"), (110, 700, 12, "world"), (72, 650, 12, "Next line")]}])
+    layout = PdfSession(BytesIO(data), layout_cache=None).get_layout(1, RAW_TEXT)
+    assert [box.get_text() for box in layout.text_boxes] == ["Hello world\n", "Next line\n"]
+    assert layout.text_boxes[0].y1 == pytest.approx(700 + 12 * 0.75, abs=3)
+
+
+def test_raw_mode_scans_match_layout_mode(report_pdf_bytes):
+    layout_session = PdfSession(BytesIO(report_pdf_bytes))
+    raw_session = PdfSession(BytesIO(report_pdf_bytes), text_mode="raw")
+    for keyword in ("transparency", "Section 4", "more details"):
+        assert te.find_pages_with_keyword(keyword, raw_session) == \
+            te.find_pages_with_keyword(keyword, layout_session)
+    assert te.find_headers_and_footers(layout_session, text_mode="raw") == \
+        te.find_headers_and_footers(layout_session)
+
+
+def test_unknown_text_mode_is_rejected(report_pdf):
+    with pytest.raises(ValueError):
+        te.find_pages_with_keyword("x", report_pdf, text_mode="fast")
@@ -0,0 +1,87 @@
+import io
+
+import pytest
+
+import text_extraction as te
+from pdf_session import PdfSession
+from utils.s3_range_file import S3RangeFile
+
+
+@pytest.fixture
+def client_for(stub_s3_client):
+    """Returns a stub client serving `data` as s3://bucket/<key>."""
+    return lambda data, key="key": stub_s3_client({("bucket", key): data})
+
+
+def test_reads_match_the_object(client_for):
+    data = bytes(range(256)) * 40
+    client = client_for(data)
+    f = S3RangeFile(client, "bucket", "key", block_size=1000, max_blocks=4, tail_size=500)
+    assert f.size == len(data)
+    assert client.ranges == ["bytes=-500"]
+
+    f.seek(2500)
+    assert f.read(3000) == data[2500:5500]
+    # Blocks 2-5 were missing and adjacent, so they came in one request
+    assert client.ranges[-1] == "bytes=2000-5999"
+    assert f.cached_blocks() == 4
+
+    f.seek(-10, io.SEEK_END)
+    assert f.read() == data[-10:]
+    assert f.read(5) == b""
+    f.seek(0)
+    assert f.read() == data
+
+
+def test_tools_read_pdf_lazily(report_pdf_bytes, client_for):
+    client = client_for(report_pdf_bytes, "report.pdf")
+    f = S3RangeFile(client, "bucket", "report.pdf", block_size=512)
+    session = PdfSession(f, layout_cache=None)
+    assert te.get_total_page_count(session) == 5
+    assert "Section 3" in te.get_text_from_page(session, 3)
+    # The whole (small) document fits in the tail request
+    assert client.ranges == ["bytes=-262144"]
+
+
+def test_changed_object_is_detected(client_for):
+    client = client_for(b"x" * 5000)
+    f = S3RangeFile(client, "bucket", "key", block_size=1000, tail_size=100)
+    client.put("bucket", "key", b"y" * 5000)
+    with pytest.raises(RuntimeError):
+        f.read(10)
+
+
+def test_only_needed_ranges_are_fetched(build_pdf, client_for):
+    pages = [{"texts": [(72, 700 - i * 12, 10, f"Line {i} of page {n}") for i in range(40)]} for n in range(60)]
+    data = build_pdf(pages)
+    f = S3RangeFile(client_for(data, "big.pdf"), "bucket", "big.pdf", block_size=4096, tail_size=8192)
+    session = PdfSession(f, layout_cache=None)
+    assert "Line 3 of page 4" in te.get_text_from_page(session, 5)
+    assert f.bytes_fetched < len(data) / 4
+
+
+def test_default_layout_cache_keeps_reads_lazy(monkeypatch, build_pdf, client_for):
+    from utils import file_loader
+
+    pages = [{"texts": [(72, 700 - i * 12, 10, f"Line {i} of page {n}") for i in range(40)]} for n in range(60)]
+    data = build_pdf(pages)
+    client = client_for(data, "big.pdf")
+    f = S3RangeFile(client, "bucket", "big.pdf", block_size=4096, tail_size=8192)
+    # A raw stream gets a fresh session with the default layout cache
+    assert "Line 3 of page 4" in te.get_text_from_page(f, 5)
+    assert f.bytes_fetched < len(data) / 4
+
+    monkeypatch.setattr(file_loader, "get_s3_client", lambda: client)
+    session = PdfSession.from_path_or_s3("s3://bucket/big.pdf", use_cache=False, lazy=True)
+    assert session.doc_id == session.content_id == f.doc_id
+    fetched = session.file_stream.bytes_fetched
+    assert te.get_text_from_page(session, 5) == te.get_text_from_page(f, 5)
+    assert session.file_stream.bytes_fetched - fetched < len(data) / 4
+
+
+def test_empty_object_is_read_without_a_range(client_for):
+    client = client_for(b"")
+    f = S3RangeFile(client, "bucket", "key")
+    assert f.size == 0
+    assert f.read() == b"" and f.read(10) == b""
+    assert client.ranges == ["bytes=-262144"]
@@ -0,0 +1,68 @@
+from io import BytesIO
+
+import pytest
+
+import text_extraction as te
+from instrumentation import PrometheusSink, use_metrics_sink
+from pdf_session import PdfSession
+
+
+@pytest.fixture
+def section_pdf(build_pdf) -> bytes:
+    def page(number, texts):
+        return {"texts": [(72, 750, 9, "Annual Review")] + texts + [(72, 30, 9, "Internal use only")]}
+
+    pages = [
+        page(1, [(72, 700, 18, "Scope", "bold"), (72, 660, 11, "Scope starts here.")]),
+        page(2, [(72, 700, 11, "Scope continues on page two.")]),
+        page(3, [(72, 700, 11, "Scope ends on page three."), (72, 500, 18, "Methods", "bold"),
+                 (72, 460, 11, "Methods body.")]),
+    ]
+    # Enough pages for the running header and footer to be detected
+    pages += [page(n, [(72, 700, 11, f"Filler {n}.")]) for n in range(4, 7)]
+    return build_pdf(pages)
+
+
+def _header_bbox(session, page_number, text):
+    blocks = te.extract_text_blocks_with_metadata(session, page_number)
+    return next(block["bbox"] for block in blocks if block["text"] == text)
+
+
+def test_section_continues_across_pages(section_pdf):
+    session = PdfSession(BytesIO(section_pdf))
+    header_bbox = _header_bbox(session, 1, "Scope")
+    assert te.extract_section_text(session, 1, header_bbox) == (
+        "Scope starts here.\n\nScope continues on page two.\n\nScope ends on page three."
+    )
+    # The single-page tool still stops at the end of the page
+    assert te.get_text_following_header(session, 1, header_bbox) == "Scope starts here.\n\nInternal use only"
+
+
+def test_section_caps_pages_and_length(section_pdf):
+    session = PdfSession(BytesIO(section_pdf))
+    header_bbox = _header_bbox(session, 1, "Scope")
+    assert te.extract_section_text(session, 1, header_bbox, max_pages=2) == (
+        "Scope starts here.\n\nScope continues on page two."
+    )
+    assert te.extract_section_text(session, 1, header_bbox, max_chars=25) == "Scope starts here.\n\nScope"
+    assert te.extract_section_text(session, 1, (0, 0, 1, 1)) == ""
+
+
+def test_running_text_is_found_near_the_section(build_pdf):
+    def page(texts):
+        return {"texts": [(72, 750, 9, "Annual Review")] + texts + [(72, 30, 9, "Internal use only")]}
+
+    pages = [page([(72, 700, 11, f"Filler {n}.")]) for n in range(1, 40)]
+    pages[29] = page([(72, 700, 18, "Late", "bold"), (72, 660, 11, "Late body.")])
+    pages[30] = page([(72, 700, 18, "Next", "bold")])
+    session = PdfSession(BytesIO(build_pdf(pages)))
+    header_bbox = _header_bbox(session, 30, "Late")
+
+    sink = PrometheusSink()
+    with use_metrics_sink(sink):
+        assert te.extract_section_text(session, 30, header_bbox) == "Late body."
+    laid_out = sum(value for (name, _), value in sink.snapshot()["counters"].items() if name == "pages_laid_out")
+    # The pages around the section, not the first ten
+    assert laid_out == te.SECTION_RUNNING_TEXT_PAGES - 1
+
+    assert te.extract_section_text(session, 30, header_bbox, scan_document_start=True) == "Late body."
@@ -0,0 +1,110 @@
+import random
+
+from spatial_index import BBoxIndex, merge_overlapping
+import text_extraction as te
+from text_extraction import _check_bbox_overlap, _is_inside, _merge_overlapping_bboxes
+
+
+def _random_bboxes(rng, count):
+    bboxes = []
+    for _ in range(count):
+        x0, y0 = rng.uniform(0, 600), rng.uniform(0, 800)
+        bboxes.append((x0, y0, x0 + rng.uniform(0, 80), y0 + rng.uniform(0, 40)))
+    # A few degenerate and inverted boxes
+    bboxes += [(10, 10, 10, 10), (50, 300, 60, 290), (0, 0, 612, 792)]
+    return bboxes
+
+
+def test_containment_matches_brute_force():
+    rng = random.Random(7)
+    bboxes = _random_bboxes(rng, 500)
+    index = BBoxIndex(bboxes)
+    assert len(index) == len(bboxes)
+    for outer in _random_bboxes(rng, 60):
+        expected = [i for i, b in enumerate(bboxes) if _is_inside(b, outer)]
+        assert index.inside(outer) == expected
+        assert index.count_inside(outer) == len(expected)
+
+
+def test_region_queries_match_brute_force():
+    rng = random.Random(11)
+    bboxes = _random_bboxes(rng, 500)
+    index = BBoxIndex(bboxes)
+    for query in _random_bboxes(rng, 60):
+        assert index.overlapping(query) == [i for i, b in enumerate(bboxes) if _check_bbox_overlap(b, query)]
+        lower, upper = sorted(query[1::2])
+        assert index.in_y_band(lower, upper) == [
+            i for i, b in enumerate(bboxes) if not (b[1] > upper or b[3] < lower)
+        ]
+
+
+def test_boxes_touching_the_query_from_below_are_found():
+    # 34.9 - (34.9 - 6.3) rounds to just above 6.3
+    index = BBoxIndex([(16.054739, 6.3, 28.154739, 34.9)])
+    assert index.in_y_band(34.9, 40) == [0]
+    assert index.overlapping((0, 34.9, 50, 40)) == [0]
+
+    rng = random.Random(13)
+    bboxes = _random_bboxes(rng, 300)
+    index = BBoxIndex(bboxes)
+    for x0, _, x1, top in bboxes:
+        query = (x0, top, x1, top + 5)
+        assert index.overlapping(query) == [i for i, b in enumerate(bboxes) if _check_bbox_overlap(b, query)]
+        assert index.in_y_band(top, top + 5) == [i for i, b in enumerate(bboxes) if not (b[1] > top + 5 or b[3] < top)]
+
+
+def test_batch_region_extraction(report_pdf):
+    regions = [(0, 700, 612, 792), (0, 0, 612, 60), (0, 0, 1, 1)]
+    texts = te.extract_text_in_bboxes(report_pdf, 1, regions)
+    assert texts == [te.extract_text_in_bbox(report_pdf, 1, bbox) for bbox in regions]
+    assert "Quarterly Report" in texts[0] and "Confidential" in texts[1] and texts[2] == ""
+    assert te.extract_text_in_bboxes(report_pdf, 99, regions) == []
+
+
+def test_empty_index():
+    index = BBoxIndex([])
+    assert index.inside((0, 0, 100, 100)) == []
+    assert index.count_inside((0, 0, 100, 100)) == 0
+
+
+def _reference_merge(bboxes):
+    """The original pop(0) implementation of _merge_overlapping_bboxes."""
+    bboxes.sort(key=lambda b: -b['confidence'])
+    merged = []
+    while bboxes:
+        base = bboxes.pop(0)
+        to_merge = []
+        for i, other in enumerate(bboxes):
+            ix0 = max(base['bbox'][0], other['bbox'][0])
+            iy0 = max(base['bbox'][1], other['bbox'][1])
+            ix1 = min(base['bbox'][2], other['bbox'][2])
+            iy1 = min(base['bbox'][3], other['bbox'][3])
+            if ix1 > ix0 and iy1 > iy0:
+                other_area = (other['bbox'][2] - other['bbox'][0]) * (other['bbox'][3] - other['bbox'][1])
+                if (ix1 - ix0) * (iy1 - iy0) / other_area > 0.5:
+                    to_merge.append(i)
+        for i in sorted(to_merge, reverse=True):
+            other = bboxes.pop(i)
+            base['bbox'] = [
+                min(base['bbox'][0], other['bbox'][0]), min(base['bbox'][1], other['bbox'][1]),
+                max(base['bbox'][2], other['bbox'][2]), max(base['bbox'][3], other['bbox'][3]),
+            ]
+        merged.append(base)
+    return merged
+
+
+def test_merge_matches_original_semantics():
+    rng = random.Random(3)
+    for _ in range(20):
+        detections = [
+            {"bbox": list(b), "confidence": round(rng.uniform(0.7, 1.0), 2)}
+            for b in _random_bboxes(rng, 80)
+        ]
+        expected = _reference_merge([dict(d) for d in detections])
+        assert _merge_overlapping_bboxes([dict(d) for d in detections]) == expected
+
+
+def test_transitive_merge_follows_chains():
+    chain = [(0, 0, 10, 10), (4, 0, 14, 10), (8, 0, 18, 10)]
+    assert [members for _, _, members in merge_overlapping(chain)] == [[0, 1], [2]]
+    assert merge_overlapping(chain, transitive=True) == [(0, (0, 0, 18, 10), [0, 1, 2])]
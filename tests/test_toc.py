@@ -0,0 +1,46 @@
+from io import BytesIO
+from types import GeneratorType
+
+import text_extraction as te
+from pdf_session import PdfSession
+
+
+EXPECTED_TOC = [
+    {"level": 1, "title": "Section 1", "page": 1},
+    {"level": 1, "title": "Section 3", "page": 3},
+]
+
+
+def test_toc_resolves_pages_without_creating_pages(report_pdf):
+    session = PdfSession(report_pdf)
+    assert te.extract_toc(session) == EXPECTED_TOC
+    assert session._pages == []
+
+
+def test_toc_lazy_returns_generator(report_pdf):
+    toc = te.extract_toc(report_pdf, lazy=True)
+    assert isinstance(toc, GeneratorType)
+    assert next(toc) == EXPECTED_TOC[0]
+    assert list(toc) == EXPECTED_TOC[1:]
+
+
+def test_page_index_matches_page_tree(report_pdf):
+    session = PdfSession(report_pdf)
+    index = session.page_numbers_by_objid
+    assert index == {page.pageid: number for number, page in session.page_map.items()}
+    assert session.page_number_of(-1) is None
+
+
+def test_nested_outline_levels(build_pdf):
+    data = build_pdf(
+        [{"texts": [(72, 700, 11, f"Page {n}")]} for n in range(1, 4)],
+        outline=[
+            {"title": "Part 1", "page": 1, "children": [
+                {"title": "Chapter 1.1", "page": 2, "children": [{"title": "Section 1.1.1", "page": 3}]},
+            ]},
+            {"title": "Part 2", "page": 3},
+        ],
+    )
+    assert [(e["level"], e["title"], e["page"]) for e in te.extract_toc(BytesIO(data))] == [
+        (1, "Part 1", 1), (2, "Chapter 1.1", 2), (3, "Section 1.1.1", 3), (1, "Part 2", 3),
+    ]
@@ -1,33 +1,71 @@
 #from image import Image
-from typing import List, Dict, BinaryIO, Iterator, Set, Tuple
+from typing import List, Dict, BinaryIO, Iterator, Optional, Set, Tuple, Union
 from collections import Counter
+from contextlib import nullcontext
+from functools import partial
 import math
-from pdfminer.pdfparser import PDFParser
-from pdfminer.pdfdocument import PDFDocument
-from pdfminer.pdfpage import PDFPage
-from pdfminer.pdftypes import PDFException
-from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
-from pdfminer.pdfdocument import PDFDocument
-from pdfminer.pdfpage import PDFPage
-from pdfminer.layout import LAParams
-from pdfminer.converter import PDFPageAggregator
-from pdfminer.layout import LTTextContainer, LTPage, LTTextLine, LTTextBoxHorizontal, LTChar, LTRect, LTLine
+from pdf_session import PdfSession, LayoutSettings, RAW_TEXT, as_session, default_laparams
+from page_layout import PageLayout, TextBox
+from spatial_index import merge_overlapping
+from page_map import document_pool, map_pages, map_page_numbers, sample_page_numbers
+from keyword_index import build_keyword_index, get_keyword_index
+from instrumentation import instrumented
+
+# Every tool accepts either a raw PDF file stream or an already-parsed
+# PdfSession. Passing a session avoids re-parsing the document per call.
+PdfSource = Union[BinaryIO, PdfSession]
+
+# pdfminer names this module used to import at the top, now imported on demand
+_PDFMINER_EXPORTS = {
+    "PDFParser": "pdfminer.pdfparser",
+    "PDFDocument": "pdfminer.pdfdocument",
+    "PDFPage": "pdfminer.pdfpage",
+    "PDFException": "pdfminer.pdftypes",
+    "PDFResourceManager": "pdfminer.pdfinterp",
+    "PDFPageInterpreter": "pdfminer.pdfinterp",
+    "PDFPageAggregator": "pdfminer.converter",
+    "LAParams": "pdfminer.layout",
+    "LTTextContainer": "pdfminer.layout",
+    "LTPage": "pdfminer.layout",
+    "LTTextLine": "pdfminer.layout",
+    "LTTextBoxHorizontal": "pdfminer.layout",
+    "LTChar": "pdfminer.layout",
+    "LTRect": "pdfminer.layout",
+    "LTLine": "pdfminer.layout",
+}
+
+
+def __getattr__(name: str):
+    # `text_extraction.LAParams` and friends used to be module attributes
+    if name in _PDFMINER_EXPORTS:
+        import importlib
+        return getattr(importlib.import_module(_PDFMINER_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Sampled header/footer detection scans this many pages (per worker) at a time
+# and stops once the result is unchanged after this many batches in a row
+SAMPLE_BATCH_PAGES = 8
+SAMPLE_STABLE_BATCHES = 2
+
+# extract_section_text detects running headers and footers on this many
+# pages around the section's first page
+SECTION_RUNNING_TEXT_PAGES = 5
 
 ########################################################################
 #Document Navigation & Inspection Tools
 ########################################################################
-def get_total_page_count(file_stream: BinaryIO) -> int: 
+@instrumented
+def get_total_page_count(file_stream: PdfSource) -> int: 
     """
     Returns the total number of pages in the document.
     """
     try:
         #start_page = 0
-        parser = PDFParser(file_stream)
-        pdf_document = PDFDocument(parser)
+        session = as_session(file_stream)
         # Attempt graceful handling of incorrect pages
         total_pages = 0
         try:
-            total_pages = len(list(PDFPage.create_pages(pdf_document)))
+            total_pages = session.page_count
         except Exception as ex:
             print("Could not get all pages, document malformed.")
                         
@@ -44,8 +82,9 @@ def get_total_page_count(file_stream: BinaryIO) -> int:
                 
     return total_pages
 
+@instrumented
 def get_text_from_page(
-    file_stream: BinaryIO,
+    file_stream: PdfSource,
     page_number: int
 ) -> str:
     """
@@ -53,7 +92,7 @@ def get_text_from_page(
     structure and reading order.
 
     Args:
-        file_stream (BinaryIO): The binary file stream of the PDF.
+        file_stream (PdfSource): The binary file stream of the PDF, or a PdfSession.
         page_number (int): The 1-based page number to extract text from.
 
     Returns:
@@ -61,29 +100,17 @@ def get_text_from_page(
         separated by double newlines. Returns an empty string if the page
         is not found or contains no text.
     """
-    # Standard pdfminer setup
-    resource_manager = PDFResourceManager()
-    laparams = LAParams()
-    device = PDFPageAggregator(resource_manager, laparams=laparams)
-    interpreter = PDFPageInterpreter(resource_manager, device)
+    session = as_session(file_stream)
 
-    # Get the specific page object from the document
-    # The pagenos parameter uses 0-based indexing
-    target_pages = {page_number - 1}
-    page = next(PDFPage.get_pages(file_stream, pagenos=target_pages, check_extractable=False), None)
+    # Process the page layout
+    layout = session.get_layout(page_number, default_laparams())
 
-    if not page:
+    if layout is None:
         print(f"Warning: Page {page_number} not found in document.")
         return ""
 
-    # Process the page layout
-    interpreter.process_page(page)
-    layout = device.get_result()
-
     # Extract text blocks (LTTextBoxHorizontal) from the layout
-    text_blocks = [
-        element for element in layout if isinstance(element, LTTextBoxHorizontal)
-    ]
+    text_blocks = layout.horizontal_boxes()
     
     # Sort the text blocks by their vertical position (top-to-bottom)
     # The y-coordinate origin is at the bottom, so we sort by -y1 (descending)
@@ -93,8 +120,9 @@ def get_text_from_page(
     # to maintain paragraph separation.
     return "\n\n".join([block.get_text().strip() for block in text_blocks])
 
+@instrumented
 def extract_text_blocks_with_metadata(
-    file_stream: BinaryIO,
+    file_stream: PdfSource,
     page_number: int # 1-based page number
 ) -> List[Dict]:
     """
@@ -104,7 +132,7 @@ def extract_text_blocks_with_metadata(
     A text block is represented by pdfminer's LTTextBoxHorizontal.
 
     Args:
-        file_stream (BinaryIO): The binary file stream of the PDF.
+        file_stream (PdfSource): The binary file stream of the PDF, or a PdfSession.
         page_number (int): The 1-based page number to extract from.
 
     Returns:
@@ -118,65 +146,70 @@ def extract_text_blocks_with_metadata(
         - 'width' (float): The width of the text block.
         - 'height' (float): The height of the text block.
     """
-    # Basic pdfminer setup
-    resource_manager = PDFResourceManager()
-    laparams = LAParams()
-    device = PDFPageAggregator(resource_manager, laparams=laparams)
-    interpreter = PDFPageInterpreter(resource_manager, device)
-
-    # Get the specific page, pagenos is 0-indexed
-    target_pages = {page_number - 1}
-    page_to_process = next(PDFPage.get_pages(file_stream, pagenos=target_pages, check_extractable=False), None)
+    session = as_session(file_stream)
+    layout = session.get_layout(page_number, default_laparams())
 
-    if not page_to_process:
+    if layout is None:
         print(f"Warning: Page {page_number} not found in document.")
         return []
 
-    interpreter.process_page(page_to_process)
-    layout = device.get_result()
+    # We are only interested in text boxes
+    return [_text_block_record(layout, element) for element in layout.horizontal_boxes()]
+
+def _text_block_record(layout: PageLayout, element: TextBox) -> Dict:
+    """Builds the public metadata dictionary of a single text block."""
+    # --- Metadata Extraction ---
+
+    # 1. Text content and basic geometry
+    text = element.get_text()
+    bbox = element.bbox
+
+    # 2. Font analysis: the most common font and average size over the
+    # block's characters, computed once per block and shared by all tools
+    stats = element.font_stats()
+
+    return {
+        "text": text.strip(),
+        "page_number": layout.page_number,
+        "font_name": layout.font_name(stats.font_id),
+        "font_size": round(stats.avg_size, 2),
+        "bbox": bbox,
+        "width": element.width,
+        "height": element.height,
+    }
+
+def iter_text_blocks(
+    file_stream: PdfSource,
+    start_page: int = 1,
+    end_page: int = None
+) -> Iterator[Dict]:
+    """
+    Yields the text blocks of a page range, one page at a time, in a single
+    forward pass over the page tree.
 
-    text_blocks = []
+    Each block is the same dictionary `extract_text_blocks_with_metadata`
+    returns. Pages that are not already cached are analyzed without being
+    added to the session's layout cache, so each page's layout is released
+    once its blocks have been yielded and memory stays bounded however long
+    the document is.
 
-    for element in layout:
-        # We are only interested in text boxes
-        if isinstance(element, LTTextBoxHorizontal):
-            # --- Metadata Extraction ---
-            
-            # 1. Text content and basic geometry
-            text = element.get_text()
-            bbox = element.bbox
-            
-            # 2. Font analysis (more complex)
-            # We iterate down to the character level to get font info
-            font_names = []
-            font_sizes = []
-            for text_line in element:
-                if isinstance(text_line, LTTextLine):
-                    for character in text_line:
-                        if isinstance(character, LTChar):
-                            font_names.append(character.fontname)
-                            font_sizes.append(character.size)
-            
-            # Calculate the most common font name and average size
-            most_common_font = None
-            avg_font_size = 0.0
-            if font_names:
-                most_common_font = Counter(font_names).most_common(1)[0][0]
-            if font_sizes:
-                avg_font_size = round(sum(font_sizes) / len(font_sizes), 2)
-
-            block_data = {
-                "text": text.strip(),
-                "page_number": page_number,
-                "font_name": most_common_font,
-                "font_size": avg_font_size,
-                "bbox": bbox,
-                "width": element.width,
-                "height": element.height,
-            }
-            text_blocks.append(block_data)
-
-    return text_blocks
+    Args:
+        file_stream (PdfSource): The binary file stream of the PDF, or a PdfSession.
+        start_page (int): The 1-based page to start from. Defaults to 1.
+        end_page (int): The 1-based last page (inclusive). Defaults to the
+                        end of the document.
+
+    Yields:
+        Dict: One text block record at a time, in page order.
+    """
+    session = as_session(file_stream)
+    laparams = default_laparams()
+    for page_number, _ in session.iter_pages(start_page, end_page):
+        layout = session.get_layout(page_number, laparams, cache=False)
+        if layout is None:
+            continue
+        for element in layout.horizontal_boxes():
+            yield _text_block_record(layout, element)
 
 # def get_page_image(page_number: int, dpi: int = 150) -> Image:
 #     """
@@ -186,46 +219,49 @@ def extract_text_blocks_with_metadata(
 ########################################################################
 #Table of Contents Specific Tools
 ########################################################################
-def _iter_layout_elements(layout: LTPage) -> Iterator[LTTextContainer]:
-    """
-    A recursive generator to iterate through all text-containing elements
-    in a PDF page layout.
-    """
-    for element in layout:
-        if isinstance(element, LTTextContainer):
-            yield element
-        # If the element is a container, recurse into it
-        elif hasattr(element, '_objs'):
-            yield from _iter_layout_elements(element)
-            
-def extract_toc(file_stream: BinaryIO) -> List[Dict]:
-    """
-    Extracts the Table of Contents from the document.
-    Returns a list of dictionaries with TOC entries.
-    """
-    toc_list = []
-    parser = PDFParser(file_stream)
-    document = PDFDocument(parser)
-    # Get pages 
-    # Pre-build a map from page ID to page number (1-based index)
-    # This is much more efficient than searching for the page each time.
-    all_pages = list(PDFPage.create_pages(document))
-    pageid_to_num = {page.pageid: i + 1 for i, page in enumerate(all_pages)}
-            
+def _dest_page_objid(document, dest) -> Optional[int]:
+    """
+    Returns the object ID of the page an outline destination points to.
+
+    A destination is an explicit array like [page_ref /XYZ left top zoom],
+    a dictionary holding one under /D, or the name of an entry in the
+    document's named destinations. Raises PDFException (or IndexError) for
+    names and arrays that cannot be resolved.
+    """
+    from pdfminer.psparser import PSLiteral
+    from pdfminer.pdftypes import resolve1
+    dest = resolve1(dest)
+    if isinstance(dest, (bytes, str, PSLiteral)):
+        name = dest.name if isinstance(dest, PSLiteral) else dest
+        dest = resolve1(document.get_dest(name))
+    if isinstance(dest, dict):
+        dest = resolve1(dest.get('D'))
+    if not isinstance(dest, list):
+        return None
+    return getattr(dest[0], 'objid', None)
+
+def _iter_toc_entries(session: PdfSession) -> Iterator[Dict]:
+    from pdfminer.pdftypes import PDFException, resolve1
+    document = session.document
     outlines = document.get_outlines()
     for (level, title, dest, action, se) in outlines:
-        
+
         page_info = '[Container]' # Default for non-linking entries
+        action = resolve1(action)
+        if not dest and isinstance(action, dict) and getattr(action.get('S'), 'name', None) == 'GoTo':
+            # A GoTo action carries an ordinary destination under /D
+            dest = action.get('D')
         if dest:
             try:
-                # resolve_dest returns a tuple like (page_id, spec, arg1, arg2, ...)
-                # The first element is the page object's ID we need.
-                page_id = document.resolve_dest(dest)[0]
-                        
-                # Look up the page number from our pre-built map
-                if page_id in pageid_to_num:
-                    page_info = pageid_to_num[page_id]
-                            
+                # The first element of the destination is the page object
+                page_id = _dest_page_objid(document, dest)
+
+                # Look up the page number in the session's page-tree index,
+                # which is built on first use without creating PDFPages
+                page_number = session.page_number_of(page_id) if page_id is not None else None
+                if page_number is not None:
+                    page_info = page_number
+
             except (PDFException, IndexError) as e:
                 # Some destinations might not resolve correctly or might be invalid
                 print(f"Warning: Could not resolve destination for '{title}'. Error: {e}")
@@ -243,72 +279,140 @@ def extract_toc(file_stream: BinaryIO) -> List[Dict]:
                     page_info = f"[Action: {action_type.name if hasattr(action_type, 'name') else 'Unknown'}]"
             else:
                 page_info = '[Unknown Action]'
-                                        
-        toc_list.append({"level": level, "title": title, "page": page_info})  
-                          
-    return toc_list
 
+        yield {"level": level, "title": title, "page": page_info}
+
+@instrumented
+def extract_toc(file_stream: PdfSource, lazy: bool = False) -> Union[List[Dict], Iterator[Dict]]:
+    """
+    Extracts the Table of Contents from the document.
+
+    Destinations are resolved through the session's page-tree index (page
+    object ID to page number), so pages are never materialized for the
+    outline alone.
+
+    Args:
+        file_stream (PdfSource): The binary file stream of the PDF, or a PdfSession.
+        lazy (bool): If True, return a generator that yields entries as the
+                     outline is read, so the first entries of a large or
+                     broken outline are available right away.
+
+    Returns:
+        A list (or generator) of dictionaries with 'level', 'title' and
+        'page' keys.
+    """
+    session = as_session(file_stream)
+    if lazy:
+        return _iter_toc_entries(session)
+    return list(_iter_toc_entries(session))
+
+def _page_has_keyword(
+    session: PdfSession,
+    page_number: int,
+    search_keyword: str,
+    case_sensitive: bool,
+    laparams: LayoutSettings
+) -> bool:
+    """Checks a single page for a keyword already prepared for the search."""
+    layout = session.get_layout(page_number, laparams)
+
+    # Check every text element, including those nested in figures
+    for element in layout.text_boxes:
+        text = element.get_text()
+        element_text = text if case_sensitive else text.lower()
+
+        if search_keyword in element_text:
+            # Found it on this page, no need to check other elements
+            return True
+    return False
+
+@instrumented
 def find_pages_with_keyword(
     keyword: str,
-    file_stream: BinaryIO,
+    file_stream: PdfSource,
     start_page: int = 1,
     end_page: int = None,
-    case_sensitive: bool = False
+    case_sensitive: bool = False,
+    workers: int = None,
+    text_mode: str = None
 ) -> List[int]:
     """
     Finds pages containing a specified keyword in a PDF.
 
-    This version is more robust, efficient, and has a clearer API.
+    This version is more robust, efficient, and has a clearer API. If the
+    session has a keyword index (see `find_pages_with_terms`), the search is
+    answered from it without laying out any page.
 
     Args:
         keyword (str): The keyword to search for.
-        file_stream (BinaryIO): The binary file stream of the PDF.
+        file_stream (PdfSource): The binary file stream of the PDF, or a PdfSession.
         start_page (int): The 1-based page number to start searching from. Defaults to 1.
         end_page (int): The 1-based page number to end searching at (inclusive). 
                           Defaults to the end of the document.
         case_sensitive (bool): Whether the search should be case-sensitive.
+        workers (int): Number of worker processes to spread the pages over.
+                       Defaults to scanning in the calling process.
+        text_mode (str): "layout" or "raw". Raw mode skips layout analysis and
+                         matches within lines instead of text boxes. Defaults
+                         to the session's text mode.
 
     Returns:
         List[int]: A sorted list of 1-based page numbers where the keyword was found.
     """
-    found_pages: Set[int] = set()
-    
+    session = as_session(file_stream)
+    laparams = session.scan_laparams(text_mode)
+    index = get_keyword_index(session, laparams)
+    if index is not None and index.covers(start_page, end_page):
+        return index.find_substring(keyword, case_sensitive, start_page, end_page)
+
     # Prepare the keyword for searching to avoid repeated processing in the loop
     search_keyword = keyword if case_sensitive else keyword.lower()
     
-    # Setup pdfminer resources
-    resource_manager = PDFResourceManager()
-    laparams = LAParams()
-    device = PDFPageAggregator(resource_manager, laparams=laparams)
-    interpreter = PDFPageInterpreter(resource_manager, device)
-
-     # Use enumerate to get a reliable 0-based page index
-    for i, page in enumerate(PDFPage.get_pages(file_stream, check_extractable=False)):
-        current_page_num_0_indexed = i
-        
-        # --- THIS IS THE FIX ---
-        # Filter pages based on the start_page and end_page parameters
-        if current_page_num_0_indexed < start_page - 1:
-            continue
-        if end_page is not None and current_page_num_0_indexed >= end_page:
-            break # We've passed the desired page range, so we can stop
-
-        interpreter.process_page(page)
-        layout = device.get_result()
-        
-        # Use the recursive iterator to find all text elements
-        for element in _iter_layout_elements(layout):
-            text = element.get_text()
-            element_text = text if case_sensitive else text.lower()
-            
-            if search_keyword in element_text:
-                # Add the 1-based page number to our set
-                found_pages.add(current_page_num_0_indexed + 1)
-                # Found it on this page, no need to check other elements
-                break 
+    page_results = map_pages(
+        partial(_page_has_keyword, search_keyword=search_keyword, case_sensitive=case_sensitive, laparams=laparams),
+        session,
+        start_page,
+        end_page,
+        workers=workers
+    )
+    found_pages: Set[int] = {page_number for page_number, found in page_results if found}
 
     return sorted(list(found_pages))
 
+@instrumented
+def find_pages_with_terms(
+    terms: List[str],
+    file_stream: PdfSource,
+    match_all: bool = True,
+    workers: int = None,
+    text_mode: str = None
+) -> List[int]:
+    """
+    Finds pages containing several words or phrases, using the document's
+    keyword index.
+
+    Terms match whole words, ignoring case; a term with several words is a
+    phrase whose words must appear consecutively. The index is built on
+    first use (one layout pass over the document) and kept on the session,
+    and in its layout store if it has one, for all later searches.
+
+    Args:
+        terms (List[str]): The words or phrases to search for.
+        file_stream (PdfSource): The binary file stream of the PDF, or a PdfSession.
+        match_all (bool): If True, a page must contain every term; otherwise
+                          any one of them is enough.
+        workers (int): Number of worker processes used to build the index.
+        text_mode (str): "layout" or "raw" text for building the index.
+                         Defaults to the session's text mode.
+
+    Returns:
+        List[int]: A sorted list of 1-based page numbers that match.
+    """
+    session = as_session(file_stream)
+    laparams = session.scan_laparams(text_mode)
+    index = get_keyword_index(session, laparams) or build_keyword_index(session, laparams, workers=workers)
+    return index.search(terms, match_all=match_all)
+
 def identify_toc_candidate_lines(page_number: int) -> List[Dict]:
     """
     Identifies candidate lines for the Table of Contents on the specified page.
@@ -338,77 +442,162 @@ def find_potential_headers(page_number: int) -> List[Dict]:
     """
     return []
 
+def _margin_candidates(
+    session: PdfSession,
+    page_number: int,
+    top_margin: float,
+    bottom_margin: float,
+    laparams: LayoutSettings,
+    from_edge: bool = False
+) -> List[Tuple[str, int, str]]:
+    """
+    Returns (text, rounded y0, "headers" or "footers") tuples for the text
+    elements that fall in the header or footer zone of a single page. Each
+    element is classified against its own page's height.
+
+    With `from_edge`, header positions are measured down from the top of
+    the page instead, so running text matches across pages of different
+    heights.
+    """
+    layout = session.get_layout(page_number, laparams)
+    page_height = layout.mediabox[3] # [x0, y0, x1, y1]
+    header_y_threshold = page_height * top_margin
+    footer_y_threshold = page_height * bottom_margin
+
+    candidates = []
+    for element in layout.text_boxes:
+        text = element.get_text().strip()
+        if not text:
+            continue
+
+        # Check if element is in header or footer zone
+        if element.y1 > header_y_threshold or element.y0 < footer_y_threshold:
+            # Use a simplified, rounded position for grouping
+            y_pos_bucket = round(element.y0 / 10) * 10
+            zone = "headers" if y_pos_bucket > footer_y_threshold else "footers"
+            if from_edge and zone == "headers":
+                y_pos_bucket = round((page_height - element.y0) / 10) * 10
+            candidates.append((text, y_pos_bucket, zone))
+    return candidates
+
+def _classify_margin_candidates(potential_elements: Counter, min_occurrence: int) -> dict:
+    # Filter for elements that occurred frequently
+    result = {"headers": [], "footers": []}
+    for (text, y_pos, zone), count in potential_elements.items():
+        if count >= min_occurrence and text not in result[zone]:
+            result[zone].append(text)
+    return result
+
+@instrumented
 def find_headers_and_footers(
-    file_stream: BinaryIO,
+    file_stream: PdfSource,
     scan_pages: int = 10,
     top_margin: float = 0.90,
     bottom_margin: float = 0.10,
-    min_occurrence: int = 3
+    min_occurrence: int = 3,
+    workers: int = None,
+    text_mode: str = None,
+    sample: bool = False,
+    seed: int = 0,
+    start_page: int = 1
 ) -> dict:
     """
     Analyzes the first few pages of a PDF to identify common headers and footers.
 
+    With `sample=True`, pages spread across the whole document are scanned
+    instead of the first ones, which are often cover and front matter. Only
+    the margin bands of sampled pages are laid out, and the scan stops early
+    once the result is stable.
+
     Args:
-        file_stream (BinaryIO): The binary file stream of the PDF.
-        scan_pages (int): The number of pages to scan to find patterns.
+        file_stream (PdfSource): The binary file stream of the PDF, or a PdfSession.
+        scan_pages (int): The number of pages to scan to find patterns. In
+                          sampled mode, the maximum number of sampled pages.
         top_margin (float): The vertical threshold for the header (e.g., 0.90 means top 10%).
         bottom_margin (float): The vertical threshold for the footer (e.g., 0.10 means bottom 10%).
         min_occurrence (int): The minimum number of times text must appear to be considered.
+        workers (int): Number of worker processes to spread the pages over.
+                       Defaults to scanning in the calling process.
+        text_mode (str): "layout" or "raw". Raw mode skips layout analysis and
+                         votes on lines instead of text boxes. Defaults to the
+                         session's text mode.
+        sample (bool): If True, scan a stratified sample of the document.
+        seed (int): Seed of the page sample, so results are reproducible.
+        start_page (int): The first page to scan, if not sampling.
 
     Returns:
         dict: A dictionary with 'headers' and 'footers' keys, containing lists
               of common text elements found.
     """
-    resource_manager = PDFResourceManager()
-    laparams = LAParams()
-    device = PDFPageAggregator(resource_manager, laparams=laparams)
-    interpreter = PDFPageInterpreter(resource_manager, device)
-    
-    potential_elements = Counter()
-    
-    # Use enumerate to get a page index for the scan limit
-    for i, page in enumerate(PDFPage.get_pages(file_stream, check_extractable=False)):
-        if i >= scan_pages:
-            break
-            
-        page_height = page.mediabox[3] # [x0, y0, x1, y1]
-        header_y_threshold = page_height * top_margin
-        footer_y_threshold = page_height * bottom_margin
-        
-        interpreter.process_page(page)
-        layout = device.get_result()
-        
-        for element in _iter_layout_elements(layout):
-            text = element.get_text().strip()
-            if not text:
-                continue
+    session = as_session(file_stream)
+    laparams = session.scan_laparams(text_mode)
 
-            # Check if element is in header or footer zone
-            if element.y1 > header_y_threshold or element.y0 < footer_y_threshold:
-                # Use a simplified, rounded position for grouping
-                y_pos_bucket = round(element.y0 / 10) * 10
-                potential_elements[(text, y_pos_bucket)] += 1
-                
-    # Filter for elements that occurred frequently
-    result = {"headers": [], "footers": []}
+    if sample:
+        return _sample_headers_and_footers(
+            session, scan_pages, top_margin, bottom_margin, min_occurrence, workers, laparams, seed
+        )
     
-    # Re-get the height of the first page for classification
-    file_stream.seek(0)
-    first_page = next(PDFPage.get_pages(file_stream))
-    page_height = first_page.mediabox[3]
-    footer_y_threshold = page_height * bottom_margin
+    potential_elements = Counter()
 
-    for (text, y_pos), count in potential_elements.items():
-        if count >= min_occurrence:
-            if y_pos > footer_y_threshold:
-                result["headers"].append(text)
-            else:
-                result["footers"].append(text)
+    # Only `scan_pages` pages from `start_page` on are scanned
+    page_results = map_pages(
+        partial(_margin_candidates, top_margin=top_margin, bottom_margin=bottom_margin, laparams=laparams),
+        session,
+        start_page,
+        start_page + scan_pages - 1,
+        workers=workers
+    )
+    for _, candidates in page_results:
+        potential_elements.update(candidates)
                 
-    return result
+    return _classify_margin_candidates(potential_elements, min_occurrence)
+
+def _sample_headers_and_footers(
+    session: PdfSession,
+    scan_pages: int,
+    top_margin: float,
+    bottom_margin: float,
+    min_occurrence: int,
+    workers: int,
+    laparams: LayoutSettings,
+    seed: int
+) -> dict:
+    """
+    The sampled mode of `find_headers_and_footers`: scans a seeded,
+    stratified sample of pages in batches and stops once the result has not
+    changed for SAMPLE_STABLE_BATCHES batches in a row.
+    """
+    if laparams != RAW_TEXT:
+        # Only the margin bands need layout analysis
+        from margin_bands import MarginBandParams
+        laparams = MarginBandParams(top_margin, bottom_margin)
+    func = partial(
+        _margin_candidates, top_margin=top_margin, bottom_margin=bottom_margin, laparams=laparams, from_edge=True
+    )
+    pages = sample_page_numbers(session.page_count, scan_pages, seed)
+    batch_size = SAMPLE_BATCH_PAGES * max(workers or 1, 1)
 
+    potential_elements = Counter()
+    result = None
+    stable_batches = 0
+    # One pool for every batch, so each worker parses the document once
+    pool = document_pool(session, workers) if workers and workers > 1 else nullcontext()
+    with pool as executor:
+        for batch_start in range(0, len(pages), batch_size):
+            batch = pages[batch_start:batch_start + batch_size]
+            for _, candidates in map_page_numbers(func, session, batch, workers=workers, executor=executor):
+                potential_elements.update(candidates)
+
+            previous, result = result, _classify_margin_candidates(potential_elements, min_occurrence)
+            stable_batches = stable_batches + 1 if result == previous else 0
+            if stable_batches >= SAMPLE_STABLE_BATCHES:
+                break
+
+    return result if result is not None else {"headers": [], "footers": []}
+
+@instrumented
 def get_text_between_y_coordinates(
-    file_stream: BinaryIO,
+    file_stream: PdfSource,
     page_number: int,
     start_y: float,
     end_y: float
@@ -421,7 +610,7 @@ def get_text_between_y_coordinates(
     are provided in ascending or descending order.
 
     Args:
-        file_stream (BinaryIO): The binary file stream of the PDF.
+        file_stream (PdfSource): The binary file stream of the PDF, or a PdfSession.
         page_number (int): The 1-based page number to extract from.
         start_y (float): One of the vertical boundary coordinates.
         end_y (float): The other vertical boundary coordinate.
@@ -430,37 +619,22 @@ def get_text_between_y_coordinates(
         A single string containing the content found in the specified
         vertical slice, with elements sorted top-to-bottom.
     """
-    # Standard pdfminer setup
-    resource_manager = PDFResourceManager()
-    laparams = LAParams()
-    device = PDFPageAggregator(resource_manager, laparams=laparams)
-    interpreter = PDFPageInterpreter(resource_manager, device)
+    session = as_session(file_stream)
+    layout = session.get_layout(page_number, default_laparams())
 
-    # Get the specific page
-    target_pages = {page_number - 1}
-    page = next(PDFPage.get_pages(file_stream, pagenos=target_pages, check_extractable=False), None)
-
-    if not page:
+    if layout is None:
         print(f"Warning: Page {page_number} not found in document.")
         return ""
-
-    interpreter.process_page(page)
-    layout = device.get_result()
     
     # Determine the upper and lower bounds of our selection area
     upper_bound = max(start_y, end_y)
     lower_bound = min(start_y, end_y)
 
-    found_elements = []
-    for element in _iter_layout_elements(layout):
-        # An element's bounding box is (x0, y0, x1, y1)
-        element_bottom = element.y0
-        element_top = element.y1
-        
-        # Check for vertical overlap. The element is in the slice if it's
-        # not entirely above the upper bound or entirely below the lower bound.
-        if not (element_bottom > upper_bound or element_top < lower_bound):
-            found_elements.append(element)
+    # An element is in the slice if it's not entirely above the upper bound
+    # or entirely below the lower bound. The page's spatial index finds them
+    # without scanning every element.
+    text_boxes = layout.text_boxes
+    found_elements = [text_boxes[i] for i in layout.bbox_index("text_boxes").in_y_band(lower_bound, upper_bound)]
     
     # Sort the found elements from top to bottom for correct reading order
     found_elements.sort(key=lambda el: -el.y1)
@@ -472,8 +646,9 @@ def _bboxes_are_close(bbox1: Tuple[float, ...], bbox2: Tuple[float, ...], tolera
     """Checks if two bounding boxes are almost identical."""
     return all(abs(c1 - c2) < tolerance for c1, c2 in zip(bbox1, bbox2))
 
+@instrumented
 def get_text_following_header(
-    file_stream: BinaryIO,
+    file_stream: PdfSource,
     page_number: int,
     header_bbox: List[float]
 ) -> str:
@@ -481,10 +656,12 @@ def get_text_following_header(
     Returns text content that follows a specified header bounding box until
     the next header of the same or greater importance is found.
 
-    This is useful for extracting the content of a specific section.
+    This is useful for extracting the content of a specific section. Only
+    the header's page is searched; use `extract_section_text` for sections
+    that continue on the following pages.
 
     Args:
-        file_stream (BinaryIO): The binary file stream of the PDF.
+        file_stream (PdfSource): The binary file stream of the PDF, or a PdfSession.
         page_number (int): The 1-based page number where the header is located.
         header_bbox (List[float]): The bounding box (x0, y0, x1, y1) of the header.
 
@@ -493,67 +670,145 @@ def get_text_following_header(
         separated by double newlines. Returns an empty string if the header
         is not found or has no content following it.
     """
-    # This part is a simplified version of `extract_text_blocks_with_metadata`
-    resource_manager = PDFResourceManager()
-    laparams = LAParams()
-    device = PDFPageAggregator(resource_manager, laparams=laparams)
-    interpreter = PDFPageInterpreter(resource_manager, device)
+    session = as_session(file_stream)
+    return "\n\n".join(_iter_section_blocks(session, page_number, header_bbox, max_pages=1))
 
-    target_pages = {page_number - 1}
-    page = next(PDFPage.get_pages(file_stream, pagenos=target_pages, check_extractable=False), None)
+def _iter_section_blocks(
+    session: PdfSession,
+    page_number: int,
+    header_bbox: List[float],
+    max_pages: int,
+    running_text: Set[str] = None
+) -> Iterator[str]:
+    """
+    Yields the stripped text of the blocks following a header, in reading
+    order, until the next header of the same or greater importance or the
+    end of the page range. Each page is laid out once through the session's
+    layout cache, and only when the previous page did not end the section.
+    """
+    header_font_size = None
+    for current_page, _ in session.iter_pages(page_number, page_number + max_pages - 1):
+        layout = session.get_layout(current_page, default_laparams())
+
+        # 1. Get all text blocks; their font stats are shared with the other tools
+        all_blocks = layout.horizontal_boxes()
+
+        # Sort all blocks top-to-bottom
+        all_blocks.sort(key=lambda b: -b.bbox[1])
+
+        start_index = 0
+        if header_font_size is None:
+            # 2. Find the header block and its properties
+            header_index = -1
+            for i, block in enumerate(all_blocks):
+                if _bboxes_are_close(block.bbox, header_bbox):
+                    header_index = i
+                    header_font_size = block.font_stats().avg_size
+                    break
+
+            if header_index == -1:
+                # Header with the specified bbox was not found on this page
+                return
+            # Start searching from the element right after the header
+            start_index = header_index + 1
+
+        # 3. Collect content blocks that follow the header
+        for current_block in all_blocks[start_index:]:
+            text = current_block.get_text().strip()
+
+            # Running headers and footers repeat on every page; they are
+            # neither content nor the end of the section
+            if running_text and text in running_text:
+                continue
 
-    if not page:
-        return ""
+            # 4. Stop if we find a new header
+            # Heuristic: A new header has a font size equal to or larger than our
+            # reference header. This captures sibling headers (H2 -> H2) and
+            # parent-level headers (H3 -> H2).
+            if current_block.font_stats().avg_size >= header_font_size:
+                return
+
+            # Otherwise, it's part of the section's content
+            yield text
+
+def _running_text_near(session: PdfSession, page_number: int) -> dict:
+    """Finds the running headers and footers on the pages around `page_number`."""
+    window = SECTION_RUNNING_TEXT_PAGES
+    start_page = max(1, min(page_number - window // 2, session.page_count - window + 1))
+    return find_headers_and_footers(session, scan_pages=window, text_mode="layout", start_page=start_page)
+
+@instrumented
+def extract_section_text(
+    file_stream: PdfSource,
+    page_number: int,
+    header_bbox: List[float],
+    max_pages: int = 10,
+    max_chars: int = 20000,
+    skip_running_text: bool = True,
+    running_text: List[str] = None,
+    scan_document_start: bool = False
+) -> str:
+    """
+    Returns the content of the section that starts at a header, following it
+    across pages until the next header of the same or greater importance.
 
-    interpreter.process_page(page)
-    layout = device.get_result()
-
-    # 1. Get all text blocks with metadata
-    all_blocks = []
-    for element in layout:
-        if isinstance(element, LTTextBoxHorizontal):
-            font_sizes = [char.size for line in element if isinstance(line, LTTextLine) for char in line if isinstance(char, LTChar)]
-            avg_font_size = sum(font_sizes) / len(font_sizes) if font_sizes else 0
-            all_blocks.append({
-                "text": element.get_text(),
-                "bbox": element.bbox,
-                "font_size": avg_font_size
-            })
-
-    # Sort all blocks top-to-bottom
-    all_blocks.sort(key=lambda b: -b['bbox'][1])
-    
-    # 2. Find the header block and its properties
-    header_index = -1
-    header_font_size = 0
-    for i, block in enumerate(all_blocks):
-        if _bboxes_are_close(block['bbox'], header_bbox):
-            header_index = i
-            header_font_size = block['font_size']
-            break
+    Unlike `get_text_following_header`, which stops at the end of the
+    header's page, pages are streamed forward one at a time and layout stops
+    as soon as the section ends or a cap is reached.
 
-    if header_index == -1:
-        # Header with the specified bbox was not found on this page
-        return ""
+    Args:
+        file_stream (PdfSource): The binary file stream of the PDF, or a PdfSession.
+        page_number (int): The 1-based page number where the header is located.
+        header_bbox (List[float]): The bounding box (x0, y0, x1, y1) of the header.
+        max_pages (int): The maximum number of pages to scan, including the
+                         header's page.
+        max_chars (int): The maximum length of the returned text. The text
+                         is cut off at this length. None for no limit.
+        skip_running_text (bool): If True, skip running headers and footers.
+        running_text (List[str]): The running header and footer texts to
+                                  skip, e.g. from an earlier call to
+                                  `find_headers_and_footers`. Defaults to
+                                  the ones found on the
+                                  SECTION_RUNNING_TEXT_PAGES pages around
+                                  the header's page, which are laid out with
+                                  the same settings as the section and
+                                  shared through the layout cache.
+        scan_document_start (bool): If True, detect the running text on the
+                                    first pages of the document instead,
+                                    as `find_headers_and_footers` does.
 
-    # 3. Collect content blocks that follow the header
-    content_blocks = []
-    # Start searching from the element right after the header
-    for i in range(header_index + 1, len(all_blocks)):
-        current_block = all_blocks[i]
-        
-        # 4. Stop if we find a new header
-        # Heuristic: A new header has a font size equal to or larger than our
-        # reference header. This captures sibling headers (H2 -> H2) and
-        # parent-level headers (H3 -> H2).
-        if current_block['font_size'] >= header_font_size:
+    Returns:
+        A single string containing the content of the section, with paragraphs
+        separated by double newlines. Returns an empty string if the header
+        is not found or has no content following it.
+    """
+    session = as_session(file_stream)
+
+    running = None
+    if skip_running_text:
+        if running_text is None:
+            if scan_document_start:
+                found = find_headers_and_footers(session, text_mode="layout")
+            else:
+                found = _running_text_near(session, page_number)
+            running_text = found["headers"] + found["footers"]
+        running = set(running_text)
+
+    # Collect blocks until the section ends or the text is long enough. The
+    # generator is not resumed past the cap, so no further pages are laid out.
+    parts = []
+    length = 0
+    for text in _iter_section_blocks(session, page_number, header_bbox, max_pages, running):
+        separator = 2 if parts else 0
+        if max_chars is not None and length + separator + len(text) > max_chars:
+            remaining = max_chars - length - separator
+            if remaining > 0:
+                parts.append(text[:remaining])
             break
-        
-        # Otherwise, it's part of the section's content
-        content_blocks.append(current_block['text'].strip())
+        parts.append(text)
+        length += separator + len(text)
 
-    # 5. Join the collected text for a clean output
-    return "\n\n".join(content_blocks)
+    return "\n\n".join(parts)
 
 
 ########################################################################
@@ -567,51 +822,30 @@ def _is_inside(inner_bbox, outer_bbox):
 
 # Helper function to merge overlapping bounding boxes
 def _merge_overlapping_bboxes(bboxes: List[Dict]) -> List[Dict]:
+    """
+    Merges detections whose overlap with a more confident detection covers
+    more than 50% of their own area into that detection's bbox. Returns the
+    surviving detections, most confident first.
+    """
     if not bboxes:
         return []
 
-    # Sort by confidence score, descending
-    bboxes.sort(key=lambda b: -b['confidence'])
-    
+    clusters = merge_overlapping(
+        [tuple(b['bbox']) for b in bboxes], scores=[b['confidence'] for b in bboxes]
+    )
+
     merged = []
-    while bboxes:
-        # Pop the most confident bbox
-        base = bboxes.pop(0)
-        
-        # Find all other bboxes that overlap significantly with the base
-        base_area = (base['bbox'][2] - base['bbox'][0]) * (base['bbox'][3] - base['bbox'][1])
-        to_merge_indices = []
-        for i, other in enumerate(bboxes):
-            # Calculate intersection area
-            ix0 = max(base['bbox'][0], other['bbox'][0])
-            iy0 = max(base['bbox'][1], other['bbox'][1])
-            ix1 = min(base['bbox'][2], other['bbox'][2])
-            iy1 = min(base['bbox'][3], other['bbox'][3])
-            
-            if ix1 > ix0 and iy1 > iy0: # Overlap exists
-                intersection_area = (ix1 - ix0) * (iy1 - iy0)
-                other_area = (other['bbox'][2] - other['bbox'][0]) * (other['bbox'][3] - other['bbox'][1])
-                
-                # If overlap is more than 50% of the other box's area, mark for merging
-                if intersection_area / other_area > 0.5:
-                    to_merge_indices.append(i)
-
-        # Merge the bboxes
-        for i in sorted(to_merge_indices, reverse=True):
-            other = bboxes.pop(i)
-            base['bbox'] = [
-                min(base['bbox'][0], other['bbox'][0]),
-                min(base['bbox'][1], other['bbox'][1]),
-                max(base['bbox'][2], other['bbox'][2]),
-                max(base['bbox'][3], other['bbox'][3]),
-            ]
-        
+    for base_index, bounds, members in clusters:
+        base = bboxes[base_index]
+        if len(members) > 1:
+            base['bbox'] = list(bounds)
         merged.append(base)
-        
+
     return merged
 
+@instrumented
 def detect_tables_on_page(
-    file_stream: BinaryIO,
+    file_stream: PdfSource,
     page_number: int,
     min_table_area: float = 10000.0,
     confidence_threshold: float = 0.7
@@ -623,7 +857,7 @@ def detect_tables_on_page(
     tables based on the density of text boxes and lines they contain.
 
     Args:
-        file_stream (BinaryIO): The binary file stream of the PDF.
+        file_stream (PdfSource): The binary file stream of the PDF, or a PdfSession.
         page_number (int): The 1-based page number to analyze.
         min_table_area (float): The minimum area a rectangle must have to be
                                 considered a potential table.
@@ -634,39 +868,31 @@ def detect_tables_on_page(
         A list of dictionaries, where each dict represents a detected table
         and contains 'bbox' and 'confidence' keys.
     """
-    resource_manager = PDFResourceManager()
-    laparams = LAParams()
-    device = PDFPageAggregator(resource_manager, laparams=laparams)
-    interpreter = PDFPageInterpreter(resource_manager, device)
-
-    target_pages = {page_number - 1}
-    page = next(PDFPage.get_pages(file_stream, pagenos=target_pages, check_extractable=False), None)
-    if not page:
+    session = as_session(file_stream)
+    layout = session.get_layout(page_number, default_laparams())
+    if layout is None:
         return []
 
-    interpreter.process_page(page)
-    layout = device.get_result()
-
-    # 1. Extract all relevant layout elements
-    rects = [el for el in layout if isinstance(el, LTRect)]
-    lines = [el for el in layout if isinstance(el, LTLine)]
-    text_boxes = [el for el in layout if isinstance(el, LTTextBoxHorizontal)]
+    # 1. Extract all relevant layout elements. Text boxes and lines are
+    # looked up through the page's spatial indexes, so each candidate only
+    # examines the elements within its vertical extent.
+    rects = layout.rects
+    line_index = layout.bbox_index("lines")
+    text_box_index = layout.bbox_index("horizontal_boxes")
 
     # 2. Identify candidate table regions (large rectangles)
     potential_tables = []
     for r in rects:
-        area = r.width * r.height
+        area = (r[2] - r[0]) * (r[3] - r[1])
         if area > min_table_area:
             # 3. Score each candidate based on its contents
             score = 0
             
             # More contained text boxes are a good sign
-            contained_text_boxes = [tb for tb in text_boxes if _is_inside(tb.bbox, r.bbox)]
-            score += len(contained_text_boxes) * 2 # Weight text boxes highly
+            score += text_box_index.count_inside(r) * 2 # Weight text boxes highly
             
             # Contained lines are also a good sign
-            contained_lines = [l for l in lines if _is_inside(l.bbox, r.bbox)]
-            score += len(contained_lines) * 1
+            score += line_index.count_inside(r) * 1
 
             # 4. Convert raw score to a confidence value (0-1) using a sigmoid function
             # This is a simple way to map an unbounded score to a bounded probability.
@@ -677,7 +903,7 @@ def detect_tables_on_page(
             
             if confidence > confidence_threshold:
                 potential_tables.append({
-                    "bbox": list(r.bbox),
+                    "bbox": list(r),
                     "confidence": round(confidence, 3)
                 })
 
@@ -694,8 +920,9 @@ def _check_bbox_overlap(bbox1: Tuple, bbox2: Tuple) -> bool:
     # True if the two boxes have a non-zero intersection area
     return not (ax1 < bx0 or ax0 > bx1 or ay1 < by0 or ay0 > by1)
 
+@instrumented
 def extract_text_in_bbox(
-    file_stream: BinaryIO,
+    file_stream: PdfSource,
     page_number: int,  # 1-based page number
     bbox: Tuple[float, float, float, float]
 ) -> str:
@@ -703,7 +930,7 @@ def extract_text_in_bbox(
     Extracts text from a specified bounding box on a given page.
 
     Args:
-        file_stream (BinaryIO): The binary file stream of the PDF.
+        file_stream (PdfSource): The binary file stream of the PDF, or a PdfSession.
         page_number (int): The 1-based page number to extract from.
         bbox (Tuple[float, float, float, float]): The bounding box (x0, y0, x1, y1)
                                                    to extract text from.
@@ -712,32 +939,49 @@ def extract_text_in_bbox(
         str: A string containing all text found within the bounding box,
              sorted approximately by vertical position.
     """
-    # Setup pdfminer resources
-    resource_manager = PDFResourceManager()
-    laparams = LAParams()
-    device = PDFPageAggregator(resource_manager, laparams=laparams)
-    interpreter = PDFPageInterpreter(resource_manager, device)
+    texts = extract_text_in_bboxes(file_stream, page_number, [bbox])
+    return texts[0] if texts else ""
 
-    # Get the specific page
-    # Note: pagenos is 0-indexed
-    target_pages = {page_number - 1}
-    page_to_process = next(PDFPage.get_pages(file_stream, pagenos=target_pages, check_extractable=False), None)
+@instrumented
+def extract_text_in_bboxes(
+    file_stream: PdfSource,
+    page_number: int,  # 1-based page number
+    bboxes: List[Tuple[float, float, float, float]]
+) -> List[str]:
+    """
+    Extracts the text of many regions of a page in one call, such as the
+    cells of a table or the columns of a layout. The page is laid out once
+    and each region is looked up in the page's spatial index.
 
-    if not page_to_process:
-        return ""
+    Args:
+        file_stream (PdfSource): The binary file stream of the PDF, or a PdfSession.
+        page_number (int): The 1-based page number to extract from.
+        bboxes (List[Tuple[float, float, float, float]]): The bounding boxes
+                                                           (x0, y0, x1, y1) to
+                                                           extract text from.
 
-    interpreter.process_page(page_to_process)
-    layout = device.get_result()
+    Returns:
+        List[str]: The text of each region, as `extract_text_in_bbox` returns
+                   it, in the order of `bboxes`. Empty if the page is not found.
+    """
+    session = as_session(file_stream)
+    layout = session.get_layout(page_number, default_laparams())
 
-    found_elements = []
-    for element in _iter_layout_elements(layout):
-        if _check_bbox_overlap(element.bbox, bbox):
-            found_elements.append(element)
-            
-    # Sort elements from top to bottom (higher y1 is higher on page)
-    found_elements.sort(key=lambda el: -el.y1)
+    if layout is None:
+        return []
+
+    text_boxes = layout.text_boxes
+    index = layout.bbox_index("text_boxes")
+    texts = []
+    for bbox in bboxes:
+        # Elements overlapping the region, edges included
+        found_elements = [text_boxes[i] for i in index.overlapping(bbox)]
+
+        # Sort elements from top to bottom (higher y1 is higher on page)
+        found_elements.sort(key=lambda el: -el.y1)
+        texts.append("".join(el.get_text() for el in found_elements))
 
-    return "".join(el.get_text() for el in found_elements)
+    return texts
 
 def parse_text_into_table(raw_text: str, delimiter: str = ' ') -> List[List[str]]:
     """
@@ -0,0 +1,389 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Union
+
+from instrumentation import count
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; locking is then per process only
+    fcntl = None
+
+# Sits next to the layout store (.cache/layouts)
+DEFAULT_CACHE_DIR = Path(".cache/files")
+
+# Default size cap of a cache directory
+DEFAULT_MAX_CACHE_BYTES = 5 * 1024 ** 3
+
+# Eviction policies: least recently used, or least frequently used
+EVICTION_POLICIES = ("lru", "lfu")
+
+# Temporary files older than this are left over from crashed writers
+STALE_TEMP_SECONDS = 3600
+
+_COPY_CHUNK = 1024 * 1024
+_META_SUFFIX = ".json"
+_TEMP_SUFFIX = ".tmp"
+_LOCK_NAME = ".lock"
+_TOTAL_NAME = ".size"
+
+# Called with an entry's metadata; returns False if the entry is out of date
+Validator = Callable[[Dict], bool]
+
+
+class FileCache:
+    """
+    A size-capped, on-disk cache of downloaded files.
+
+    Each entry is a data file named after its key (the SHA-256 of the URI,
+    see `utils.file_loader.hash_uri`) plus a small JSON sidecar holding the
+    URI, size, ETag, Last-Modified, access time and hit count:
+
+        <cache_dir>/<key>
+        <cache_dir>/<key>.json
+
+    Writes go to a temporary file that is renamed into place, so readers and
+    other processes never see a partial entry. Metadata updates and eviction
+    hold an exclusive lock on <cache_dir>/.lock (flock), so several worker
+    processes can share one cache directory. The total size of all entries
+    is kept in <cache_dir>/.size and updated under the lock, so a write does
+    not rescan the directory; only when the total exceeds `max_bytes` are
+    the entries scanned and evicted, least recently used first ("lru") or
+    least frequently used first ("lfu").
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path] = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+        policy: str = "lru"
+    ):
+        """
+        Args:
+            cache_dir (Union[str, Path]): Directory holding the entries.
+            max_bytes (int): Size cap of all entries together, in bytes.
+            policy (str): Eviction policy, "lru" or "lfu".
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.policy = policy
+        # Not reentrant: every _locked() opens and flocks its own descriptor
+        # of the lock file, so nesting it would deadlock on the flock
+        self._thread_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale = 0
+
+    ####################################################################
+    # Paths and locking
+    ####################################################################
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def _meta_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{_META_SUFFIX}"
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Holds the cache-wide lock, across threads and processes. Must not be nested."""
+        with self._thread_lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self.cache_dir / _LOCK_NAME, "a+b") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_meta(self, key: str) -> Optional[Dict]:
+        path = self.path_for(key)
+        try:
+            meta = json.loads(self._meta_path(key).read_text())
+        except FileNotFoundError:
+            meta = None
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable file cache metadata for {key}: {e}")
+            meta = None
+        if meta is None:
+            # An entry written by an older version without metadata
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                return None
+            meta = {"size": stat.st_size, "accessed": stat.st_mtime, "hits": 0}
+        elif not path.exists():
+            return None
+        return meta
+
+    def _write_meta(self, key: str, meta: Dict) -> None:
+        self._atomic_write(self._meta_path(key), json.dumps(meta).encode("utf-8"))
+
+    def _atomic_write(self, path: Path, payload: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=_TEMP_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    ####################################################################
+    # Lookups and writes
+    ####################################################################
+    def get(self, key: str, validator: Optional[Validator] = None, max_age: float = 0) -> Optional[Path]:
+        """
+        Returns the path of a cached entry, or None on a miss.
+
+        Args:
+            key (str): The entry key.
+            validator (Validator): Optional check of the entry's metadata
+                                   (for example against a HEAD request).
+                                   Entries it rejects are removed and
+                                   counted as stale misses.
+            max_age (float): Entries stored or validated less than this
+                             many seconds ago are used without calling
+                             `validator`.
+        """
+        meta = self._read_meta(key)
+        validated = False
+        if meta is not None and validator is not None and time.time() - meta.get("validated", 0) >= max_age:
+            if not validator(meta):
+                with self._locked():
+                    self._add_to_total_locked(-self._remove(key))
+                self.stale += 1
+                count("file_cache_stale")
+                meta = None
+            else:
+                validated = True
+        if meta is None:
+            self.misses += 1
+            count("file_cache_misses")
+            return None
+
+        with self._locked():
+            meta = self._read_meta(key)
+            if meta is None:
+                # Evicted by another process in the meantime
+                self.misses += 1
+                count("file_cache_misses")
+                return None
+            meta["accessed"] = time.time()
+            meta["hits"] = meta.get("hits", 0) + 1
+            if validated:
+                meta["validated"] = meta["accessed"]
+            self._write_meta(key, meta)
+        self.hits += 1
+        count("file_cache_hits")
+        return self.path_for(key)
+
+    def get_meta(self, key: str) -> Optional[Dict]:
+        """Returns the metadata of an entry without counting an access."""
+        return self._read_meta(key)
+
+    def put(
+        self,
+        key: str,
+        source: Union[bytes, BinaryIO, Path],
+        uri: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> Optional[Path]:
+        """
+        Stores an entry atomically and evicts old entries if the cache is
+        over its size cap.
+
+        Args:
+            key (str): The entry key.
+            source (Union[bytes, BinaryIO, Path]): The data, a stream that
+                                                   is copied to disk in
+                                                   chunks, or a finished file
+                                                   in the cache directory
+                                                   (see `temp_file`) that is
+                                                   moved into place.
+            uri (str): The URI the data came from.
+            etag (str): The object's ETag, for revalidation.
+            last_modified (str): The object's Last-Modified, for revalidation.
+
+        Returns:
+            The path of the entry, or None if it is larger than the whole
+            cache and was not kept.
+        """
+        if isinstance(source, Path):
+            tmp_path = str(source)
+        else:
+            tmp_path = self.temp_file()
+        try:
+            if not isinstance(source, Path):
+                with open(tmp_path, "wb") as f:
+                    if isinstance(source, (bytes, bytearray, memoryview)):
+                        f.write(source)
+                    else:
+                        shutil.copyfileobj(source, f, _COPY_CHUNK)
+            size = os.path.getsize(tmp_path)
+            if size > self.max_bytes:
+                os.unlink(tmp_path)
+                return None
+            meta = {
+                "uri": uri,
+                "size": size,
+                "etag": etag,
+                "last_modified": last_modified,
+                "accessed": time.time(),
+                "validated": time.time(),
+                "hits": 0,
+            }
+            with self._locked():
+                previous = self._read_meta(key)
+                os.replace(tmp_path, self.path_for(key))
+                self._write_meta(key, meta)
+                total = self._add_to_total_locked(size - (previous["size"] if previous else 0))
+                if total > self.max_bytes:
+                    self._evict_locked(protect=key)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return self.path_for(key)
+
+    def temp_file(self) -> str:
+        """
+        Creates an empty temporary file in the cache directory, for writers
+        that fill a file themselves before handing it to `put`. Files that
+        are never put are cleaned up by a later eviction.
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=_TEMP_SUFFIX)
+        os.close(fd)
+        return tmp_path
+
+    def remove(self, key: str) -> None:
+        """Removes an entry if present."""
+        with self._locked():
+            self._add_to_total_locked(-self._remove(key))
+
+    def _remove(self, key: str) -> int:
+        """Deletes an entry's files and returns the size it took up."""
+        meta = self._read_meta(key)
+        for path in (self.path_for(key), self._meta_path(key)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        return meta["size"] if meta is not None else 0
+
+    ####################################################################
+    # Eviction and statistics
+    ####################################################################
+    def _entries(self) -> List[Dict]:
+        """Scans the cache directory; the caller must hold the cache lock."""
+        entries = []
+        now = time.time()
+        for entry in os.scandir(self.cache_dir):
+            name = entry.name
+            if name in (_LOCK_NAME, _TOTAL_NAME) or name.endswith(_META_SUFFIX):
+                continue
+            if name.endswith(_TEMP_SUFFIX):
+                # Clean up after writers that died mid-write
+                try:
+                    if now - entry.stat().st_mtime > STALE_TEMP_SECONDS:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            meta = self._read_meta(name)
+            if meta is not None:
+                meta["key"] = name
+                entries.append(meta)
+        return entries
+
+    def _write_total_locked(self, total: int) -> None:
+        (self.cache_dir / _TOTAL_NAME).write_text(str(max(total, 0)))
+
+    def _add_to_total_locked(self, delta: int) -> int:
+        """
+        Adjusts the running total for a change already made on disk and
+        returns the new total. A missing or unreadable total is rebuilt by
+        scanning the entries, which already include the change.
+        """
+        try:
+            total = int((self.cache_dir / _TOTAL_NAME).read_text()) + delta
+        except (FileNotFoundError, ValueError):
+            total = sum(entry["size"] for entry in self._entries())
+        self._write_total_locked(total)
+        return total
+
+    def _evict_locked(self, protect: Optional[str] = None) -> int:
+        # A full scan, which also corrects any drift in the running total
+        entries = self._entries()
+        total = sum(entry["size"] for entry in entries)
+        if total <= self.max_bytes:
+            self._write_total_locked(total)
+            return 0
+        if self.policy == "lfu":
+            entries.sort(key=lambda e: (e.get("hits", 0), e.get("accessed", 0)))
+        else:
+            entries.sort(key=lambda e: e.get("accessed", 0))
+        evicted = 0
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry["key"] == protect:
+                continue
+            self._remove(entry["key"])
+            total -= entry["size"]
+            evicted += 1
+            count("file_cache_evictions")
+        self._write_total_locked(total)
+        self.evictions += evicted
+        return evicted
+
+    def evict(self) -> int:
+        """Evicts entries until the cache fits its size cap; returns how many."""
+        with self._locked():
+            return self._evict_locked()
+
+    def total_bytes(self) -> int:
+        """The size of all entries together, in bytes."""
+        if not self.cache_dir.exists():
+            return 0
+        with self._locked():
+            return self._add_to_total_locked(0)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns this process's hit/miss/eviction counters and the cache size."""
+        entries = []
+        if self.cache_dir.exists():
+            # The scan also deletes stale temporary files
+            with self._locked():
+                entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "stale": self.stale,
+            "entries": len(entries),
+            "bytes": sum(entry["size"] for entry in entries),
+        }
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        if not self.cache_dir.exists():
+            return
+        with self._locked():
+            for entry in self._entries():
+                self._remove(entry["key"])
+            self._write_total_locked(0)
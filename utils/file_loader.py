@@ -1,14 +1,69 @@
 import os
 import re
-import boto3
-from botocore.exceptions import BotoCoreError, NoCredentialsError
+import threading
 from io import BytesIO
-from typing import Union, BinaryIO
+from typing import Dict, Optional, Union, BinaryIO
 from pathlib import Path
 import hashlib
+import shutil
+import tempfile
+from utils.file_cache import FileCache, Validator, DEFAULT_CACHE_DIR
+from utils.s3_range_file import S3RangeFile
+from utils.mapped_file import MappedFile, open_mapped
+from instrumentation import count, instrumented, stage
 
-# Optional: directory to cache remote files
-DEFAULT_CACHE_DIR = Path(".cache/files")
+# Shared by every call that does not pass its own FileCache
+DEFAULT_FILE_CACHE = FileCache(DEFAULT_CACHE_DIR)
+
+# Cached S3 copies stored or revalidated less than this many seconds ago
+# are used without a HEAD request (see `open_file_from_path_or_s3`)
+DEFAULT_REVALIDATE_SECONDS = 300
+
+# Connection pool size of the shared S3 client; enough for a prefetch with
+# several concurrent downloads that each fetch several ranges at once
+S3_MAX_POOL_CONNECTIONS = 64
+
+_s3_client = None
+_s3_client_pid = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """
+    Returns the process-wide S3 client, creating it on first use.
+
+    Creating a client resolves credentials and loads the service model,
+    which costs far more than a request, so every open and prefetch shares
+    one thread-safe client with a pool of S3_MAX_POOL_CONNECTIONS
+    connections. A forked child process gets its own client instead of
+    reusing the parent's sockets.
+    """
+    global _s3_client, _s3_client_pid
+    pid = os.getpid()
+    if _s3_client is None or _s3_client_pid != pid:
+        with _s3_client_lock:
+            if _s3_client is None or _s3_client_pid != pid:
+                # Imported here: boto3 takes longer to import than most
+                # local documents take to open
+                import boto3
+                from botocore.config import Config
+                _s3_client = boto3.client(
+                    "s3",
+                    config=Config(
+                        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                        retries={"max_attempts": 5, "mode": "adaptive"},
+                    ),
+                )
+                _s3_client_pid = pid
+    return _s3_client
+
+
+def __getattr__(name: str):
+    # `file_loader.boto3` used to be a module attribute; import it on demand
+    if name == "boto3":
+        import boto3
+        return boto3
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def is_s3_uri(uri: str) -> bool:
@@ -26,40 +81,181 @@ def hash_uri(uri: str) -> str:
     return hashlib.sha256(uri.encode()).hexdigest()
 
 
-def get_cached_path(uri: str, cache_dir: Union[str, Path] = DEFAULT_CACHE_DIR) -> Path:
-    cache_dir = Path(cache_dir)
-    cache_dir.mkdir(parents=True, exist_ok=True)
-    return cache_dir / hash_uri(uri)
-
-
-def open_file_from_path_or_s3(uri: str, use_cache: bool = True) -> BinaryIO:
+@instrumented
+def open_file_from_path_or_s3(
+    uri: str,
+    use_cache: bool = True,
+    lazy: bool = False,
+    revalidate: Union[bool, float] = DEFAULT_REVALIDATE_SECONDS,
+    cache: Optional[FileCache] = None,
+    use_mmap: bool = False
+) -> BinaryIO:
     """
     Open a file from local path or S3. If use_cache is True, downloads are cached locally.
+    If lazy is True, S3 objects that are not cached are not downloaded; the
+    returned S3RangeFile fetches only the byte ranges that are read.
+    revalidate controls when a cached copy is checked with a HEAD request
+    and only used if the object's ETag (or Last-Modified) is unchanged: a
+    number of seconds checks copies stored or last checked longer ago than
+    that (DEFAULT_REVALIDATE_SECONDS by default), True checks on every open
+    and False never does.
+    If use_mmap is True, local files, cache hits and fresh downloads are
+    returned as a read-only MappedFile, so the document is read from the OS
+    page cache instead of being copied into each process's memory.
+    Fresh downloads are streamed to disk rather than held in memory whenever
+    they can be cached (or mapped).
     Returns a file-like BinaryIO stream.
     """
     if is_s3_uri(uri):
-        return _open_s3_file(uri, use_cache)
+        cache = cache if cache is not None else DEFAULT_FILE_CACHE
+        if lazy:
+            return _open_s3_range_file(uri, use_cache, revalidate, cache, use_mmap)
+        return _open_s3_file(uri, use_cache, revalidate, cache, use_mmap)
     else:
         if not os.path.exists(uri):
             raise FileNotFoundError(f"Local file not found: {uri}")
-        return open(uri, "rb")
+        return _open_local(uri, use_mmap)
 
 
-def _open_s3_file(uri: str, use_cache: bool) -> BinaryIO:
+def _open_local(path: Union[str, Path], use_mmap: bool) -> BinaryIO:
+    return open_mapped(path) if use_mmap else open(path, "rb")
+
+
+def _s3_validator(s3, uri: str) -> Validator:
+    """Returns a FileCache validator that compares an entry with a HEAD of the object."""
+    from botocore.exceptions import BotoCoreError, ClientError
     bucket, key = parse_s3_uri(uri)
-    cache_path = get_cached_path(uri)
 
-    if use_cache and cache_path.exists():
-        return open(cache_path, "rb")
+    def is_current(meta: Dict) -> bool:
+        try:
+            with stage("s3_fetch"):
+                head = s3.head_object(Bucket=bucket, Key=key)
+            count("s3_requests")
+        except (BotoCoreError, ClientError) as e:
+            print(f"Warning: Could not revalidate cached copy of {uri}, using it as is: {e}")
+            return True
+        if meta.get("etag"):
+            return head.get("ETag") == meta["etag"]
+        if meta.get("last_modified"):
+            return str(head.get("LastModified")) == meta["last_modified"]
+        # Entries cached without validators cannot be checked
+        return False
 
-    try:
-        s3 = boto3.client("s3")
-        response = s3.get_object(Bucket=bucket, Key=key)
-        data = response['Body'].read()
+    return is_current
 
+
+def cached_s3_path(uri: str, s3, revalidate: Union[bool, float], cache: FileCache) -> Optional[Path]:
+    """
+    Returns the path of the cached copy of an S3 object, or None if it is
+    not cached (or, when revalidated, no longer matches a HEAD of the
+    object). `revalidate` is True, False or a number of seconds, as for
+    `open_file_from_path_or_s3`.
+    """
+    if revalidate is False:
+        return cache.get(hash_uri(uri))
+    max_age = 0 if revalidate is True else revalidate
+    return cache.get(hash_uri(uri), validator=_s3_validator(s3, uri), max_age=max_age)
+
+
+def cache_s3_object(cache: FileCache, uri: str, source: Union[BinaryIO, Path], response: Dict) -> Optional[Path]:
+    """
+    Stores an S3 object in the cache, with the ETag and Last-Modified of
+    the GET `response` as validators. `source` is the object's body
+    stream or a complete file to move into place (see FileCache.put).
+
+    Returns:
+        The cached path, or None if the object is larger than the cache.
+    """
+    return cache.put(
+        hash_uri(uri), source, uri=uri,
+        etag=response.get("ETag"), last_modified=_last_modified(response),
+    )
+
+
+def _open_s3_file(
+    uri: str,
+    use_cache: bool,
+    revalidate: Union[bool, float] = DEFAULT_REVALIDATE_SECONDS,
+    cache: FileCache = DEFAULT_FILE_CACHE,
+    use_mmap: bool = False
+) -> BinaryIO:
+    from botocore.exceptions import BotoCoreError, NoCredentialsError
+    bucket, key = parse_s3_uri(uri)
+
+    try:
+        s3 = get_s3_client()
         if use_cache:
-            cache_path.write_bytes(data)
+            cache_path = cached_s3_path(uri, s3, revalidate, cache)
+            if cache_path is not None:
+                return _open_local(cache_path, use_mmap)
+
+        with stage("s3_fetch"):
+            response = _get_object(s3, bucket, key)
+            size = response.get("ContentLength")
+
+            # Objects too large for the cache are not written to it at all, so
+            # the body stream is still unread below
+            if use_cache and (size is None or size <= cache.max_bytes):
+                cache_path = cache_s3_object(cache, uri, response['Body'], response)
+                if cache_path is not None:
+                    try:
+                        return _open_local(cache_path, use_mmap)
+                    except FileNotFoundError:
+                        # Evicted by another process before it could be opened
+                        return _open_s3_file(uri, False, use_mmap=use_mmap)
+                # Larger than the whole cache; the put consumed the body
+                response = _get_object(s3, bucket, key)
+
+            if use_mmap:
+                return _spool_to_mapped_file(response['Body'], uri)
+            return BytesIO(response['Body'].read())
+    except (BotoCoreError, NoCredentialsError) as e:
+        raise RuntimeError(f"Failed to load S3 file: {uri}") from e
+
 
-        return BytesIO(data)
+def _get_object(s3, bucket: str, key: str) -> Dict:
+    response = s3.get_object(Bucket=bucket, Key=key)
+    count("s3_requests")
+    count("s3_bytes_fetched", response.get("ContentLength") or 0)
+    return response
+
+
+def _spool_to_mapped_file(body: BinaryIO, uri: str) -> BinaryIO:
+    """Streams a download into an anonymous temporary file and maps it."""
+    spool = tempfile.TemporaryFile()
+    try:
+        shutil.copyfileobj(body, spool, 1024 * 1024)
+        spool.flush()
+        if spool.tell() == 0:
+            spool.close()
+            return BytesIO()
+        return MappedFile(spool, name=uri)
+    except BaseException:
+        spool.close()
+        raise
+
+
+def _open_s3_range_file(
+    uri: str,
+    use_cache: bool,
+    revalidate: Union[bool, float] = DEFAULT_REVALIDATE_SECONDS,
+    cache: FileCache = DEFAULT_FILE_CACHE,
+    use_mmap: bool = False
+) -> BinaryIO:
+    from botocore.exceptions import BotoCoreError, NoCredentialsError
+    bucket, key = parse_s3_uri(uri)
+
+    try:
+        s3 = get_s3_client()
+        if use_cache:
+            cache_path = cached_s3_path(uri, s3, revalidate, cache)
+            if cache_path is not None:
+                return _open_local(cache_path, use_mmap)
+        return S3RangeFile(s3, bucket, key)
     except (BotoCoreError, NoCredentialsError) as e:
         raise RuntimeError(f"Failed to load S3 file: {uri}") from e
+
+
+def _last_modified(response: Dict) -> Optional[str]:
+    last_modified = response.get("LastModified")
+    return None if last_modified is None else str(last_modified)
@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LayoutCache:
+    """
+    An in-process LRU cache for analyzed page layouts.
+
+    Entries are keyed by (document identity, page number, layout settings)
+    and the cache is bounded both by a number of pages and by an estimated
+    number of bytes. When either budget is exceeded, the least recently used
+    pages are evicted first.
+    """
+
+    def __init__(self, max_pages: int = 128, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            max_pages (int): Maximum number of page layouts kept in memory.
+            max_bytes (int): Maximum estimated size, in bytes, of all cached layouts.
+        """
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached layout for `key`, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, layout: Any, size_bytes: int) -> None:
+        """
+        Stores a layout with its estimated size, evicting older entries as
+        needed. Layouts larger than the whole byte budget are not cached.
+        """
+        if size_bytes > self.max_bytes or self.max_pages <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (layout, size_bytes)
+            self._total_bytes += size_bytes
+            while len(self._entries) > self.max_pages or self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss/eviction counters and the current usage."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "pages": len(self._entries),
+            "bytes": self._total_bytes,
+        }
+
+
+# Shared by every PdfSession unless a session is given its own cache
+DEFAULT_LAYOUT_CACHE = LayoutCache()
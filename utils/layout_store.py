@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Dict, Hashable, Optional, Union
+
+# Sits next to the file cache used by utils.file_loader (.cache/files)
+DEFAULT_LAYOUT_DIR = Path(".cache/layouts")
+
+
+def settings_digest(settings_key: Hashable) -> str:
+    """Returns a short, stable digest of a layout settings key."""
+    return hashlib.sha256(repr(settings_key).encode()).hexdigest()[:16]
+
+
+class LayoutStore:
+    """
+    A persistent, on-disk store of serialized page layouts.
+
+    Entries are keyed by the document's content hash and the layout analysis
+    settings, and each page is kept in its own zlib-compressed JSON file:
+
+        <cache_dir>/<doc sha256>/<settings digest>/<page>.json.z
+
+    Document-wide data derived from those layouts (such as the keyword index)
+    is stored next to the pages under its own name.
+
+    Writes go to a temporary file that is renamed into place, so concurrent
+    workers never observe a partially written entry.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path] = DEFAULT_LAYOUT_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def _entry_path(self, doc_id: str, settings_key: Hashable, name: str) -> Path:
+        return self.cache_dir / doc_id / settings_digest(settings_key) / f"{name}.json.z"
+
+    def get(self, doc_id: str, settings_key: Hashable, page_number: int) -> Optional[Dict]:
+        """Returns the stored layout dict for a page, or None if absent or unreadable."""
+        return self._read(self._entry_path(doc_id, settings_key, str(page_number)))
+
+    def put(self, doc_id: str, settings_key: Hashable, page_number: int, data: Dict) -> None:
+        """Stores a page layout dict atomically."""
+        self._write(self._entry_path(doc_id, settings_key, str(page_number)), data)
+
+    def get_document_data(self, doc_id: str, settings_key: Hashable, name: str) -> Optional[Dict]:
+        """Returns a named document-wide entry, or None if absent or unreadable."""
+        return self._read(self._entry_path(doc_id, settings_key, name))
+
+    def put_document_data(self, doc_id: str, settings_key: Hashable, name: str, data: Dict) -> None:
+        """Stores a named document-wide entry atomically."""
+        self._write(self._entry_path(doc_id, settings_key, name), data)
+
+    def _read(self, path: Path) -> Optional[Dict]:
+        try:
+            return json.loads(zlib.decompress(path.read_bytes()))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error) as e:
+            print(f"Warning: Ignoring unreadable layout cache entry {path}: {e}")
+            return None
+
+    def _write(self, path: Path, data: Dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
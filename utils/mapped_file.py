@@ -0,0 +1,105 @@
+import io
+import mmap
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+
+class MappedFile(io.RawIOBase):
+    """
+    A read-only, seekable stream over a memory-mapped file.
+
+    Reads are served straight from the OS page cache, so every process that
+    maps the same file shares one copy of its pages instead of holding its
+    own buffer, and `getbuffer()` exposes the contents without copying.
+    The `name` attribute is the file path when there is one, so
+    `page_map.document_source` hands the path rather than the bytes to
+    worker processes.
+    """
+
+    def __init__(self, file: BinaryIO, name: Optional[str] = None):
+        """
+        Args:
+            file (BinaryIO): An open, non-empty file with a real file
+                             descriptor. The MappedFile takes ownership of
+                             it and closes it on close().
+            name (str): The file path, if any. Defaults to `file.name`.
+        """
+        super().__init__()
+        self._file = file
+        self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if name is None:
+            name = getattr(file, "name", None)
+        self.name = name if isinstance(name, str) else None
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def tell(self) -> int:
+        return self._map.tell()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._map.tell() + offset
+        elif whence == io.SEEK_END:
+            position = len(self._map) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        # mmap cannot seek past the end; reads there return nothing anyway
+        self._map.seek(min(position, len(self._map)))
+        return self._map.tell()
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return self._map.read()
+        return self._map.read(size)
+
+    def readall(self) -> bytes:
+        return self._map.read()
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        start = self._map.tell()
+        count = min(len(view), len(self._map) - start)
+        view[:count] = self._map[start:start + count]
+        self._map.seek(start + count)
+        return count
+
+    def getbuffer(self) -> memoryview:
+        """
+        Returns a zero-copy view of the whole file. Release it before
+        closing the MappedFile.
+        """
+        return memoryview(self._map)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._map.close()
+            self._file.close()
+        super().close()
+
+
+def open_mapped(path: Union[str, Path]) -> BinaryIO:
+    """
+    Opens a local file as a MappedFile. Empty files cannot be mapped and are
+    opened normally.
+    """
+    file = open(path, "rb")
+    try:
+        if file.seek(0, io.SEEK_END) == 0:
+            file.seek(0)
+            return file
+        file.seek(0)
+        return MappedFile(file, str(path))
+    except BaseException:
+        file.close()
+        raise
@@ -0,0 +1,189 @@
+"""
+Warm the file cache with many S3 documents at once.
+
+Extraction is CPU bound, but getting documents there is network bound and
+`open_file_from_path_or_s3` fetches one object at a time. `prefetch`
+downloads a whole batch into the FileCache from a thread pool before the
+extraction starts, so the later opens are cache hits.
+
+Each object is fetched with a ranged GET for its first part, which also
+reveals its size. Objects larger than one part have their remaining parts
+fetched concurrently, pinned to the first response's ETag, and written
+straight into a temporary file in the cache directory that is then moved
+into place.
+"""
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from instrumentation import count, stage
+
+from utils import file_loader
+from utils.file_cache import FileCache
+from utils.s3_range_file import is_invalid_range, parse_content_range
+
+# Objects downloaded at the same time
+DEFAULT_MAX_CONCURRENCY = 16
+
+# Size of each ranged GET; objects up to this size take a single request
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+# Parts of one large object downloaded at the same time
+DEFAULT_PART_CONCURRENCY = 4
+
+_COPY_CHUNK = 1024 * 1024
+
+# Statuses of a PrefetchResult
+CACHED = "cached"
+DOWNLOADED = "downloaded"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+@dataclass
+class PrefetchResult:
+    """The outcome of prefetching one URI."""
+    uri: str
+    status: str
+    path: Optional[Path] = None
+    size: Optional[int] = None
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status in (CACHED, DOWNLOADED)
+
+
+def prefetch(
+    uris: Iterable[str],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    cache: Optional[FileCache] = None,
+    revalidate: bool = True,
+    part_size: int = DEFAULT_PART_SIZE,
+    part_concurrency: int = DEFAULT_PART_CONCURRENCY,
+    on_result: Optional[Callable[[PrefetchResult], None]] = None
+) -> List[PrefetchResult]:
+    """
+    Downloads S3 objects into the file cache in parallel.
+
+    Args:
+        uris (Iterable[str]): The s3:// URIs to fetch. Other URIs are
+                              skipped; duplicates are fetched once.
+        max_concurrency (int): Number of objects downloaded at the same time.
+        cache (FileCache): The cache to fill. Defaults to the loader's cache.
+        revalidate (bool): If True, cached copies are checked with a HEAD
+                           request and re-downloaded if the object changed.
+        part_size (int): Size in bytes of each ranged GET.
+        part_concurrency (int): Number of parts of one object downloaded at
+                                the same time.
+        on_result (Callable[[PrefetchResult], None]): Optional callback
+                                                      invoked as each object
+                                                      finishes, for progress
+                                                      reporting.
+
+    Returns:
+        List[PrefetchResult]: One result per input URI, in input order. The
+        status is "cached" (already current in the cache), "downloaded",
+        "skipped" (not an S3 URI, or larger than the whole cache) or
+        "failed" (with the error message).
+    """
+    uris = list(uris)
+    cache = cache if cache is not None else file_loader.DEFAULT_FILE_CACHE
+    s3 = file_loader.get_s3_client()
+
+    results: Dict[str, PrefetchResult] = {}
+    with ThreadPoolExecutor(max_workers=max(max_concurrency, 1)) as executor:
+        futures = [
+            executor.submit(_prefetch_one, s3, uri, cache, revalidate, part_size, part_concurrency)
+            for uri in dict.fromkeys(uris)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result.uri] = result
+            if on_result is not None:
+                on_result(result)
+    return [results[uri] for uri in uris]
+
+
+def _prefetch_one(s3, uri: str, cache: FileCache, revalidate: bool, part_size: int, part_concurrency: int) -> PrefetchResult:
+    started = time.perf_counter()
+    if not file_loader.is_s3_uri(uri):
+        return PrefetchResult(uri, SKIPPED, error="Not an S3 URI")
+    try:
+        path = file_loader.cached_s3_path(uri, s3, revalidate, cache)
+        if path is not None:
+            meta = cache.get_meta(file_loader.hash_uri(uri)) or {}
+            return PrefetchResult(uri, CACHED, path, meta.get("size"), time.perf_counter() - started)
+        path, size = _download_to_cache(s3, uri, cache, part_size, part_concurrency)
+    except Exception as e:
+        return PrefetchResult(uri, FAILED, seconds=time.perf_counter() - started, error=f"{type(e).__name__}: {e}")
+    if path is None:
+        return PrefetchResult(uri, SKIPPED, size=size, seconds=time.perf_counter() - started, error="Larger than the cache")
+    return PrefetchResult(uri, DOWNLOADED, path, size, time.perf_counter() - started)
+
+
+def _download_to_cache(s3, uri: str, cache: FileCache, part_size: int, part_concurrency: int) -> Tuple[Optional[Path], int]:
+    """Downloads one object into the cache; returns (path or None if too large, size)."""
+    bucket, key = file_loader.parse_s3_uri(uri)
+    part_size = max(part_size, 1)
+    try:
+        with stage("s3_fetch"):
+            first = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{part_size - 1}")
+    except Exception as e:
+        # S3 rejects ranges over empty objects
+        if not is_invalid_range(e):
+            raise
+        with stage("s3_fetch"):
+            first = s3.get_object(Bucket=bucket, Key=key)
+    count("s3_requests")
+    _, size = parse_content_range(first, first.get("ContentLength") or 0)
+    if size > cache.max_bytes:
+        first["Body"].close()
+        return None, size
+
+    tmp_path = cache.temp_file()
+    try:
+        with open(tmp_path, "r+b") as f:
+            with stage("s3_fetch"):
+                shutil.copyfileobj(first["Body"], f, _COPY_CHUNK)
+            written = f.tell()
+            count("s3_bytes_fetched", written)
+            if written < size:
+                _download_parts(s3, bucket, key, first.get("ETag"), f, written, size, part_size, part_concurrency)
+        path = file_loader.cache_s3_object(cache, uri, Path(tmp_path), first)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path, size
+
+
+def _download_parts(s3, bucket: str, key: str, etag: Optional[str], f, start: int, size: int, part_size: int, part_concurrency: int) -> None:
+    """Fetches bytes start..size-1 in parts of part_size and writes each at its offset in f."""
+    write_lock = threading.Lock()
+
+    def fetch(offset: int) -> None:
+        end = min(offset + part_size, size) - 1
+        kwargs = {"Bucket": bucket, "Key": key, "Range": f"bytes={offset}-{end}"}
+        if etag:
+            # Fails instead of mixing two versions if the object changes
+            kwargs["IfMatch"] = etag
+        with stage("s3_fetch"):
+            data = s3.get_object(**kwargs)["Body"].read()
+        count("s3_requests")
+        count("s3_bytes_fetched", len(data))
+        if len(data) != end - offset + 1:
+            raise IOError(f"Short read of s3://{bucket}/{key}: expected {end - offset + 1} bytes, got {len(data)}")
+        with write_lock:
+            f.seek(offset)
+            f.write(data)
+
+    with ThreadPoolExecutor(max_workers=max(part_concurrency, 1)) as executor:
+        for future in [executor.submit(fetch, offset) for offset in range(start, size, part_size)]:
+            future.result()
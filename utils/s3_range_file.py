@@ -0,0 +1,249 @@
+import hashlib
+import io
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from instrumentation import count, stage
+
+# Blocks are fetched and cached in units of this many bytes
+DEFAULT_BLOCK_SIZE = 256 * 1024
+
+# Number of blocks kept in memory per file (16 MB with the default block size)
+DEFAULT_MAX_BLOCKS = 64
+
+# The trailer, xref table and often the page tree sit at the end of a PDF,
+# so opening a file starts with one request for its last bytes
+DEFAULT_TAIL_SIZE = 256 * 1024
+
+_CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+def parse_content_range(response: Dict, length: int) -> Tuple[int, int]:
+    """
+    Returns (first byte offset, total object size) of a GET response with
+    `length` body bytes, ranged or not.
+    """
+    match = _CONTENT_RANGE_RE.match(response.get("ContentRange") or "")
+    if match:
+        return int(match.group(1)), int(match.group(3))
+    # No ContentRange: the whole object was returned
+    return 0, length
+
+
+def is_invalid_range(error: Exception) -> bool:
+    """Returns True for S3's InvalidRange error (a botocore ClientError)."""
+    response = getattr(error, "response", None)
+    return isinstance(response, dict) and response.get("Error", {}).get("Code") == "InvalidRange"
+
+
+class S3RangeFile(io.RawIOBase):
+    """
+    A read-only, seekable file object over an S3 object that downloads only
+    the byte ranges that are actually read.
+
+    pdfminer reads a PDF by seeking around it: first the trailer and xref
+    table at the end of the file, then only the objects the requested pages
+    refer to. Each read is served from an LRU cache of fixed-size blocks,
+    and the blocks missing for a read are fetched with as few `Range` GETs
+    as possible, one per run of adjacent blocks. Range requests are pinned
+    to the object's ETag, so a change to the object fails loudly instead of
+    mixing two versions.
+
+    Any client with boto3's `get_object(Bucket=..., Key=..., Range=...,
+    IfMatch=...)` signature works, which keeps the class testable with a
+    stub client.
+    """
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        key: str,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        max_blocks: int = DEFAULT_MAX_BLOCKS,
+        tail_size: int = DEFAULT_TAIL_SIZE
+    ):
+        """
+        Args:
+            client: A boto3 S3 client (or compatible stub).
+            bucket (str): The bucket name.
+            key (str): The object key.
+            block_size (int): Size of a cached block in bytes.
+            max_blocks (int): Maximum number of blocks kept in memory.
+            tail_size (int): Number of bytes fetched from the end of the
+                             object when the file is opened.
+        """
+        super().__init__()
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.block_size = block_size
+        self.max_blocks = max(max_blocks, 1)
+        self._blocks: "OrderedDict[int, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._position = 0
+        self.requests = 0
+        self.bytes_fetched = 0
+
+        # One suffix-range request returns the tail and the object size
+        with stage("s3_fetch"):
+            try:
+                response = self._get(f"bytes=-{max(tail_size, 1)}", pin=False)
+            except Exception as e:
+                # S3 rejects ranges over empty objects
+                if not is_invalid_range(e):
+                    raise
+                response = self._get(None, pin=False)
+            data = response["Body"].read()
+        self.etag: Optional[str] = response.get("ETag")
+        start, self.size = parse_content_range(response, len(data))
+        self._store_range(start, data)
+
+    @property
+    def name(self) -> str:
+        return f"s3://{self.bucket}/{self.key}"
+
+    @property
+    def doc_id(self) -> Optional[str]:
+        """
+        A hex digest identifying this version of the object, derived from
+        its location and ETag so that it can be used as a cache key without
+        downloading the object. None if S3 returned no ETag.
+        """
+        if not self.etag:
+            return None
+        return hashlib.sha256(f"{self.name}\0{self.etag}".encode()).hexdigest()
+
+    def _get(self, byte_range: Optional[str], pin: bool = True) -> Dict:
+        kwargs = {"Bucket": self.bucket, "Key": self.key}
+        if byte_range is not None:
+            kwargs["Range"] = byte_range
+        if pin and self.etag:
+            kwargs["IfMatch"] = self.etag
+        self.requests += 1
+        count("s3_requests")
+        return self.client.get_object(**kwargs)
+
+    ####################################################################
+    # Block cache
+    ####################################################################
+    def _store_range(self, start: int, data: bytes) -> None:
+        """Splits fetched bytes into blocks and adds the complete ones to the cache."""
+        self.bytes_fetched += len(data)
+        count("s3_bytes_fetched", len(data))
+        end = start + len(data)
+        block = -(-start // self.block_size)  # first block that starts inside the data
+        with self._lock:
+            while block * self.block_size < end:
+                block_start = block * self.block_size
+                block_end = min(block_start + self.block_size, self.size)
+                if block_end > end:
+                    break
+                self._blocks[block] = data[block_start - start:block_end - start]
+                self._blocks.move_to_end(block)
+                block += 1
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+
+    def _fetch_blocks(self, first: int, last: int) -> Dict[int, bytes]:
+        """Returns blocks first..last, fetching each run of missing blocks with one request."""
+        found: Dict[int, bytes] = {}
+        missing: List[int] = []
+        with self._lock:
+            for block in range(first, last + 1):
+                data = self._blocks.get(block)
+                if data is None:
+                    missing.append(block)
+                else:
+                    self._blocks.move_to_end(block)
+                    found[block] = data
+
+        # Coalesce adjacent missing blocks into runs
+        runs: List[List[int]] = []
+        for block in missing:
+            if runs and runs[-1][-1] == block - 1:
+                runs[-1].append(block)
+            else:
+                runs.append([block])
+        for run in runs:
+            start = run[0] * self.block_size
+            end = min((run[-1] + 1) * self.block_size, self.size) - 1
+            with stage("s3_fetch"):
+                data = self._get(f"bytes={start}-{end}")["Body"].read()
+            if len(data) != end - start + 1:
+                raise IOError(f"Short read from {self.name}: expected {end - start + 1} bytes, got {len(data)}")
+            self._store_range(start, data)
+            for block in run:
+                offset = (block - run[0]) * self.block_size
+                found[block] = data[offset:offset + self.block_size]
+        return found
+
+    def cached_blocks(self) -> int:
+        """Returns the number of blocks currently held in memory."""
+        with self._lock:
+            return len(self._blocks)
+
+    ####################################################################
+    # io.RawIOBase interface
+    ####################################################################
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._position = position
+        return position
+
+    def readinto(self, buffer) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        view = memoryview(buffer).cast("B")
+        start = self._position
+        end = min(start + len(view), self.size)
+        if end <= start:
+            return 0
+
+        first, last = start // self.block_size, (end - 1) // self.block_size
+        blocks = self._fetch_blocks(first, last)
+        written = 0
+        for block in range(first, last + 1):
+            data = blocks[block]
+            block_start = block * self.block_size
+            lo = max(start, block_start) - block_start
+            hi = min(end, block_start + len(data)) - block_start
+            view[written:written + hi - lo] = data[lo:hi]
+            written += hi - lo
+        self._position = start + written
+        return written
+
+    def readall(self) -> bytes:
+        return self.read(max(self.size - self._position, 0))
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = max(self.size - self._position, 0)
+        buffer = bytearray(min(size, max(self.size - self._position, 0)))
+        n = self.readinto(buffer)
+        return bytes(buffer[:n])
+
+    def close(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+        super().close()